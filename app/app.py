@@ -10,6 +10,7 @@ if project_root not in sys.path:
 # Remove the SQLite fix since we're switching to FAISS
 # Now import everything else
 from dotenv import load_dotenv
+import threading
 import time
 
 # DON'T import pipeline here - we'll import it after building
@@ -47,21 +48,41 @@ def run_build_pipeline():
 @st.cache_resource
 def init_pipeline():
     try:
+        from configs.config import ALLOW_RUNTIME_BUILD, METRICS_PORT, PERSIST_DIR, RECOMMENDER_API_URL
+        from src.index_versions import resolve_index_dir
+
+        # Act as a thin client when a standalone API server is configured
+        if RECOMMENDER_API_URL:
+            from src.api_client import RecommendationAPIClient
+
+            client = RecommendationAPIClient(RECOMMENDER_API_URL)
+            if not client.is_ready():
+                st.warning(f"⏳ Recommendation API at {RECOMMENDER_API_URL} is not ready yet.")
+            return client
+
         # Check if vector store exists - now looking for FAISS files
-        persist_dir = "faiss_db"  # Changed from chroma_db to faiss_db
+        persist_dir = PERSIST_DIR
         csv_path = "data/processed_anime_data.csv"
 
-        # Check if pipeline components exist - FAISS uses .pkl and .faiss files
+        # Check if pipeline components exist - FAISS uses .pkl and .faiss files,
+        # in the published version directory once builds are versioned
+        index_dir = resolve_index_dir(persist_dir)
         vector_store_exists = (
-            os.path.exists(persist_dir)
-            and os.path.isdir(persist_dir)
-            and any(f.endswith((".pkl", ".faiss")) for f in os.listdir(persist_dir))
+            os.path.exists(index_dir)
+            and os.path.isdir(index_dir)
+            and any(f.endswith((".pkl", ".faiss")) for f in os.listdir(index_dir))
         )
 
         csv_exists = os.path.exists(csv_path)
 
         # If either doesn't exist, run the build pipeline
         if not vector_store_exists or not csv_exists:
+            if not ALLOW_RUNTIME_BUILD:
+                st.error(
+                    f"❌ No prebuilt index found at {persist_dir}. Bake it into the image with `python -m pipeline.bake_artifacts`."
+                )
+                return None
+
             st.info(
                 "🔧 Setting up the anime database for the first time... This may take a few minutes."
             )
@@ -75,8 +96,18 @@ def init_pipeline():
         # ONLY import the pipeline AFTER everything is built
         from pipeline.pipeline import AnimeRecommendationPipeline
 
-        # Initialize and return the pipeline
-        return AnimeRecommendationPipeline(persist_dir=persist_dir)
+        # Initialize, warm up and return the pipeline
+        pipeline = AnimeRecommendationPipeline(persist_dir=persist_dir)
+        pipeline.warm_up()
+        # Answer frequent logged queries in the background (CACHE_WARM_QUERIES)
+        threading.Thread(target=pipeline.warm_caches, daemon=True).start()
+
+        # The in-process pipeline has no HTTP API, so expose /metrics on its own port
+        if METRICS_PORT:
+            from utils.metrics import start_metrics_server
+
+            start_metrics_server(METRICS_PORT)
+        return pipeline
 
     except Exception as e:
         st.error(f"Failed to initialize pipeline: {e}")
@@ -452,25 +483,21 @@ col1, col2, col3 = st.columns([1, 4, 1])
 with col2:
     with st.expander("🎯 Popular Anime Categories"):
         st.markdown("**Popular search categories:**")
-        example_tags = [
-            "School life romance",
-            "Dark fantasy adventure",
-            "Slice of life cooking",
-            "Supernatural powers",
-            "Modern Tokyo setting",
-            "Comedy workplace",
-        ]
-
-        for tag in example_tags:
-            st.markdown(
-                f'<span class="anime-badge">{tag}</span>', unsafe_allow_html=True
-            )
+        # Answers for these are generated at build time and served instantly
+        from configs.config import CURATED_QUERIES
+
+        def use_category(tag):
+            st.session_state["query"] = tag
+
+        for tag in CURATED_QUERIES:
+            st.button(tag, key=f"category-{tag}", on_click=use_category, args=(tag,))
 
     query = st.text_input(
         "🔍 What anime universe calls to you?",
         placeholder="e.g., heartwarming slice of life with cute characters",
         help="Describe your ideal anime - genre, mood, setting, characters...",
         label_visibility="collapsed",
+        key="query",
     )
 
     search_clicked = st.button("✨ Discover My Anime ✨")
@@ -482,44 +509,57 @@ if query and (search_clicked or query):
             unsafe_allow_html=True,
         )
     else:
-        with st.spinner("🎭 Searching through the anime multiverse..."):
-            try:
-                time.sleep(0.8)  # Slightly longer for effect
-                response = pipeline.recommend(query)
-
-                if response:
-                    st.markdown("### 🎬 Your Anime Recommendations")
-                    st.markdown(
-                        f'<div class="recommendation-card">{response}</div>',
-                        unsafe_allow_html=True,
-                    )
-
-                    # Updated feedback section
-                    st.markdown("<br>", unsafe_allow_html=True)
-                    st.markdown("**How's the recommendation?**")
-
-                    col_feedback1, col_feedback2 = st.columns([1, 1])
-
-                    with col_feedback1:
-                        if st.button("👍 Good", key="good"):
-                            st.success("Thanks for the feedback! 🙏")
-
-                    with col_feedback2:
-                        if st.button("👎 Bad", key="bad"):
-                            st.info("We'll work on improving our recommendations! ✨")
-
-                else:
-                    st.markdown(
-                        '<div class="alert-error">❌ No anime found in this dimension. Try a different search!</div>',
-                        unsafe_allow_html=True,
-                    )
-
-            except Exception as e:
-                st.markdown(
-                    f'<div class="alert-error">💥 Something went wrong in the anime matrix: {str(e)}</div>',
+        st.markdown("### 🎬 Your Anime Recommendations")
+        answer_placeholder = st.empty()
+        answer_placeholder.markdown(
+            '<div class="recommendation-card">🎭 Searching through the anime multiverse...</div>',
+            unsafe_allow_html=True,
+        )
+
+        try:
+            start_time = time.perf_counter()
+            first_token_ms = None
+            response = ""
+
+            # Render the answer incrementally as tokens arrive
+            for token in pipeline.stream_recommend(query):
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - start_time) * 1000
+                response += token
+                answer_placeholder.markdown(
+                    f'<div class="recommendation-card">{response}</div>',
+                    unsafe_allow_html=True,
+                )
+
+            if response:
+                st.caption(f"⚡ First recommendation token in {first_token_ms:.0f} ms")
+
+                # Updated feedback section
+                st.markdown("<br>", unsafe_allow_html=True)
+                st.markdown("**How's the recommendation?**")
+
+                col_feedback1, col_feedback2 = st.columns([1, 1])
+
+                with col_feedback1:
+                    if st.button("👍 Good", key="good"):
+                        st.success("Thanks for the feedback! 🙏")
+
+                with col_feedback2:
+                    if st.button("👎 Bad", key="bad"):
+                        st.info("We'll work on improving our recommendations! ✨")
+
+            else:
+                answer_placeholder.markdown(
+                    '<div class="alert-error">❌ No anime found in this dimension. Try a different search!</div>',
                     unsafe_allow_html=True,
                 )
 
+        except Exception as e:
+            answer_placeholder.markdown(
+                f'<div class="alert-error">💥 Something went wrong in the anime matrix: {str(e)}</div>',
+                unsafe_allow_html=True,
+            )
+
 with st.sidebar:
     st.markdown("### 🎌 How the Magic Works")
     steps = [
@@ -0,0 +1,101 @@
+"""Shared embedding server for the worker processes on one host.
+
+Run it with ``python -m app.embedding_server`` (``python -m app.server``
+starts one itself when ``EMBEDDING_SERVER_ADDRESS`` is set). It loads the
+sentence-transformer once and answers ``RemoteEmbeddings`` requests over a
+Unix socket that only the owning user can open, in a directory only that user
+can enter. Clients must also prove they hold ``EMBEDDING_SERVER_AUTHKEY``
+before a single message is unpickled.
+"""
+import os
+import threading
+
+from configs.config import EMBEDDING_SERVER_ADDRESS
+from src.embedding_backends import embedding_identity
+from src.embedding_cache import CachedEmbeddings
+from src.embedding_client import server_authkey
+from src.query_encoder import BatchingQueryEncoder
+from utils.logger import get_logger
+
+logger = get_logger()
+
+METHODS = ("embed_query", "embed_queries", "embed_documents", "identity")
+
+
+def _handle(connection, embeddings):
+    with connection:
+        while True:
+            try:
+                method, payload = connection.recv()
+            except (EOFError, OSError):
+                return
+
+            if method not in METHODS:
+                reply = ("error", f"Unknown method {method!r}")
+            else:
+                try:
+                    if method == "identity":
+                        # Lets workers check the model against their index manifest
+                        reply = ("ok", embedding_identity(embeddings))
+                    else:
+                        reply = ("ok", getattr(embeddings, method)(payload))
+                except Exception as e:
+                    logger.error(f"Embedding server failed on {method}: {str(e)}")
+                    reply = ("error", str(e))
+
+            try:
+                connection.send(reply)
+            except (EOFError, OSError):
+                return
+
+
+def _private_directory(address: str):
+    """Create the socket's directory with mode 0700, or check an existing one is private."""
+    directory = os.path.dirname(os.path.abspath(address))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.stat(directory)
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(
+            f"{directory} is accessible to other users; put the embedding socket in a private (0700) directory"
+        )
+
+
+def serve(address: str = EMBEDDING_SERVER_ADDRESS, authkey: str = None, embeddings=None):
+    from multiprocessing.connection import Listener
+
+    if not address:
+        raise ValueError("Set EMBEDDING_SERVER_ADDRESS to a Unix socket path")
+    # Peers' messages are unpickled, so only key holders may ever connect
+    authkey = server_authkey(authkey)
+    _private_directory(address)
+
+    # Queries from every worker on the host share one batching encoder
+    embeddings = embeddings or BatchingQueryEncoder(CachedEmbeddings())
+    # Load the weights before accepting, so the first client does not pay for it
+    embeddings.embed_query("warm up")
+
+    if os.path.exists(address):
+        os.remove(address)
+    old_umask = os.umask(0o177)
+    try:
+        listener = Listener(address, family="AF_UNIX", authkey=authkey)
+    finally:
+        os.umask(old_umask)
+    os.chmod(address, 0o600)
+
+    logger.info(f"Embedding server listening on {address}")
+    with listener:
+        while True:
+            try:
+                connection = listener.accept()
+            except Exception as e:
+                # A client that fails the auth handshake must not stop the server
+                logger.warning(f"Rejected embedding client: {str(e)}")
+                continue
+            threading.Thread(
+                target=_handle, args=(connection, embeddings), daemon=True, name="embedding-client"
+            ).start()
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,193 @@
+"""Headless HTTP API for the recommendation pipeline.
+
+Run it with ``python -m app.server`` (or ``uvicorn app.server:app --workers N``).
+Every worker process loads one shared AnimeRecommendationPipeline at startup.
+The index and docstore are memory-mapped, so workers share them through the
+page cache; with ``EMBEDDING_SERVER_ADDRESS`` set they also share a single
+embedding model served by ``app.embedding_server``. With several workers,
+each one publishes its metrics under ``METRICS_DIR`` and ``/metrics`` on any
+worker reports the sum over all of them.
+"""
+import asyncio
+import dataclasses
+import glob
+import multiprocessing
+import os
+import secrets
+import tempfile
+from contextlib import asynccontextmanager
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.concurrency import iterate_in_threadpool
+
+from configs.config import (
+    API_HOST,
+    API_KEEPALIVE_SECONDS,
+    API_PORT,
+    API_WORKERS,
+    EMBEDDING_SERVER_ADDRESS,
+    METRICS_DIR,
+    METRICS_ENABLED,
+    PERSIST_DIR,
+)
+from utils.logger import get_logger
+from utils.metrics import render_prometheus, share_metrics
+
+logger = get_logger()
+
+state = {"pipeline": None, "error": None, "warm_task": None}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from pipeline.pipeline import AnimeRecommendationPipeline
+
+    if METRICS_DIR:
+        share_metrics(METRICS_DIR)
+    try:
+        pipeline = await asyncio.to_thread(
+            AnimeRecommendationPipeline, persist_dir=PERSIST_DIR
+        )
+        # /readyz only passes once the model and index are actually warm
+        await asyncio.to_thread(pipeline.warm_up)
+        state["pipeline"] = pipeline
+        # Pre-fill the response cache from the query log without delaying readiness
+        state["warm_task"] = asyncio.create_task(asyncio.to_thread(pipeline.warm_caches))
+    except Exception as e:
+        # Stay up so /readyz can report the failure instead of crash-looping
+        logger.error(f"API worker failed to load the pipeline: {str(e)}")
+        state["error"] = str(e)
+    yield
+    state["pipeline"] = None
+
+
+app = FastAPI(title="GetAnime API", lifespan=lifespan)
+
+
+class RecommendRequest(BaseModel):
+    query: str = Field(min_length=3)
+
+
+class RetrieveRequest(BaseModel):
+    query: str = Field(min_length=1)
+    k: int = Field(default=4, ge=1, le=50)
+
+
+class SimilarRequest(BaseModel):
+    title: str = Field(min_length=1)
+    k: int = Field(default=10, ge=1, le=50)
+    explain: bool = False
+
+
+def get_pipeline():
+    if state["pipeline"] is None:
+        raise HTTPException(status_code=503, detail="Recommendation pipeline is not ready")
+    return state["pipeline"]
+
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    if state["pipeline"] is None:
+        raise HTTPException(
+            status_code=503, detail=state["error"] or "Pipeline is still loading"
+        )
+    return {"status": "ready"}
+
+
+@app.get("/metrics")
+async def metrics():
+    # Whichever worker takes the scrape reports the sum over every worker of the pod
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/recommend")
+async def recommend(request: RecommendRequest):
+    pipeline = get_pipeline()
+    try:
+        recommendation = await pipeline.arecommend(request.query)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"query": request.query, "recommendation": recommendation}
+
+
+@app.post("/recommend/stream")
+async def recommend_stream(request: RecommendRequest):
+    pipeline = get_pipeline()
+    return StreamingResponse(
+        iterate_in_threadpool(pipeline.stream_recommend(request.query)),
+        media_type="text/plain; charset=utf-8",
+    )
+
+
+@app.post("/retrieve")
+async def retrieve(request: RetrieveRequest):
+    pipeline = get_pipeline()
+    try:
+        documents = await asyncio.to_thread(pipeline.retrieve, request.query, request.k)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "query": request.query,
+        "documents": [
+            {"content": doc.page_content, "metadata": doc.metadata} for doc in documents
+        ],
+    }
+
+
+@app.post("/similar")
+async def similar(request: SimilarRequest):
+    pipeline = get_pipeline()
+    try:
+        result = await asyncio.to_thread(
+            pipeline.similar_titles, request.title, request.k, request.explain
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return dataclasses.asdict(result)
+
+
+def _prepare_metrics_dir():
+    """Give the workers one metrics directory to share, emptied of a previous run.
+
+    Returns None when nothing is shared: metrics are off, or a single worker
+    without ``METRICS_DIR`` keeps them in memory.
+    """
+    if not METRICS_ENABLED or not (METRICS_DIR or API_WORKERS > 1):
+        return None
+    directory = METRICS_DIR or tempfile.mkdtemp(prefix="getanime-metrics-")
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, "metrics-*.json")):
+        os.remove(path)
+    # Workers are fresh interpreters and read it from the environment
+    os.environ["METRICS_DIR"] = directory
+    return directory
+
+
+if __name__ == "__main__":
+    metrics_dir = _prepare_metrics_dir()
+    if metrics_dir:
+        logger.info(f"Aggregating metrics of {API_WORKERS} workers in {metrics_dir}")
+    if EMBEDDING_SERVER_ADDRESS:
+        from app.embedding_server import serve
+
+        if not os.getenv("EMBEDDING_SERVER_AUTHKEY"):
+            # Only this server and its workers ever need the key; they inherit it
+            os.environ["EMBEDDING_SERVER_AUTHKEY"] = secrets.token_hex(32)
+
+        # Workers wait for the socket, so the model loads while they start
+        multiprocessing.Process(target=serve, daemon=True, name="embedding-server").start()
+    uvicorn.run(
+        "app.server:app",
+        host=API_HOST,
+        port=API_PORT,
+        workers=API_WORKERS,
+        timeout_keep_alive=API_KEEPALIVE_SECONDS,
+    )
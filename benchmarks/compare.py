@@ -0,0 +1,46 @@
+"""Compare two benchmark result files: ``python -m benchmarks.compare base.json new.json``."""
+import argparse
+import json
+
+# Metrics where a larger number is an improvement; everything else is lower-is-better
+HIGHER_IS_BETTER = ("rows_per_s", "recall@")
+
+
+def flatten(data, prefix=""):
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("base")
+    parser.add_argument("new")
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+
+    print(f"base: {base['meta']['commit']}  new: {new['meta']['commit']}")
+    base_flat = flatten({k: v for k, v in base.items() if k != "meta"})
+    new_flat = flatten({k: v for k, v in new.items() if k != "meta"})
+
+    for name in sorted(set(base_flat) & set(new_flat)):
+        old_value, new_value = base_flat[name], new_flat[name]
+        change = (new_value - old_value) / old_value * 100 if old_value else 0.0
+        better = any(marker in name for marker in HIGHER_IS_BETTER)
+        flag = ""
+        if abs(change) >= 5:
+            flag = "better" if (change > 0) == better else "WORSE"
+        print(f"{name:55s} {old_value:>14.4f} {new_value:>14.4f} {change:>+8.1f}% {flag}")
+
+
+if __name__ == "__main__":
+    main()
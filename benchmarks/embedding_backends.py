@@ -0,0 +1,103 @@
+"""Embedding backend comparison: ``python -m benchmarks.embedding_backends``.
+
+Embeds a sample of the catalog and its labeled queries (see
+``run_benchmarks.labeled_queries``) with every backend and reports document
+throughput, single-query latency, recall@k with exact search, and how many
+of the fp32 top-k results each backend still returns. Speedups and recall
+deltas are relative to the fp32 baseline. Needs the real model weights.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.run_benchmarks import SOURCE_CSV, labeled_queries, latency_summary
+from src.data_loader import AnimeDataLoader
+from src.embedding_backends import EMBEDDING_BACKENDS
+from src.embedding_cache import CachedEmbeddings
+
+
+def load_corpus(n_titles: int, seed: int = 7):
+    df = AnimeDataLoader._process(pd.read_csv(SOURCE_CSV, encoding="utf-8", on_bad_lines="skip"))
+    df = df.sample(n=min(n_titles, len(df)), random_state=seed)
+    return df["MAL_ID"].to_numpy(), df["combined_info"].tolist(), df
+
+
+def measure(backend: str, texts, queries, batch_size: int):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # A fresh cache so every document is actually encoded
+        embeddings = CachedEmbeddings(
+            cache_dir=cache_dir, batch_size=batch_size, num_workers=1, backend=backend
+        )
+        embeddings.embed_query("warm up")
+
+        start = time.perf_counter()
+        documents = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+        build_s = time.perf_counter() - start
+
+        latencies = []
+        vectors = []
+        for query in queries:
+            start = time.perf_counter()
+            vectors.append(embeddings.embed_query(query["query"]))
+            latencies.append(time.perf_counter() - start)
+    return documents, np.asarray(vectors, dtype=np.float32), build_s, latency_summary(latencies)
+
+
+def top_k(documents, queries, k):
+    documents = documents / np.maximum(np.linalg.norm(documents, axis=1, keepdims=True), 1e-12)
+    queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+    return np.argsort(-(queries @ documents.T), axis=1, kind="stable")[:, :k]
+
+
+def run(n_titles: int = 1000, k: int = 4, batch_size: int = 64, backends=EMBEDDING_BACKENDS):
+    mal_ids, texts, df = load_corpus(n_titles)
+    with tempfile.TemporaryDirectory() as workdir:
+        # Label queries from the sampled titles only, so every answer is in the corpus
+        sample_csv = os.path.join(workdir, "sample.csv")
+        df.to_csv(sample_csv, index=False)
+        queries = labeled_queries(sample_csv)
+
+    results = {}
+    baseline_hits = None
+    for backend in backends:
+        documents, query_vectors, build_s, latency = measure(backend, texts, queries, batch_size)
+        hits = top_k(documents, query_vectors, k)
+        recall = np.mean([
+            len(set(mal_ids[row].tolist()) & set(query["relevant"])) / len(query["relevant"])
+            for row, query in zip(hits, queries)
+        ])
+        if baseline_hits is None:
+            baseline_hits = hits
+        overlap = np.mean([len(set(a) & set(b)) / k for a, b in zip(hits, baseline_hits)])
+        results[backend] = {
+            "docs_per_s": round(len(texts) / build_s, 1),
+            "query_latency": latency,
+            f"recall@{k}": round(float(recall), 4),
+            f"overlap@{k}_with_{backends[0]}": round(float(overlap), 4),
+        }
+
+    baseline = results[backends[0]]
+    for result in results.values():
+        result["build_speedup"] = round(result["docs_per_s"] / baseline["docs_per_s"], 2)
+        result["query_speedup"] = round(baseline["query_latency"]["p50_ms"] / result["query_latency"]["p50_ms"], 2)
+        result[f"recall@{k}_delta"] = round(result[f"recall@{k}"] - baseline[f"recall@{k}"], 4)
+    return {"titles": len(texts), "queries": len(queries), "k": k, "backends": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare embedding backends against fp32")
+    parser.add_argument("--titles", type=int, default=1000, help="Catalog titles to embed")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--backends", nargs="+", choices=EMBEDDING_BACKENDS, default=list(EMBEDDING_BACKENDS))
+    args = parser.parse_args()
+    print(json.dumps(run(args.titles, args.k, args.batch_size, tuple(args.backends)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Resilience scenarios for the LLM client: ``python -m benchmarks.llm_resilience``.
+
+Each scenario runs ResilientLLMClient against a local StubLLMServer and
+reports success rate and latency, so retry, hedging and circuit breaker
+settings can be checked without touching the real API.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.stub_llm_server import StubLLMServer
+from src.llm_client import CircuitBreaker, LLMError, ResilientLLMClient
+
+MESSAGES = [{"role": "user", "content": "Title: Cowboy Bebop Overview: space bounty hunters"}]
+
+
+def run_calls(client, calls):
+    latencies, errors = [], {}
+    for _ in range(calls):
+        start = time.perf_counter()
+        try:
+            client.complete(MESSAGES)
+            latencies.append(time.perf_counter() - start)
+        except LLMError as e:
+            name = type(e).__name__
+            errors[name] = errors.get(name, 0) + 1
+    latencies_ms = np.asarray(latencies or [0.0]) * 1000
+    return {
+        "calls": calls,
+        "succeeded": len(latencies),
+        "errors": errors,
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 1),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 1),
+    }
+
+
+def scenario(calls, server_kwargs, **client_kwargs):
+    server = StubLLMServer(**server_kwargs).start()
+    try:
+        client = ResilientLLMClient(
+            api_key="stub", model="stub", base_url=server.base_url, **client_kwargs
+        )
+        result = run_calls(client, calls)
+        result["upstream_requests"] = server.requests
+        return result
+    finally:
+        server.stop()
+
+
+def run(calls: int):
+    flaky = {"delay": 0.01, "fail_rate": 0.3, "fail_status": 503}
+    slow_tail = {"delay": 0.02, "slow_rate": 0.1, "slow_delay": 1.0}
+    outage = {"delay": 0.01, "fail_rate": 1.0, "fail_status": 500}
+    fast_retries = {"backoff": 0.01, "backoff_max": 0.05}
+    return {
+        "flaky_no_retries": scenario(calls, flaky, max_retries=0),
+        "flaky_with_retries": scenario(calls, flaky, **fast_retries),
+        "slow_tail": scenario(calls, slow_tail),
+        "slow_tail_hedged": scenario(calls, slow_tail, hedge=True, hedge_min_samples=10),
+        "outage_with_breaker": scenario(
+            calls, outage, breaker=CircuitBreaker(failure_threshold=5, reset_seconds=60), **fast_retries
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run LLM client resilience scenarios")
+    parser.add_argument("--calls", type=int, default=100)
+    args = parser.parse_args()
+    print(json.dumps(run(args.calls), indent=2))
+
+
+if __name__ == "__main__":
+    main()
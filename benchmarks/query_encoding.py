@@ -0,0 +1,129 @@
+"""Query encoding throughput: ``python -m benchmarks.query_encoding``.
+
+Compares one forward pass per query (the encoder called directly from each
+request thread) with BatchingQueryEncoder at 1, 8 and 32 concurrent callers.
+Every query is distinct and the embedding LRU is off, so the numbers measure
+batching alone; ``--repeat-rate`` replays a share of earlier queries to show
+the LRU on top. Uses the real model with ``--encoder model`` and a
+same-shaped random transformer (``TorchStubEncoder``) by default.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.run_benchmarks import SOURCE_CSV
+from src.query_encoder import BatchingQueryEncoder
+
+TEMPLATES = (
+    "anime like {}",
+    "something similar to {} but darker",
+    "recommend shows in the style of {}",
+    "{} with more action",
+)
+
+
+def load_queries(count: int, repeat_rate: float = 0.0, seed: int = 0):
+    names = pd.read_csv(SOURCE_CSV, usecols=["Name"])["Name"].dropna().astype(str).tolist()
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        if queries and rng.random() < repeat_rate:
+            queries.append(rng.choice(queries))
+        else:
+            queries.append(rng.choice(TEMPLATES).format(rng.choice(names)) + f" #{len(queries)}")
+    return queries
+
+
+def make_encoder(name: str):
+    if name == "model":
+        from src.embedding_cache import CachedEmbeddings
+
+        return CachedEmbeddings()
+    from benchmarks.stubs import TorchStubEncoder
+
+    return TorchStubEncoder()
+
+
+def run(embeddings, queries, concurrency: int):
+    """Embed ``queries`` from ``concurrency`` threads; return throughput and latency."""
+    latencies = []
+    lock = threading.Lock()
+    position = iter(range(len(queries)))
+
+    def worker():
+        while True:
+            with lock:
+                i = next(position, None)
+            if i is None:
+                return
+            start = time.perf_counter()
+            embeddings.embed_query(queries[i])
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    latencies_ms = np.asarray(latencies) * 1000
+    return {
+        "queries_per_s": round(len(queries) / wall, 1),
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 2),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 2),
+    }
+
+
+def benchmark(encoder: str, queries: int, levels, window_ms: float, max_batch: int, repeat_rate: float):
+    base = make_encoder(encoder)
+    base.embed_query("warm up")
+    results = []
+    for concurrency in levels:
+        texts = load_queries(queries, seed=concurrency)
+        direct = run(base, texts, concurrency)
+        batched = run(
+            BatchingQueryEncoder(base, window_ms=window_ms, max_batch=max_batch, cache_size=0),
+            texts,
+            concurrency,
+        )
+        result = {
+            "concurrency": concurrency,
+            "direct": direct,
+            "batched": batched,
+            "speedup": round(batched["queries_per_s"] / direct["queries_per_s"], 2),
+        }
+        if repeat_rate:
+            result["batched_with_lru"] = run(
+                BatchingQueryEncoder(base, window_ms=window_ms, max_batch=max_batch),
+                load_queries(queries, repeat_rate, seed=concurrency),
+                concurrency,
+            )
+        results.append(result)
+    return {"encoder": encoder, "queries": queries, "window_ms": window_ms, "max_batch": max_batch, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure batched query encoding throughput")
+    parser.add_argument("--encoder", choices=("stub", "model"), default="stub")
+    parser.add_argument("--queries", type=int, default=512)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--repeat-rate", type=float, default=0.0, help="Share of queries repeating an earlier one")
+    args = parser.parse_args()
+
+    report = benchmark(args.encoder, args.queries, args.concurrency, args.window_ms, args.max_batch, args.repeat_rate)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
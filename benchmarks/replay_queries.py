@@ -0,0 +1,106 @@
+"""Replay a recorded query log: ``python -m benchmarks.replay_queries``.
+
+``replay`` re-drives the log with its original inter-arrival times divided
+by ``--speed`` (0 sends as fast as ``--concurrency`` allows), against the
+HTTP API (``--api-url``) or an in-process pipeline. ``warm`` sends the most
+frequent recent queries once, e.g. to pre-fill a freshly deployed API
+server's caches (in-process pipelines do this themselves at startup, see
+``AnimeRecommendationPipeline.warm_caches``).
+"""
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from configs.config import CACHE_WARM_MAX_AGE_HOURS, PERSIST_DIR, QUERY_LOG_PATH
+from src.query_log import frequent_queries, read_query_log
+
+
+def load_schedule(path: str, limit: int = None):
+    """Return ``[(offset seconds from first record, query)]`` in log order."""
+    records = [r for r in read_query_log(path) if r.get("query")]
+    records.sort(key=lambda r: r.get("ts", 0))
+    if limit:
+        records = records[:limit]
+    if not records:
+        return []
+    first = records[0].get("ts", 0)
+    return [(r.get("ts", first) - first, r["query"]) for r in records]
+
+
+def make_target(api_url: str = None):
+    if api_url:
+        from src.api_client import RecommendationAPIClient
+
+        return RecommendationAPIClient(api_url).recommend
+
+    from pipeline.pipeline import AnimeRecommendationPipeline
+
+    return AnimeRecommendationPipeline(persist_dir=PERSIST_DIR).recommend
+
+
+def replay(schedule, send, speed: float = 1.0, concurrency: int = 16):
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def run(query):
+        start = time.perf_counter()
+        try:
+            send(query)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+        except Exception as e:
+            with lock:
+                errors.append(str(e))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for offset, query in schedule:
+            if speed > 0:
+                delay = offset / speed - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            pool.submit(run, query)
+    wall = time.perf_counter() - started
+
+    latencies_ms = np.asarray(latencies or [0.0]) * 1000
+    return {
+        "requests": len(schedule),
+        "succeeded": len(latencies),
+        "errors": len(errors),
+        "wall_s": round(wall, 2),
+        "throughput_qps": round(len(schedule) / wall, 2) if wall else None,
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 1),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded query log")
+    parser.add_argument("mode", choices=("replay", "warm"))
+    parser.add_argument("--log", default=QUERY_LOG_PATH, help="Query log to read")
+    parser.add_argument("--api-url", help="Send to this API server instead of an in-process pipeline")
+    parser.add_argument("--speed", type=float, default=1.0, help="Time scale: 2 = twice as fast, 0 = no pacing")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--limit", type=int, help="Replay only the first N records")
+    parser.add_argument("--top", type=int, default=50, help="warm: number of frequent queries")
+    parser.add_argument("--max-age-hours", type=float, default=CACHE_WARM_MAX_AGE_HOURS)
+    args = parser.parse_args()
+
+    if args.mode == "warm":
+        max_age = args.max_age_hours * 3600 if args.max_age_hours else None
+        schedule = [(0.0, query) for query in frequent_queries(args.log, args.top, max_age)]
+        args.speed = 0
+    else:
+        schedule = load_schedule(args.log, args.limit)
+    if not schedule:
+        raise SystemExit(f"No queries found in {args.log}")
+    print(json.dumps(replay(schedule, make_target(args.api_url), args.speed, args.concurrency), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""Offline benchmark suite: ``python -m benchmarks.run_benchmarks``.
+
+Runs without network access or API keys by using HashingEmbeddings and
+StubChatModel. Measures build throughput, index size on disk, retriever
+p50/p99 latency and recall@k on a labeled query set drawn from the catalog,
+and writes everything to a JSON file that ``benchmarks.compare`` can diff.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.stubs import HashingEmbeddings, StubChatModel
+from src.ann_index import default_index_config
+from src.data_loader import AnimeDataLoader
+from src.hybrid_retriever import HybridRetriever
+from src.lexical_index import BM25Index
+from src.reranker import Reranker
+from src.response_cache import ResponseCache
+from src.vector_store import VectorStoreBuilder
+
+SOURCE_CSV = "data/anime_with_synopsis.csv"
+RESULTS_DIR = os.path.join("benchmarks", "results")
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def labeled_queries(csv_path: str, n_titles: int = 50, seed: int = 7):
+    """Two queries per sampled title, each labeled with that title's MAL_ID.
+
+    ``synopsis`` queries are the opening words of the synopsis and mostly
+    exercise dense recall; ``title`` queries name the show.
+    """
+    df = pd.read_csv(csv_path, encoding="utf-8", on_bad_lines="skip").dropna()
+    sample = df.sample(n=min(n_titles, len(df)), random_state=seed)
+
+    queries = []
+    for row in sample.itertuples(index=False):
+        opening = " ".join(str(row.Synopsis).split()[:20])
+        queries.append({"kind": "synopsis", "query": opening, "relevant": [int(row.MAL_ID)]})
+        queries.append({"kind": "title", "query": f"something like {row.Name}", "relevant": [int(row.MAL_ID)]})
+    return queries
+
+
+def latency_summary(latencies_s):
+    latencies_ms = np.asarray(latencies_s) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 4),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 4),
+        "mean_ms": round(float(latencies_ms.mean()), 4),
+    }
+
+
+def bench_build(workdir: str, index_config: dict):
+    processed_csv = os.path.join(workdir, "processed.csv")
+    persist_dir = os.path.join(workdir, "faiss_db")
+
+    start = time.perf_counter()
+    loader = AnimeDataLoader(SOURCE_CSV, processed_csv)
+    loader.load_and_process()
+    builder = VectorStoreBuilder(
+        csv_path=processed_csv,
+        persist_directory=persist_dir,
+        index_config=index_config,
+        embeddings=HashingEmbeddings(),
+    )
+    builder.build_and_save_vectorstore()
+    BM25Index.build(loader.load_dataframe()).save(persist_dir)
+    seconds = time.perf_counter() - start
+
+    rows = len(pd.read_csv(processed_csv, encoding="utf-8"))
+    return persist_dir, {
+        "rows": rows,
+        "seconds": round(seconds, 4),
+        "rows_per_s": round(rows / seconds, 2),
+    }
+
+
+def index_size(persist_dir: str):
+    files = {}
+    for root, _, names in os.walk(persist_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            files[os.path.relpath(path, persist_dir)] = os.path.getsize(path)
+    return {"total_bytes": sum(files.values()), "files": dict(sorted(files.items()))}
+
+
+def bench_retriever(retriever, queries, k: int, repeats: int):
+    latencies = []
+    hits = {}
+    totals = {}
+    for _ in range(repeats):
+        for item in queries:
+            start = time.perf_counter()
+            documents = retriever.retrieve(item["query"], k=k)
+            latencies.append(time.perf_counter() - start)
+
+            found = {int(doc.metadata["MAL_ID"]) for doc in documents}
+            kind = item["kind"]
+            totals[kind] = totals.get(kind, 0) + 1
+            hits[kind] = hits.get(kind, 0) + bool(found & set(item["relevant"]))
+
+    result = latency_summary(latencies)
+    result[f"recall@{k}"] = round(sum(hits.values()) / sum(totals.values()), 4)
+    for kind in totals:
+        result[f"recall@{k}_{kind}"] = round(hits[kind] / totals[kind], 4)
+    return result
+
+
+def bench_pipeline(pipeline, queries, repeats: int):
+    latencies = []
+    for _ in range(repeats):
+        for item in queries:
+            start = time.perf_counter()
+            pipeline.recommend(item["query"])
+            latencies.append(time.perf_counter() - start)
+    return latency_summary(latencies)
+
+
+def bench_reranker(k: int, n_candidates: int = 300, dim: int = 384, repeats: int = 200):
+    """Rerank cost alone, on random unit vectors shaped like a wide candidate pool."""
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(n_candidates, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = rng.uniform(5, 9, size=n_candidates).astype(np.float32)
+    reranker = Reranker()
+    latencies = []
+    for _ in range(repeats):
+        query = rng.normal(size=dim).astype(np.float32)
+        start = time.perf_counter()
+        reranker.rerank(query, vectors, scores, k)
+        latencies.append(time.perf_counter() - start)
+    return {"candidates": n_candidates, **latency_summary(latencies)}
+
+
+def run(k: int = 4, repeats: int = 3, n_titles: int = 50):
+    from pipeline.pipeline import AnimeRecommendationPipeline
+
+    queries = labeled_queries(SOURCE_CSV, n_titles=n_titles)
+    index_config = default_index_config()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        persist_dir, build = bench_build(workdir, index_config)
+
+        # Response cache disabled so every call pays retrieval + (stub) LLM
+        pipeline = AnimeRecommendationPipeline(
+            persist_dir=persist_dir,
+            response_cache=ResponseCache(max_entries=0),
+            embeddings=HashingEmbeddings(),
+            llm=StubChatModel(),
+        )
+        dense = HybridRetriever(
+            vector_store=pipeline.vector_store, lexical_index=None, vectors=pipeline.retriever.vectors
+        )
+        no_rerank = HybridRetriever(
+            vector_store=pipeline.vector_store,
+            lexical_index=pipeline.retriever.lexical_index,
+            vectors=pipeline.retriever.vectors,
+        )
+
+        return {
+            "meta": {
+                "commit": git_commit(),
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "index": index_config,
+                "k": k,
+                "queries": len(queries),
+                "repeats": repeats,
+            },
+            "build": build,
+            "index_size": index_size(persist_dir),
+            "retrieval": {
+                "hybrid": bench_retriever(pipeline.retriever, queries, k, repeats),
+                "hybrid_no_rerank": bench_retriever(no_rerank, queries, k, repeats),
+                "dense": bench_retriever(dense, queries, k, repeats),
+            },
+            "rerank": bench_reranker(k),
+            "pipeline": bench_pipeline(pipeline, queries, repeats=1),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--titles", type=int, default=50, help="Titles in the labeled query set")
+    parser.add_argument("--output", help="Defaults to benchmarks/results/<commit>.json")
+    args = parser.parse_args()
+
+    results = run(k=args.k, repeats=args.repeats, n_titles=args.titles)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{results['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps({key: results[key] for key in ("build", "retrieval", "pipeline")}, indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
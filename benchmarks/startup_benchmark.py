@@ -0,0 +1,63 @@
+"""Cold-start benchmark: run in a fresh interpreter with ``python -m benchmarks.startup_benchmark``.
+
+Reports import, model-load, index-load and warm-up time separately as JSON.
+"""
+import argparse
+import json
+import time
+
+_start = time.perf_counter()
+
+
+def _timed(timings, name, fn):
+    start = time.perf_counter()
+    result = fn()
+    timings[name] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--persist-dir", help="Index root (default: PERSIST_DIR)")
+    parser.add_argument("--output", help="Optional path to write the JSON report to")
+    args = parser.parse_args()
+
+    timings = {}
+
+    # Application modules only; heavy libraries are deferred until first use
+    _timed(timings, "import_app_s", lambda: __import__("pipeline.pipeline"))
+
+    def import_heavy():
+        import sentence_transformers  # noqa: F401
+        import langchain_community.vectorstores  # noqa: F401
+        import src.llm_client  # noqa: F401
+
+    _timed(timings, "import_deferred_s", import_heavy)
+
+    from configs.config import PERSIST_DIR
+    from src.index_versions import resolve_index_dir
+    from src.vector_store import VectorStoreBuilder
+
+    builder = VectorStoreBuilder(
+        csv_path="data/processed_anime_data.csv",
+        persist_directory=resolve_index_dir(args.persist_dir or PERSIST_DIR),
+    )
+    _timed(timings, "model_load_s", lambda: builder.embeddings.model)
+    vector_store = _timed(timings, "index_load_s", builder.load_vector_store)
+
+    def warm_up():
+        query_embedding = builder.embeddings.embed_query("warm up")
+        vector_store.similarity_search_by_vector(query_embedding, k=1)
+
+    _timed(timings, "warm_up_s", warm_up)
+    timings["total_s"] = round(time.perf_counter() - _start, 4)
+
+    report = json.dumps(timings, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Local OpenAI-compatible chat completions server for exercising the LLM client.
+
+``python -m benchmarks.stub_llm_server --port 8100 --fail-rate 0.2 --slow-rate 0.1``
+then point ``LLM_BASE_URL`` at ``http://127.0.0.1:8100/v1``. Answers are built
+like StubChatModel's; latency and failures are injected per request.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.stubs import stub_answer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        status, delay = server.next_behaviour()
+        time.sleep(delay)
+        if status != 200:
+            headers = {"Retry-After": str(server.retry_after)} if status == 429 else None
+            self._send_json(status, {"error": {"message": f"injected HTTP {status}"}}, headers)
+            return
+
+        prompt = body["messages"][-1]["content"]
+        answer = stub_answer(prompt)
+        usage = {
+            "prompt_tokens": len(prompt.split()),
+            "completion_tokens": len(answer.split()),
+            "total_tokens": len(prompt.split()) + len(answer.split()),
+        }
+        if not body.get("stream"):
+            self._send_json(200, {
+                "id": "stub",
+                "object": "chat.completion",
+                "model": body.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, word in enumerate(answer.split(" ")):
+            delta = {"content": word if i == 0 else " " + word}
+            self._write_chunk({"choices": [{"index": 0, "delta": delta}]})
+            time.sleep(server.token_delay)
+        self._write_chunk({"choices": [], "usage": usage})
+        self._write_chunk("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, event):
+        data = event if isinstance(event, str) else json.dumps(event)
+        payload = f"data: {data}\n\n".encode("utf-8")
+        self.wfile.write(f"{len(payload):x}\r\n".encode("ascii") + payload + b"\r\n")
+        self.wfile.flush()
+
+
+class StubLLMServer(ThreadingHTTPServer):
+    """Chat completions stub with injectable latency and failures.
+
+    ``script`` is a list of HTTP statuses served to the first requests in
+    order (e.g. ``[503, 503, 200]``); after it runs out each request fails
+    with ``fail_status`` at ``fail_rate`` and is delayed by ``slow_delay``
+    instead of ``delay`` at ``slow_rate``.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        delay=0.0,
+        slow_rate=0.0,
+        slow_delay=2.0,
+        fail_rate=0.0,
+        fail_status=503,
+        retry_after=0,
+        token_delay=0.0,
+        script=None,
+        seed=0,
+    ):
+        super().__init__((host, port), _Handler)
+        self.delay = delay
+        self.slow_rate = slow_rate
+        self.slow_delay = slow_delay
+        self.fail_rate = fail_rate
+        self.fail_status = fail_status
+        self.retry_after = retry_after
+        self.token_delay = token_delay
+        self.script = list(script or [])
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def next_behaviour(self):
+        with self._lock:
+            self.requests += 1
+            if self.script:
+                return self.script.pop(0), self.delay
+            status = self.fail_status if self._random.random() < self.fail_rate else 200
+            delay = self.slow_delay if self._random.random() < self.slow_rate else self.delay
+            return status, delay
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True, name="stub-llm").start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--delay", type=float, default=0.05, help="Normal response latency (s)")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction of slow responses")
+    parser.add_argument("--slow-delay", type=float, default=2.0, help="Latency of slow responses (s)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of failed responses")
+    parser.add_argument("--fail-status", type=int, default=503)
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Delay between streamed tokens (s)")
+    args = parser.parse_args()
+
+    server = StubLLMServer(
+        host=args.host,
+        port=args.port,
+        delay=args.delay,
+        slow_rate=args.slow_rate,
+        slow_delay=args.slow_delay,
+        fail_rate=args.fail_rate,
+        fail_status=args.fail_status,
+        token_delay=args.token_delay,
+    )
+    print(f"Stub LLM server listening on {server.base_url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
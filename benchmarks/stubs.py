@@ -0,0 +1,100 @@
+import re
+import zlib
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import SimpleChatModel
+
+_TOKEN_RE = re.compile(r"\w+")
+_TITLE_RE = re.compile(r"Title: (.*?) Overview:")
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic, network-free embeddings: signed feature hashing of word tokens.
+
+    Similar texts share tokens and therefore have similar vectors, which is
+    enough to benchmark retrieval mechanics without the real model.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _embed(self, text: str):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in _TOKEN_RE.findall(text.lower()):
+            h = zlib.crc32(token.encode("utf-8"))
+            vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_documents(self, texts):
+        return [self._embed(text).tolist() for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text).tolist()
+
+    def embed_queries(self, texts):
+        return self.embed_documents(texts)
+
+
+def stub_answer(prompt: str) -> str:
+    titles = _TITLE_RE.findall(prompt)[:3]
+    return "\n".join(
+        f"{i}. {title} - matches the requested themes." for i, title in enumerate(titles, 1)
+    ) or "I don't know."
+
+
+class StubChatModel(SimpleChatModel):
+    """Stands in for the LLM: answers with the first three titles in the prompt."""
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs) -> str:
+        return stub_answer(messages[-1].content)
+
+
+class TorchStubEncoder(Embeddings):
+    """Randomly initialised transformer with all-MiniLM-L6-v2's shape.
+
+    The vectors are meaningless, but a forward pass costs about what the real
+    model costs on CPU, so batching and threading effects can be measured
+    without downloading weights.
+    """
+
+    def __init__(self, dim: int = 384, layers: int = 6, heads: int = 12, max_tokens: int = 32, seed: int = 0):
+        import torch
+
+        torch.manual_seed(seed)
+        self.torch = torch
+        self.max_tokens = max_tokens
+        self.vocab = 30522
+        self.embedding = torch.nn.Embedding(self.vocab, dim)
+        layer = torch.nn.TransformerEncoderLayer(dim, heads, dim_feedforward=4 * dim, batch_first=True)
+        self.encoder = torch.nn.TransformerEncoder(layer, layers, enable_nested_tensor=False).eval()
+
+    def _token_ids(self, texts):
+        ids = [
+            [zlib.crc32(token.encode("utf-8")) % self.vocab for token in _TOKEN_RE.findall(text.lower())][: self.max_tokens] or [0]
+            for text in texts
+        ]
+        width = max(len(row) for row in ids)
+        mask = [[False] * len(row) + [True] * (width - len(row)) for row in ids]
+        padded = [row + [0] * (width - len(row)) for row in ids]
+        return self.torch.tensor(padded), self.torch.tensor(mask)
+
+    def embed_documents(self, texts):
+        ids, mask = self._token_ids(texts)
+        with self.torch.inference_mode():
+            hidden = self.encoder(self.embedding(ids), src_key_padding_mask=mask)
+            keep = (~mask).unsqueeze(-1).float()
+            pooled = (hidden * keep).sum(1) / keep.sum(1)
+            pooled = self.torch.nn.functional.normalize(pooled, dim=1)
+        return pooled.numpy().tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    def embed_queries(self, texts):
+        return self.embed_documents(texts)
@@ -5,3 +5,130 @@ load_dotenv()
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 MODEL_NAME = "llama-3.1-8b-instant"
+
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+# Embedding inference backend: "fp32" or "int8" (dynamically quantized, CPU only)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "fp32")
+EMBEDDING_MODEL_DIR = os.getenv("EMBEDDING_MODEL_DIR", "models")
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "embedding_cache")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", str(os.cpu_count() or 1)))
+
+# Serving-time query encoding: concurrent queries are batched for up to the window
+# (0 batches only what is already queued) and recent embeddings kept in an LRU
+QUERY_BATCHING = os.getenv("QUERY_BATCHING", "true").lower() == "true"
+QUERY_BATCH_WINDOW_MS = float(os.getenv("QUERY_BATCH_WINDOW_MS", "2"))
+QUERY_BATCH_MAX_SIZE = int(os.getenv("QUERY_BATCH_MAX_SIZE", "32"))
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+# Longest a request waits for its batch before giving up on the encoder
+QUERY_ENCODE_TIMEOUT_SECONDS = float(os.getenv("QUERY_ENCODE_TIMEOUT_SECONDS", "30"))
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.95"))
+
+PERSIST_DIR = os.getenv("PERSIST_DIR", "faiss_db")
+# Production images bake the index at build time and must never build it per request
+ALLOW_RUNTIME_BUILD = os.getenv("ALLOW_RUNTIME_BUILD", "true").lower() == "true"
+RECOMMENDER_API_URL = os.getenv("RECOMMENDER_API_URL")
+API_HOST = os.getenv("API_HOST", "0.0.0.0")
+API_PORT = int(os.getenv("API_PORT", "8000"))
+API_WORKERS = int(os.getenv("API_WORKERS", "2"))
+API_KEEPALIVE_SECONDS = int(os.getenv("API_KEEPALIVE_SECONDS", "75"))
+API_TIMEOUT_SECONDS = float(os.getenv("API_TIMEOUT_SECONDS", "60"))
+
+RETRIEVER_K = int(os.getenv("RETRIEVER_K", "4"))
+RETRIEVER_FETCH_K = int(os.getenv("RETRIEVER_FETCH_K", "20"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+SKIP_DENSE_ON_TITLE_MATCH = os.getenv("SKIP_DENSE_ON_TITLE_MATCH", "true").lower() == "true"
+TITLE_MATCH_MIN_TOKENS = int(os.getenv("TITLE_MATCH_MIN_TOKENS", "2"))
+
+# Post-retrieval rerank: MMR over the top RERANK_CANDIDATES fused titles with the MAL
+# Score as a prior. DIVERSITY 0 ranks by relevance only; 1 ignores relevance.
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "true").lower() == "true"
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "40"))
+RERANK_SIMILARITY_WEIGHT = float(os.getenv("RERANK_SIMILARITY_WEIGHT", "1.0"))
+RERANK_SCORE_WEIGHT = float(os.getenv("RERANK_SCORE_WEIGHT", "0.2"))
+RERANK_DIVERSITY = float(os.getenv("RERANK_DIVERSITY", "0.3"))
+
+# ANN index: "flat" (exact), "hnsw" or "ivfpq"
+INDEX_TYPE = os.getenv("INDEX_TYPE", "flat")
+HNSW_M = int(os.getenv("HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+IVF_NLIST = int(os.getenv("IVF_NLIST", "1024"))
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "16"))
+PQ_M = int(os.getenv("PQ_M", "16"))
+PQ_NBITS = int(os.getenv("PQ_NBITS", "8"))
+# Serve the index memory-mapped from PERSIST_DIR so worker processes share it via the page cache
+INDEX_MMAP = os.getenv("INDEX_MMAP", "true").lower() == "true"
+# Builds publish versioned directories under PERSIST_DIR; keep this many (the live one included)
+INDEX_KEEP_VERSIONS = int(os.getenv("INDEX_KEEP_VERSIONS", "2"))
+# How often (seconds) a running pipeline checks PERSIST_DIR for a newly published version
+INDEX_RELOAD_INTERVAL = float(os.getenv("INDEX_RELOAD_INTERVAL", "1"))
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# Log every timing span as a JSON line (otherwise spans only feed histograms)
+LOG_SPANS = os.getenv("LOG_SPANS", "false").lower() == "true"
+# Port for a standalone /metrics endpoint in processes without the HTTP API (Streamlit)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+# Directory where each process of a multi-worker server publishes its metrics, so
+# /metrics on any worker reports the sum over all of them (empty: this process only)
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "1"))
+
+# Approximate token budget for the retrieved context in the prompt (0 disables trimming)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "800"))
+CONTEXT_MAX_SENTENCES = int(os.getenv("CONTEXT_MAX_SENTENCES", "3"))
+# How chunk similarities combine into a title score: "max" (best chunk) or "sum"
+TITLE_AGGREGATION = os.getenv("TITLE_AGGREGATION", "max")
+
+# Streaming builds: source rows per batch and batches buffered between stages
+STREAM_CHUNK_ROWS = int(os.getenv("STREAM_CHUNK_ROWS", "1000"))
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "2"))
+
+# LLM client: any OpenAI-compatible chat completions endpoint (Groq by default)
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.groq.com/openai/v1")
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_SECONDS = float(os.getenv("LLM_BACKOFF_SECONDS", "0.5"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "8"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+# Send a duplicate request once a call runs longer than the observed p95
+LLM_HEDGE = os.getenv("LLM_HEDGE", "false").lower() == "true"
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+# "More like this": neighbours kept per title and rows per matmul block at build time
+SIMILAR_TOP_N = int(os.getenv("SIMILAR_TOP_N", "20"))
+SIMILARITY_BLOCK_ROWS = int(os.getenv("SIMILARITY_BLOCK_ROWS", "1024"))
+
+# Curated queries (the app's category list) answered at build time and served from disk
+CURATED_QUERIES = [
+    query.strip()
+    for query in os.getenv(
+        "CURATED_QUERIES",
+        "School life romance;Dark fantasy adventure;Slice of life cooking;"
+        "Supernatural powers;Modern Tokyo setting;Comedy workplace",
+    ).split(";")
+    if query.strip()
+]
+
+# Sampled query log (JSON lines) used for cache warming and load replay
+QUERY_LOG_ENABLED = os.getenv("QUERY_LOG_ENABLED", "false").lower() == "true"
+QUERY_LOG_PATH = os.getenv("QUERY_LOG_PATH", os.path.join("logs", "query_log.jsonl"))
+QUERY_LOG_SAMPLE_RATE = float(os.getenv("QUERY_LOG_SAMPLE_RATE", "1.0"))
+# Most frequent logged queries answered at startup to pre-fill the caches (0 disables)
+CACHE_WARM_QUERIES = int(os.getenv("CACHE_WARM_QUERIES", "0"))
+CACHE_WARM_MAX_AGE_HOURS = float(os.getenv("CACHE_WARM_MAX_AGE_HOURS", "24"))
+
+# Shared embedding server: a Unix socket path such as /tmp/getanime/embed.sock,
+# in a directory only this user can access (created with mode 0700 if missing).
+# When set, pipelines send queries there instead of loading their own model.
+EMBEDDING_SERVER_ADDRESS = os.getenv("EMBEDDING_SERVER_ADDRESS", "")
+# Shared secret clients authenticate with. No default: ``python -m app.server``
+# generates one per start when unset; a standalone server refuses to start
+EMBEDDING_SERVER_AUTHKEY = os.getenv("EMBEDDING_SERVER_AUTHKEY", "")
+# How long a client waits for the server to come up (it loads the model first)
+EMBEDDING_SERVER_CONNECT_TIMEOUT = float(os.getenv("EMBEDDING_SERVER_CONNECT_TIMEOUT", "60"))
@@ -0,0 +1,31 @@
+import os
+from configs.config import EMBEDDING_MODEL_NAME
+from src.embedding_cache import baked_model_path
+from pipeline.build_pipeline import main as build_main
+from utils.logger import get_logger
+from utils.custom_exception import CustomException
+
+logger = get_logger()
+
+
+def main():
+    """Bake model weights and the vector store into the image at build time."""
+    try:
+        model_path = baked_model_path(EMBEDDING_MODEL_NAME)
+        if not os.path.isdir(model_path):
+            from sentence_transformers import SentenceTransformer
+
+            logger.info(f"Saving {EMBEDDING_MODEL_NAME} weights to {model_path}")
+            SentenceTransformer(EMBEDDING_MODEL_NAME).save(model_path)
+
+        # Incremental so an index copied into the build context is reused
+        build_main(incremental=True)
+        logger.info("Artifacts baked successfully!")
+
+    except Exception as e:
+        logger.error(f"Baking artifacts failed: {str(e)}")
+        raise CustomException("Baking artifacts failed") from e
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,15 @@
+import argparse
+import os
+from configs.config import CURATED_QUERIES, GROQ_API_KEY, PERSIST_DIR, STREAM_CHUNK_ROWS
+from src.ann_index import INDEX_TYPES, build_index_report, index_config, write_index_report
 from src.data_loader import AnimeDataLoader
-from src.vector_store import VectorStoreBuilder
+from src.curated_answers import CuratedAnswers
+from src.doc_store import ColumnarDocStore
+from src.embedding_backends import EMBEDDING_BACKENDS
+from src.index_versions import resolve_index_dir, staged_version
+from src.lexical_index import LEXICAL_INDEX_FILE, BM25Index
+from src.similarity_graph import SIMILARITY_DIR, SimilarityGraph
+from src.vector_store import VectorStoreBuilder, read_index_version
 from dotenv import load_dotenv
 from utils.logger import get_logger
 from utils.custom_exception import CustomException
@@ -8,24 +18,121 @@ load_dotenv()
 logger = get_logger()
 
 
-def main():
+def build_curated_answers(persist_dir: str = PERSIST_DIR, queries=CURATED_QUERIES, llm=None, embeddings=None):
+    """Answer the curated queries against the current index and store them next to it.
+
+    Skipped when the stored answers already belong to this index version and
+    cover every query, so only catalog (or query list) changes pay for LLM calls.
+    Pass the build's ``embeddings`` so queries are encoded the way the index was.
+    """
+    from pipeline.pipeline import AnimeRecommendationPipeline
+    from src.response_cache import ResponseCache
+
+    persist_dir = resolve_index_dir(persist_dir)
+    version = read_index_version(persist_dir)
+    existing = CuratedAnswers.load(persist_dir, version)
+    if existing is not None and existing.covers(queries):
+        logger.info(f"Curated answers are up to date for index {version}")
+        return existing
+    if llm is None and not GROQ_API_KEY:
+        logger.warning("GROQ_API_KEY is not set, skipping curated answers")
+        return None
+
+    pipeline = AnimeRecommendationPipeline(
+        persist_dir=persist_dir,
+        response_cache=ResponseCache(max_entries=0),
+        embeddings=embeddings,
+        llm=llm,
+        curated_answers=False,
+    )
+    answers = CuratedAnswers.generate(pipeline, queries, version)
+    answers.save(persist_dir)
+    logger.info(f"Stored {len(answers)}/{len(queries)} curated answers for index {version}")
+    return answers
+
+
+def main(
+    incremental: bool = False,
+    batch_size: int = None,
+    num_workers: int = None,
+    index_type: str = None,
+    index_report: bool = False,
+    streaming: bool = False,
+    chunk_rows: int = None,
+    embedding_backend: str = None,
+    curated: bool = True,
+    llm=None,
+    embeddings=None,
+    persist_dir: str = PERSIST_DIR,
+):
     try:
         logger.info("Starting the build pipeline...")
 
-        # Step 1: Load and process data
-        loader = AnimeDataLoader(
-            "data/anime_with_synopsis.csv", "data/processed_anime_data.csv"
-        )
-        loader.load_and_process()
-        logger.info("Data processing completed successfully!")
-
-        # Step 2: Build vector store with FAISS
-        vector_builder = VectorStoreBuilder(
-            csv_path="data/processed_anime_data.csv",
-            persist_directory="faiss_db",  # Changed from chroma_db to faiss_db
-        )
-        vector_builder.build_and_save_vectorstore()
-        logger.info("Vector store built and saved successfully!")
+        # Everything is built into a fresh version directory under persist_dir
+        # and published in one atomic step; running pipelines swap it in live
+        with staged_version(persist_dir) as build_dir:
+            previous_version = read_index_version(build_dir)
+
+            # Step 1: Load and process data
+            loader = AnimeDataLoader(
+                "data/anime_with_synopsis.csv", "data/processed_anime_data.csv"
+            )
+            chunk_rows = chunk_rows or STREAM_CHUNK_ROWS
+            loader.load_and_process(chunksize=chunk_rows if streaming else None)
+            logger.info("Data processing completed successfully!")
+
+            # Step 2: Build vector store with FAISS
+            vector_builder = VectorStoreBuilder(
+                csv_path="data/processed_anime_data.csv",
+                persist_directory=build_dir,
+                batch_size=batch_size,
+                num_workers=num_workers,
+                index_config=index_config(index_type) if index_type else None,
+                embedding_backend=embedding_backend,
+                embeddings=embeddings,
+            )
+            if incremental:
+                # Only re-embed titles whose content hash changed since the last build
+                vector_builder.update_vectorstore()
+            elif streaming:
+                # Read, embed and insert batch by batch: embeddings are never
+                # all in memory, though the index and per-title bookkeeping are
+                vector_builder.build_streaming(chunk_rows=chunk_rows)
+            else:
+                vector_builder.build_and_save_vectorstore()
+            logger.info("Vector store built and saved successfully!")
+
+            # The manifest version only moves when the vector store was rewritten,
+            # and the lexical index and graph derive from the same rows
+            derived_current = (
+                read_index_version(build_dir) == previous_version
+                and os.path.exists(os.path.join(build_dir, LEXICAL_INDEX_FILE))
+                and os.path.exists(os.path.join(build_dir, SIMILARITY_DIR, "graph.json"))
+            )
+            if derived_current:
+                logger.info("Catalog unchanged, keeping the lexical index and similarity graph")
+            else:
+                # Step 3: Build the lexical (BM25) index next to the vector store.
+                # Its postings are held in memory whole, streaming or not
+                source = loader.iter_chunks(chunk_rows) if streaming else loader.load_dataframe()
+                BM25Index.build(source).save(build_dir)
+                logger.info("Lexical index built and saved successfully!")
+
+                # Step 4: Precompute the title-to-title nearest neighbour graph
+                # (holds one averaged vector per title in memory)
+                store = ColumnarDocStore(build_dir)
+                SimilarityGraph.build(vector_builder.load_vectors(), store.mal_ids).save(build_dir)
+                logger.info("Similarity graph built and saved successfully!")
+
+            if curated:
+                # Step 5: Pre-answer the curated queries for this index version
+                build_curated_answers(build_dir, llm=llm, embeddings=vector_builder.embeddings)
+
+            if index_report:
+                # Recall@k against exact search and p50/p99 latency per index type
+                report = build_index_report(vector_builder.load_vectors())
+                path = write_index_report(report, build_dir)
+                logger.info(f"Index report written to {path}")
 
         logger.info("Build pipeline completed successfully!")
 
@@ -35,4 +142,53 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Build the anime vector store")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only embed new or changed titles and drop removed ones",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, help="Texts per encoder batch (cache misses only)"
+    )
+    parser.add_argument(
+        "--workers", type=int, help="Encoder processes used for large cache misses"
+    )
+    parser.add_argument(
+        "--index-type", choices=INDEX_TYPES, help="ANN index to serve (default: INDEX_TYPE)"
+    )
+    parser.add_argument(
+        "--index-report",
+        action="store_true",
+        help="Write index_report.json (in the published version) comparing recall and latency per index type",
+    )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Full build that reads, embeds and inserts the catalog in chunks, never holding all embeddings",
+    )
+    parser.add_argument(
+        "--chunk-rows", type=int, help="Source rows per streaming batch (default: STREAM_CHUNK_ROWS)"
+    )
+    parser.add_argument(
+        "--embedding-backend",
+        choices=EMBEDDING_BACKENDS,
+        help="Embedding inference backend (default: EMBEDDING_BACKEND); serving must use the same",
+    )
+    parser.add_argument(
+        "--skip-curated",
+        action="store_true",
+        help="Do not (re)generate the stored answers for CURATED_QUERIES",
+    )
+    args = parser.parse_args()
+    main(
+        incremental=args.incremental,
+        batch_size=args.batch_size,
+        num_workers=args.workers,
+        index_type=args.index_type,
+        index_report=args.index_report,
+        streaming=args.streaming,
+        chunk_rows=args.chunk_rows,
+        embedding_backend=args.embedding_backend,
+        curated=not args.skip_curated,
+    )
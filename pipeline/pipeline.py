@@ -1,39 +1,137 @@
+import asyncio
 import os
-from src.vector_store import VectorStoreBuilder
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Union
+from src.curated_answers import CURATED_ANSWERS_FILE, CuratedAnswers
+from src.index_versions import current_version, version_dir
 from src.recommender import AnimeRecommender
-from configs.config import GROQ_API_KEY, MODEL_NAME
+from src.lexical_index import BM25Index
+from src.query_log import QueryLogWriter, frequent_queries
+from src.reranker import Reranker
+from src.response_cache import ResponseCache, normalize_query
+from src.similarity_graph import SimilarityGraph
+from src.single_flight import SingleFlight
+from configs.config import (
+    CACHE_WARM_MAX_AGE_HOURS,
+    CACHE_WARM_QUERIES,
+    EMBEDDING_SERVER_ADDRESS,
+    GROQ_API_KEY,
+    INDEX_RELOAD_INTERVAL,
+    MODEL_NAME,
+    QUERY_BATCHING,
+    QUERY_LOG_ENABLED,
+    QUERY_LOG_PATH,
+    RERANK_ENABLED,
+)
 from utils.logger import get_logger
 from utils.custom_exception import CustomException
+from utils.metrics import increment, span
 
 logger = get_logger()
 
+
+@dataclass
+class RecommendationResult:
+    query: str
+    recommendation: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class SimilarTitle:
+    mal_id: int
+    name: str
+    similarity: float
+
+
+@dataclass
+class SimilarTitlesResult:
+    query: Union[str, int]
+    mal_id: Optional[int] = None
+    name: Optional[str] = None
+    similar: List[SimilarTitle] = field(default_factory=list)
+    explanation: Optional[str] = None
+
+
+@dataclass
+class _LoadedIndex:
+    """Everything that belongs to one published index version, swapped as a unit."""
+
+    directory: str
+    version: Optional[str]
+    vector_build: Any
+    vector_store: Any
+    retriever: Any
+    recommender: AnimeRecommender
+    similarity_graph: Optional[SimilarityGraph]
+
+
 class AnimeRecommendationPipeline:
-    def __init__(self, persist_dir="chroma_db"):
+    def __init__(
+        self,
+        persist_dir="chroma_db",
+        response_cache: ResponseCache = None,
+        embeddings=None,
+        llm=None,
+        query_log: QueryLogWriter = None,
+        curated_answers: bool = True,
+    ):
         try:
             logger.info("Initializing Recommendation Pipeline...")
-            
+
             if not os.path.exists(persist_dir):
                 logger.error(f"Vector store not found at {persist_dir}. Please run build_pipeline.py first.")
                 raise FileNotFoundError(f"Vector store not found at {persist_dir}")
-            
+
             csv_path = "data/processed_anime_data.csv"
             if not os.path.exists(csv_path):
                 logger.error(f"Processed CSV not found at {csv_path}. Please run build_pipeline.py first.")
                 raise FileNotFoundError(f"Processed CSV not found at {csv_path}")
 
-            vector_build = VectorStoreBuilder(
-                csv_path=csv_path,
-                persist_directory=persist_dir
-            )
+            # langchain and pandas load here, not when the module is imported
+            from src.embedding_cache import CachedEmbeddings
+            from src.embedding_client import RemoteEmbeddings
+            from src.query_encoder import BatchingQueryEncoder
+
+            if embeddings is None and EMBEDDING_SERVER_ADDRESS:
+                # Share one model per host instead of loading it in every worker
+                logger.info(f"Using the embedding server at {EMBEDDING_SERVER_ADDRESS}")
+                embeddings = RemoteEmbeddings()
 
-            vector_store = vector_build.load_vector_store()
-            retriever = vector_store.as_retriever()
+            if embeddings is None:
+                embeddings = CachedEmbeddings()
+            if QUERY_BATCHING:
+                embeddings = BatchingQueryEncoder(embeddings)
+            # One encoder for every index version this pipeline ever serves
+            self.embeddings = embeddings
+            self.csv_path = csv_path
+            self.persist_root = persist_dir
+            self.llm = llm
 
-            self.recommender = AnimeRecommender(
-                retriever=retriever, 
-                api_key=GROQ_API_KEY, 
-                model_name=MODEL_NAME
+            version = current_version(persist_dir)
+            self._index = self._load_index(
+                persist_dir if version is None else version_dir(persist_dir, version), version
             )
+            self._reload_lock = threading.Lock()
+            self._reloading = False
+            self._failed_version = None
+            self._next_version_check = time.monotonic() + INDEX_RELOAD_INTERVAL
+
+            self.response_cache = response_cache if response_cache is not None else ResponseCache()
+            self.single_flight = SingleFlight()
+            if query_log is None and QUERY_LOG_ENABLED:
+                query_log = QueryLogWriter()
+            self.query_log = query_log
+            self.use_curated_answers = curated_answers
+            self.curated_answers = None
+            self._manifest_mtime = None
+            self._sync_index_version()
 
             logger.info("Recommendation Pipeline Initialized Successfully...")
 
@@ -41,13 +139,494 @@ class AnimeRecommendationPipeline:
             logger.error(f"Error initializing pipeline: {str(e)}")
             raise CustomException("Failed to initialize recommendation pipeline") from e
 
+    def _load_index(self, directory: str, version: Optional[str]) -> _LoadedIndex:
+        from src.hybrid_retriever import HybridRetriever
+        from src.vector_store import VectorStoreBuilder
+
+        vector_build = VectorStoreBuilder(
+            csv_path=self.csv_path,
+            persist_directory=directory,
+            embeddings=self.embeddings,
+        )
+        vector_store = vector_build.load_vector_store()
+        lexical_index = BM25Index.load(directory)
+        if lexical_index is None:
+            logger.info("No lexical index found, using dense retrieval only")
+        retriever = HybridRetriever(
+            vector_store=vector_store,
+            lexical_index=lexical_index,
+            vectors=vector_build.load_vectors(),
+            reranker=Reranker() if RERANK_ENABLED else None,
+        )
+
+        similarity_graph = SimilarityGraph.load(directory)
+        if similarity_graph is None:
+            logger.info("No similarity graph found, similar_titles is unavailable")
+
+        recommender = AnimeRecommender(
+            retriever=retriever,
+            api_key=GROQ_API_KEY,
+            model_name=MODEL_NAME,
+            llm=self.llm,
+        )
+        if self.llm is None:
+            # Later versions reuse the client (and its breaker state) built here
+            self.llm = recommender.llm
+        return _LoadedIndex(directory, version, vector_build, vector_store, retriever, recommender, similarity_graph)
+
+    # Requests read the live index through these; a reload replaces all of
+    # them with one assignment to ``_index``
+    @property
+    def vector_build(self):
+        return self._index.vector_build
+
+    @property
+    def vector_store(self):
+        return self._index.vector_store
+
+    @property
+    def retriever(self):
+        return self._index.retriever
+
+    @property
+    def recommender(self):
+        return self._index.recommender
+
+    @property
+    def similarity_graph(self):
+        return self._index.similarity_graph
+
+    def _reload(self, version: str):
+        start = time.perf_counter()
+        try:
+            index = self._load_index(version_dir(self.persist_root, version), version)
+            # Fault in the index pages before the first request sees them
+            index.retriever.retrieve("warm up", k=1)
+        except Exception as e:
+            logger.error(f"Failed to load index version {version}, still serving {self._index.version}: {str(e)}")
+            self._failed_version = version
+            increment("getanime_index_reloads_total", outcome="error")
+        else:
+            self._index = index
+            logger.info(f"Swapped in index version {version} in {(time.perf_counter() - start) * 1000:.0f} ms")
+            increment("getanime_index_reloads_total", outcome="ok")
+        finally:
+            self._reloading = False
+
+    def _check_published_version(self):
+        """Start loading a newly published index version in the background."""
+        now = time.monotonic()
+        if now < self._next_version_check or self._reloading:
+            return
+        self._next_version_check = now + INDEX_RELOAD_INTERVAL
+        version = current_version(self.persist_root)
+        if version is None or version in (self._index.version, self._failed_version):
+            return
+        with self._reload_lock:
+            if self._reloading:
+                return
+            self._reloading = True
+        logger.info(f"Index version {version} published, loading it in the background")
+        threading.Thread(target=self._reload, args=(version,), daemon=True, name="index-reload").start()
+
+    def reload_index(self, timeout: float = None) -> Optional[str]:
+        """Check for a newly published version now and wait (up to ``timeout``) for it to be served."""
+        self._next_version_check = 0.0
+        self._check_published_version()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._reloading and (deadline is None or time.monotonic() < deadline):
+            time.sleep(0.01)
+        self._sync_index_version()
+        return self._index.version
+
+    def _sync_index_version(self):
+        self._check_published_version()
+        # Every build rewrites the manifest, so its mtime is a cheap change check;
+        # curated answers are written after the manifest and checked the same way
+        index = self._index
+        mtime = [index.directory]
+        for path in (
+            index.vector_build.manifest_path,
+            os.path.join(index.directory, CURATED_ANSWERS_FILE),
+        ):
+            try:
+                mtime.append(os.path.getmtime(path))
+            except OSError:
+                mtime.append(None)
+
+        if mtime != self._manifest_mtime:
+            self._manifest_mtime = mtime
+            version = index.vector_build.index_version()
+            self.response_cache.bind_index(version)
+            if self.use_curated_answers:
+                # Only answers generated for this exact index version are served
+                self.curated_answers = CuratedAnswers.load(index.directory, version)
+                if self.curated_answers is not None:
+                    logger.info(f"Loaded {len(self.curated_answers)} curated answers")
+
+    def _curated_answer(self, user_query: str):
+        self._sync_index_version()
+        if self.curated_answers is None:
+            return None
+        answer = self.curated_answers.get(user_query)
+        if answer is not None:
+            logger.info("Recommendation served from curated answers")
+            increment("getanime_cache_requests_total", cache="curated", outcome="hit")
+        return answer
+
+    def warm_up(self) -> float:
+        """Load the embedding model and touch the index so the first request pays no load cost."""
+        start = time.perf_counter()
+        query_embedding = self.embeddings.embed_query("warm up")
+        self.vector_store.similarity_search_by_vector(query_embedding, k=1)
+        elapsed = time.perf_counter() - start
+        logger.info(f"Pipeline warm-up finished in {elapsed * 1000:.0f} ms")
+        return elapsed
+
+    def warm_caches(
+        self,
+        path: str = QUERY_LOG_PATH,
+        limit: int = CACHE_WARM_QUERIES,
+        max_age_hours: float = CACHE_WARM_MAX_AGE_HOURS,
+        concurrency: int = 8,
+    ) -> int:
+        """Answer the most frequent recently logged queries so their answers are cached.
+
+        Returns the number of queries warmed. Failures are logged, not raised.
+        """
+        if limit <= 0 or self.response_cache.max_entries <= 0:
+            return 0
+        queries = frequent_queries(path, limit, max_age_hours * 3600 if max_age_hours else None)
+        if not queries:
+            return 0
+
+        start = time.perf_counter()
+        results = self.recommend_many(queries, concurrency=concurrency)
+        warmed = sum(result.ok for result in results)
+        logger.info(
+            f"Warmed caches with {warmed}/{len(queries)} frequent queries in "
+            f"{(time.perf_counter() - start):.1f} s"
+        )
+        return warmed
+
+    def retrieve(self, user_query: str, k: int = None):
+        """Return the documents the recommender would see, without calling the LLM."""
+        try:
+            self._check_published_version()
+            return self.retriever.retrieve(user_query, k=k)
+
+        except Exception as e:
+            logger.error(f"Error during retrieval: {str(e)}")
+            raise CustomException("Failed to retrieve documents") from e
+
+    @staticmethod
+    def _title_document(index, mal_id):
+        document = index.vector_store.docstore.search(f"{mal_id}:0")
+        return None if isinstance(document, str) else document
+
+    def _title_name(self, index, mal_id, row=None):
+        docstore = index.vector_store.docstore
+        if row is not None and hasattr(docstore, "name"):
+            return docstore.name(row)
+        document = self._title_document(index, mal_id)
+        return None if document is None else document.metadata.get("Name")
+
+    @staticmethod
+    def _resolve_title(index, title):
+        if isinstance(title, int) or str(title).strip().isdigit():
+            return int(title)
+        lexical_index = index.retriever.lexical_index
+        if lexical_index is None:
+            return None
+        # A verbatim title anywhere in the text ("anime like Cowboy Bebop"),
+        # else the best BM25 hit
+        mal_id = lexical_index.match_title(title, min_tokens=1)
+        if mal_id is None:
+            hits = lexical_index.search(title, k=1)
+            mal_id = hits[0][0] if hits else None
+        return None if mal_id is None else int(mal_id)
+
+    def similar_titles(self, title: Union[str, int], k: int = 10, explain: bool = False) -> SimilarTitlesResult:
+        """Titles most similar to ``title`` (a MAL_ID or a name) from the precomputed graph.
+
+        No embedding or LLM call is made unless ``explain`` is set, in which
+        case the LLM explains the picks using the neighbours as context.
+        """
+        try:
+            self._check_published_version()
+            # Rows and ids must all come from the same index version
+            index = self._index
+            if index.similarity_graph is None:
+                raise FileNotFoundError("Similarity graph not found. Please run build_pipeline.py first.")
+
+            with span("pipeline.similar"):
+                result = SimilarTitlesResult(query=title, mal_id=self._resolve_title(index, title))
+                if result.mal_id is not None:
+                    graph = index.similarity_graph
+                    result.name = self._title_name(index, result.mal_id, graph.row(result.mal_id))
+                    result.similar = [
+                        SimilarTitle(mal_id, self._title_name(index, mal_id, row), similarity)
+                        for mal_id, similarity, row in graph.similar(result.mal_id, k)
+                    ]
+
+            if explain and result.similar:
+                documents = [self._title_document(index, item.mal_id) for item in result.similar]
+                question = f"Which of these anime should someone who liked {result.name} watch, and why?"
+                result.explanation = index.recommender.get_recommendation(
+                    question, [doc for doc in documents if doc is not None]
+                )
+            return result
+
+        except Exception as e:
+            logger.error(f"Error during similar title lookup: {str(e)}")
+            raise CustomException("Failed to find similar titles") from e
+
+    def _lookup_cache(self, user_query: str):
+        """Return ``(cached response or None, query embedding or None, cache outcome)``."""
+        curated = self._curated_answer(user_query)
+        if curated is not None:
+            return curated, None, "curated"
+
+        if self.response_cache.max_entries <= 0:
+            return None, None, "disabled"
+
+        with span("cache.lookup") as lookup:
+            cached = self.response_cache.get_exact(user_query)
+            if cached is not None:
+                logger.info("Recommendation served from response cache (exact match)")
+                lookup.set(outcome="exact_hit")
+                return cached, None, "exact_hit"
+
+            query_embedding = self.embeddings.embed_query(user_query)
+            cached = self.response_cache.get_similar(query_embedding)
+            if cached is not None:
+                logger.info("Recommendation served from response cache (similar query)")
+            outcome = "miss" if cached is None else "semantic_hit"
+            lookup.set(outcome=outcome)
+            return cached, query_embedding, outcome
+
+    def _log_query(self, user_query: str, start: float, cache: str, mode: str):
+        if self.query_log is not None:
+            self.query_log.record(user_query, time.perf_counter() - start, cache, mode)
+
+    def _retrieve(self, user_query: str, query_embedding):
+        # The semantic cache lookup already embedded the query; don't encode it twice
+        with span("retrieve"):
+            return self.retriever.retrieve(user_query, query_embedding=query_embedding)
+
+    def _recommend(self, user_query: str):
+        cached, query_embedding, outcome = self._lookup_cache(user_query)
+        if cached is not None:
+            return cached, outcome
+
+        documents = self._retrieve(user_query, query_embedding)
+        recommendation = self.recommender.get_recommendation(user_query, documents)
+        self.response_cache.put(user_query, recommendation, query_embedding)
+        return recommendation, outcome
+
     def recommend(self, user_query: str) -> str:
         try:
             logger.info(f"Generating recommendations for query: {user_query}")
-            recommendation = self.recommender.get_recommendation(user_query)
+            start = time.perf_counter()
+            outcome = {}
+
+            def run():
+                recommendation, outcome["cache"] = self._recommend(user_query)
+                return recommendation
+
+            with span("pipeline.recommend"):
+                # Concurrent identical queries share one retrieval + LLM call. The
+                # flight result is the plain text in both modes, so a recommend()
+                # can join a streaming flight and vice versa
+                recommendation, shared = self.single_flight.do(normalize_query(user_query), run)
+            self._log_query(user_query, start, "coalesced" if shared else outcome["cache"], "recommend")
             logger.info("Recommendation generated successfully...")
             return recommendation
 
         except Exception as e:
             logger.error(f"Error during recommendation: {str(e)}")
-            raise CustomException("Failed to generate recommendations") from e
\ No newline at end of file
+            raise CustomException("Failed to generate recommendations") from e
+
+    def _produce_stream(self, user_query: str, key, flight):
+        start = time.perf_counter()
+        chunks = []
+        try:
+            cached, query_embedding, outcome = self._lookup_cache(user_query)
+            if cached is not None:
+                flight.publish(cached)
+                chunks.append(cached)
+            else:
+                documents = self._retrieve(user_query, query_embedding)
+                for chunk in self.recommender.stream_recommendation(user_query, documents):
+                    if not chunks:
+                        logger.info(f"Time to first token: {(time.perf_counter() - start) * 1000:.0f} ms")
+                    flight.publish(chunk)
+                    chunks.append(chunk)
+
+                self.response_cache.put(user_query, "".join(chunks), query_embedding)
+                logger.info(f"Recommendation streamed in {(time.perf_counter() - start) * 1000:.0f} ms")
+        except Exception as e:
+            self.single_flight.release(key, flight, error=e)
+        else:
+            self.single_flight.release(key, flight, result="".join(chunks))
+            self._log_query(user_query, start, outcome, "stream")
+
+    def stream_recommend(self, user_query: str):
+        """Yield the recommendation as text chunks as soon as they are generated.
+
+        Cached answers are yielded as a single chunk. Generation runs in a
+        background thread that publishes chunks to every reader of an
+        identical query, so one reader going away does not cut the others off.
+        """
+        try:
+            logger.info(f"Streaming recommendations for query: {user_query}")
+            key = normalize_query(user_query)
+            start = time.perf_counter()
+            leader, flight = self.single_flight.join(key)
+            if leader:
+                threading.Thread(
+                    target=self._produce_stream, args=(user_query, key, flight), daemon=True
+                ).start()
+            else:
+                logger.info("Joined an identical in-flight request")
+
+            streamed = False
+            for chunk in flight.iter_chunks():
+                streamed = True
+                yield chunk
+            if not streamed and flight.result:
+                # A blocking recommend() leader publishes no chunks, only its result
+                yield flight.result
+            if not leader:
+                self._log_query(user_query, start, "coalesced", "stream")
+
+        except Exception as e:
+            logger.error(f"Error during streaming recommendation: {str(e)}")
+            raise CustomException("Failed to generate recommendations") from e
+
+    async def arecommend(self, user_query: str) -> str:
+        try:
+            logger.info(f"Generating recommendations (async) for query: {user_query}")
+            start = time.perf_counter()
+            outcome = {}
+
+            async def run():
+                recommendation, outcome["cache"] = await self._arecommend(user_query)
+                return recommendation
+
+            with span("pipeline.arecommend"):
+                # Shares flights with recommend() and stream_recommend()
+                recommendation, shared = await self.single_flight.ado(normalize_query(user_query), run)
+            self._log_query(user_query, start, "coalesced" if shared else outcome["cache"], "arecommend")
+            logger.info("Recommendation generated successfully...")
+            return recommendation
+
+        except Exception as e:
+            logger.error(f"Error during recommendation: {str(e)}")
+            raise CustomException("Failed to generate recommendations") from e
+
+    async def _arecommend(self, user_query: str):
+        cached = self._curated_answer(user_query)
+        if cached is not None:
+            return cached, "curated"
+        cached = self.response_cache.get_exact(user_query)
+        if cached is not None:
+            return cached, "exact_hit"
+
+        query_embedding = await asyncio.to_thread(self.embeddings.embed_query, user_query)
+        return await self._arecommend_with_embedding(user_query, query_embedding)
+
+    async def _arecommend_with_embedding(self, user_query: str, query_embedding):
+        cached = self.response_cache.get_similar(query_embedding)
+        if cached is not None:
+            return cached, "semantic_hit"
+
+        with span("retrieve"):
+            documents = await asyncio.to_thread(
+                self.retriever.retrieve, user_query, query_embedding=query_embedding
+            )
+        recommendation = await self.recommender.aget_recommendation(user_query, documents)
+        self.response_cache.put(user_query, recommendation, query_embedding)
+        return recommendation, "miss"
+
+    async def arecommend_many(self, queries, concurrency: int = 8):
+        """Recommend for many queries with at most ``concurrency`` LLM calls in flight.
+
+        Results come back in input order; a failing query yields a result with
+        ``error`` set instead of aborting the batch.
+        """
+        logger.info(f"Generating recommendations for {len(queries)} queries (concurrency={concurrency})")
+        self._sync_index_version()
+        start = time.perf_counter()
+        results = [None] * len(queries)
+
+        def log_group(indices, cache):
+            # Duplicates in the batch were answered by the first occurrence
+            for position, i in enumerate(indices):
+                self._log_query(queries[i], start, "coalesced" if position else cache, "arecommend_many")
+
+        # Identical (normalized) queries are answered once and fanned out
+        groups = {}
+        for i, query in enumerate(queries):
+            groups.setdefault(normalize_query(query), []).append(i)
+
+        pending = []
+        for indices in groups.values():
+            query = queries[indices[0]]
+            cached, cache = self._curated_answer(query), "curated"
+            if cached is None:
+                cached, cache = self.response_cache.get_exact(query), "exact_hit"
+            if cached is not None:
+                for i in indices:
+                    results[i] = RecommendationResult(queries[i], recommendation=cached)
+                log_group(indices, cache)
+            else:
+                pending.append(indices)
+
+        if pending:
+            try:
+                # One batched encoder call covers every uncached query
+                embed_batch = getattr(self.embeddings, "embed_queries", self.embeddings.embed_documents)
+                embeddings = await asyncio.to_thread(
+                    embed_batch, [queries[group[0]] for group in pending]
+                )
+            except Exception as e:
+                logger.error(f"Error embedding queries: {str(e)}")
+                embeddings = [e] * len(pending)
+
+            semaphore = asyncio.Semaphore(max(1, concurrency))
+
+            async def run(indices, query_embedding):
+                query = queries[indices[0]]
+                cache = {}
+
+                async def answer():
+                    async with semaphore:
+                        recommendation, cache["outcome"] = await self._arecommend_with_embedding(
+                            query, query_embedding
+                        )
+                    return recommendation
+
+                try:
+                    if isinstance(query_embedding, Exception):
+                        raise query_embedding
+                    # Joins a live request for the same query instead of asking the LLM again
+                    recommendation, shared = await self.single_flight.ado(normalize_query(query), answer)
+                    outcome = {"recommendation": recommendation}
+                except Exception as e:
+                    logger.error(f"Error during recommendation for query {query!r}: {str(e)}")
+                    outcome = {"error": str(e)}
+                for i in indices:
+                    results[i] = RecommendationResult(queries[i], **outcome)
+                if "recommendation" in outcome:
+                    log_group(indices, "coalesced" if shared else cache["outcome"])
+
+            await asyncio.gather(*(run(group, emb) for group, emb in zip(pending, embeddings)))
+
+        failed = sum(not result.ok for result in results)
+        logger.info(f"Bulk recommendation finished: {len(results) - failed} succeeded, {failed} failed")
+        return results
+
+    def recommend_many(self, queries, concurrency: int = 8):
+        """Blocking wrapper around ``arecommend_many`` for scripts and offline jobs."""
+        return asyncio.run(self.arecommend_many(queries, concurrency=concurrency))
@@ -0,0 +1,185 @@
+import json
+import math
+import os
+import time
+
+import numpy as np
+
+from configs.config import (
+    HNSW_EF_CONSTRUCTION,
+    HNSW_EF_SEARCH,
+    HNSW_M,
+    INDEX_TYPE,
+    IVF_NLIST,
+    IVF_NPROBE,
+    PQ_M,
+    PQ_NBITS,
+)
+from utils.atomic_io import atomic_path
+from utils.logger import get_logger
+
+logger = get_logger()
+
+INDEX_TYPES = ("flat", "hnsw", "ivfpq")
+INDEX_REPORT_FILE = "index_report.json"
+
+# Vectors are added in blocks so memory-mapped matrices never load whole
+ADD_BLOCK_ROWS = 65536
+MAX_TRAIN_ROWS = 262144
+
+
+def default_index_config():
+    return index_config(INDEX_TYPE)
+
+
+def index_config(index_type: str, **overrides):
+    """Return the full parameter set for ``index_type`` with config defaults."""
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}, expected one of {INDEX_TYPES}")
+
+    defaults = {
+        "flat": {},
+        "hnsw": {"M": HNSW_M, "ef_construction": HNSW_EF_CONSTRUCTION, "ef_search": HNSW_EF_SEARCH},
+        "ivfpq": {"nlist": IVF_NLIST, "m": PQ_M, "nbits": PQ_NBITS, "nprobe": IVF_NPROBE},
+    }[index_type]
+    unknown = set(overrides) - set(defaults)
+    if unknown:
+        raise ValueError(f"Unknown parameters for {index_type}: {sorted(unknown)}")
+    return {"type": index_type, **defaults, **overrides}
+
+
+def needs_training(config: dict) -> bool:
+    return config["type"] == "ivfpq"
+
+
+def empty_index(dim: int, config: dict, train_vectors: np.ndarray = None):
+    """Create an index of ``config["type"]``, trained on ``train_vectors`` if it needs it."""
+    import faiss
+
+    index_type = config["type"]
+
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dim)
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, config["M"])
+        index.hnsw.efConstruction = config["ef_construction"]
+        index.hnsw.efSearch = config["ef_search"]
+        return index
+
+    if index_type == "ivfpq":
+        n = len(train_vectors)
+        # Keep training well-posed on small catalogs: ~39 points per centroid
+        # for the coarse quantizer and at least as many points as PQ centroids
+        nlist = max(1, min(config["nlist"], n // 39))
+        nbits = max(1, min(config["nbits"], int(math.log2(max(n // 39, 2)))))
+        m = config["m"]
+        if dim % m:
+            raise ValueError(f"PQ m={m} must divide the embedding dimension {dim}")
+
+        quantizer = faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, m, nbits)
+        index.train(np.ascontiguousarray(train_vectors, dtype=np.float32))
+        index.nprobe = min(config["nprobe"], nlist)
+        return index
+
+    raise ValueError(f"Unknown index type {index_type!r}")
+
+
+def create_index(vectors: np.ndarray, config: dict, block_rows: int = ADD_BLOCK_ROWS):
+    """Build a FAISS index of ``config["type"]`` over ``vectors`` (L2 distance).
+
+    ``vectors`` may be a memory-mapped array: it is added ``block_rows`` rows
+    at a time and IVF-PQ trains on a sample of at most ``MAX_TRAIN_ROWS``.
+    """
+    n, dim = vectors.shape
+
+    train_vectors = None
+    if needs_training(config):
+        train_vectors = vectors
+        if n > MAX_TRAIN_ROWS:
+            rows = np.random.default_rng(0).choice(n, size=MAX_TRAIN_ROWS, replace=False)
+            train_vectors = vectors[np.sort(rows)]
+    index = empty_index(dim, config, train_vectors)
+
+    for start in range(0, n, block_rows):
+        index.add(np.ascontiguousarray(vectors[start:start + block_rows], dtype=np.float32))
+    return index
+
+
+def index_size_bytes(index) -> int:
+    import faiss
+
+    return int(faiss.serialize_index(index).size)
+
+
+def _sample_queries(vectors: np.ndarray, n_queries: int, seed: int = 0):
+    # Perturbed catalog vectors: realistic neighbourhoods without needing text
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(vectors), size=min(n_queries, len(vectors)), replace=False)
+    noise = rng.normal(scale=0.05, size=(len(rows), vectors.shape[1])).astype(np.float32)
+    return np.ascontiguousarray(vectors[rows] + noise, dtype=np.float32)
+
+
+def evaluate_index(index, queries: np.ndarray, ground_truth: np.ndarray, k: int):
+    latencies = []
+    hits = 0
+    for query, truth in zip(queries, ground_truth):
+        start = time.perf_counter()
+        _, found = index.search(query[None, :], k)
+        latencies.append(time.perf_counter() - start)
+        hits += len(set(found[0].tolist()) & set(truth.tolist()))
+
+    latencies_ms = np.asarray(latencies) * 1000
+    return {
+        f"recall@{k}": round(hits / (len(queries) * k), 4),
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 4),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 4),
+    }
+
+
+def default_report_configs():
+    return [
+        index_config("flat"),
+        index_config("hnsw", M=16, ef_search=32),
+        index_config("hnsw"),
+        index_config("ivfpq", nprobe=1),
+        index_config("ivfpq"),
+    ]
+
+
+def build_index_report(vectors: np.ndarray, configs=None, k: int = 10, n_queries: int = 200):
+    """Measure recall@k against exact search and per-query latency for each config."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    k = min(k, len(vectors))
+    queries = _sample_queries(vectors, n_queries)
+    exact = create_index(vectors, index_config("flat"))
+    _, ground_truth = exact.search(queries, k)
+
+    results = []
+    for config in configs or default_report_configs():
+        start = time.perf_counter()
+        index = create_index(vectors, config)
+        build_seconds = time.perf_counter() - start
+
+        result = {
+            "config": config,
+            "build_s": round(build_seconds, 4),
+            "size_bytes": index_size_bytes(index),
+            **evaluate_index(index, queries, ground_truth, k),
+        }
+        if config["type"] == "ivfpq":
+            # nlist/nbits are clamped on small catalogs; report what was built
+            result["effective"] = {"nlist": int(index.nlist), "nbits": int(index.pq.nbits)}
+        logger.info(f"Index report: {json.dumps(result)}")
+        results.append(result)
+
+    return {"vectors": len(vectors), "dim": vectors.shape[1], "k": k, "queries": len(queries), "results": results}
+
+
+def write_index_report(report: dict, directory: str):
+    path = os.path.join(directory, INDEX_REPORT_FILE)
+    with atomic_path(path) as tmp_path:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return path
@@ -0,0 +1,65 @@
+import requests
+
+from configs.config import API_TIMEOUT_SECONDS
+from utils.logger import get_logger
+from utils.custom_exception import CustomException
+
+logger = get_logger()
+
+
+class RecommendationAPIClient:
+    """Thin HTTP client for ``app/server.py`` with the pipeline's public interface.
+
+    A single ``requests.Session`` keeps connections to the API alive between calls.
+    """
+
+    def __init__(self, base_url: str, timeout: float = API_TIMEOUT_SECONDS):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _post(self, path, payload, **kwargs):
+        response = self.session.post(
+            f"{self.base_url}{path}", json=payload, timeout=self.timeout, **kwargs
+        )
+        response.raise_for_status()
+        return response
+
+    def is_ready(self) -> bool:
+        try:
+            response = self.session.get(f"{self.base_url}/readyz", timeout=self.timeout)
+            return response.ok
+        except requests.RequestException:
+            return False
+
+    def recommend(self, user_query: str) -> str:
+        try:
+            return self._post("/recommend", {"query": user_query}).json()["recommendation"]
+        except Exception as e:
+            logger.error(f"Recommendation API call failed: {str(e)}")
+            raise CustomException("Failed to generate recommendations") from e
+
+    def stream_recommend(self, user_query: str):
+        try:
+            with self._post("/recommend/stream", {"query": user_query}, stream=True) as response:
+                response.encoding = "utf-8"
+                for chunk in response.iter_content(chunk_size=None, decode_unicode=True):
+                    if chunk:
+                        yield chunk
+        except Exception as e:
+            logger.error(f"Recommendation API stream failed: {str(e)}")
+            raise CustomException("Failed to generate recommendations") from e
+
+    def retrieve(self, user_query: str, k: int = 4):
+        try:
+            return self._post("/retrieve", {"query": user_query, "k": k}).json()["documents"]
+        except Exception as e:
+            logger.error(f"Retrieval API call failed: {str(e)}")
+            raise CustomException("Failed to retrieve documents") from e
+
+    def similar_titles(self, title, k: int = 10, explain: bool = False):
+        try:
+            return self._post("/similar", {"title": str(title), "k": k, "explain": explain}).json()
+        except Exception as e:
+            logger.error(f"Similar titles API call failed: {str(e)}")
+            raise CustomException("Failed to find similar titles") from e
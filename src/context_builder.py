@@ -0,0 +1,137 @@
+import re
+
+from configs.config import CONTEXT_MAX_SENTENCES, CONTEXT_TOKEN_BUDGET
+from src.lexical_index import tokenize
+from utils.logger import get_logger
+from utils.metrics import increment
+
+logger = get_logger()
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_FIELDS_RE = re.compile(
+    r"(?:Title:\s*(?P<title>.*?)\s+Overview:\s*)?(?P<overview>.*?)(?:\s+Genres:\s*(?P<genres>.*))?$",
+    re.DOTALL,
+)
+# MAL synopses end with attribution notes that carry nothing for the LLM
+_SOURCE_NOTE_RE = re.compile(r"[\[(](?:Written by|Source:)[^\])]*[\])]", re.IGNORECASE)
+
+_STOPWORDS = frozenset(
+    "a an and anime are as at be but by for from i in into is it like me my of on or "
+    "recommend show shows some something that the their this to want with".split()
+)
+
+
+def count_tokens(text: str) -> int:
+    """Approximate LLM token count: words and punctuation marks."""
+    return len(_TOKEN_RE.findall(text))
+
+
+class ContextBuilder:
+    """Pack retrieved documents into the prompt context under a token budget.
+
+    Documents are taken in retrieval order (best first) and merged per title,
+    so several chunks of one anime appear once. Each synopsis is cut down to
+    its ``max_sentences`` sentences sharing the most terms with the query,
+    kept in their original order. Documents that no longer fit the budget
+    are first shortened further and otherwise dropped. A ``token_budget`` of
+    0 keeps the plain "stuff" layout.
+    """
+
+    def __init__(self, token_budget: int = CONTEXT_TOKEN_BUDGET, max_sentences: int = CONTEXT_MAX_SENTENCES):
+        self.token_budget = token_budget
+        self.max_sentences = max_sentences
+
+    @staticmethod
+    def _stuff(documents):
+        return "\n\n".join(doc.page_content for doc in documents)
+
+    @staticmethod
+    def _group_by_title(documents):
+        titles = {}
+        for document in documents:
+            text = document.page_content
+            if text.startswith("combined_info:"):
+                text = text[len("combined_info:"):]
+            fields = _FIELDS_RE.match(text.strip())
+            key = document.metadata.get("MAL_ID") or fields.group("title") or text
+            entry = titles.setdefault(
+                key,
+                {
+                    "title": document.metadata.get("Name") or fields.group("title") or "",
+                    "genres": document.metadata.get("Genres") or fields.group("genres") or "",
+                    "sentences": [],
+                    "chunks": 0,
+                },
+            )
+            entry["chunks"] += 1
+            overview = _SOURCE_NOTE_RE.sub("", fields.group("overview") or "")
+            entry["sentences"].extend(s for s in _SENTENCE_RE.split(overview.strip()) if s)
+        return list(titles.values())
+
+    def _select_sentences(self, sentences, query_terms, limit):
+        if len(sentences) <= limit:
+            return sentences
+        scored = []
+        for position, sentence in enumerate(sentences):
+            overlap = len(query_terms.intersection(tokenize(sentence)))
+            # The opening sentence usually sets up the premise, so it wins ties
+            scored.append((overlap + (0.5 if position == 0 else 0.0), -position))
+        keep = sorted(range(len(sentences)), key=lambda i: scored[i], reverse=True)[:limit]
+        return [sentences[i] for i in sorted(keep)]
+
+    @staticmethod
+    def _render(entry, sentences):
+        text = f"Title: {entry['title']} Overview: {' '.join(sentences)}"
+        if entry["genres"]:
+            text += f" Genres: {entry['genres']}"
+        return text
+
+    def build(self, query: str, documents):
+        """Return ``(context, stats)`` for ``documents`` ordered best first."""
+        original = self._stuff(documents)
+        original_tokens = count_tokens(original)
+        if self.token_budget <= 0:
+            return original, {
+                "original_tokens": original_tokens,
+                "context_tokens": original_tokens,
+                "tokens_saved": 0,
+                "documents": len(documents),
+                "titles_used": len(documents),
+            }
+
+        query_terms = {term for term in tokenize(query) if term not in _STOPWORDS}
+        entries = self._group_by_title(documents)
+
+        blocks = []
+        used_tokens = 0
+        for entry in entries:
+            sentences = self._select_sentences(entry["sentences"], query_terms, self.max_sentences)
+            while True:
+                block = self._render(entry, sentences)
+                tokens = count_tokens(block)
+                if used_tokens + tokens <= self.token_budget or len(sentences) <= 1:
+                    break
+                sentences = self._select_sentences(sentences, query_terms, len(sentences) - 1)
+
+            # The best document always goes in, even if it alone exceeds the budget
+            if blocks and used_tokens + tokens > self.token_budget:
+                continue
+            blocks.append(block)
+            used_tokens += tokens
+
+        context = "\n\n".join(blocks)
+        context_tokens = count_tokens(context)
+        stats = {
+            "original_tokens": original_tokens,
+            "context_tokens": context_tokens,
+            "tokens_saved": max(0, original_tokens - context_tokens),
+            "documents": len(documents),
+            "titles_used": len(blocks),
+        }
+        increment("getanime_context_tokens_saved_total", stats["tokens_saved"])
+        logger.info(
+            f"Context: {context_tokens}/{original_tokens} tokens "
+            f"({stats['tokens_saved']} saved), {len(blocks)} of {len(entries)} titles"
+        )
+        return context, stats
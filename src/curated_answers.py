@@ -0,0 +1,72 @@
+import json
+import os
+from datetime import datetime
+
+from src.response_cache import normalize_query
+from utils.atomic_io import atomic_path
+from utils.logger import get_logger
+
+logger = get_logger()
+
+CURATED_ANSWERS_FILE = "curated_answers.json"
+
+
+class CuratedAnswers:
+    """Recommendation answers generated at build time for the curated queries.
+
+    The store is tied to the index version it was generated from (the
+    manifest ``version``): ``load`` refuses a store built for another
+    version, so a catalog change can never serve answers about titles that
+    are no longer in the index.
+    """
+
+    def __init__(self, index_version, answers: dict, generated_at: str = None):
+        self.index_version = index_version
+        self.answers = answers
+        self.generated_at = generated_at
+        self._lookup = {normalize_query(query): answer for query, answer in answers.items()}
+
+    def __len__(self):
+        return len(self.answers)
+
+    def get(self, query: str):
+        return self._lookup.get(normalize_query(query))
+
+    def covers(self, queries) -> bool:
+        return all(normalize_query(query) in self._lookup for query in queries)
+
+    @classmethod
+    def generate(cls, pipeline, queries, index_version, concurrency: int = 4):
+        """Answer ``queries`` with ``pipeline``; queries that fail are left out."""
+        results = pipeline.recommend_many(list(queries), concurrency=concurrency)
+        answers = {result.query: result.recommendation for result in results if result.ok}
+        for result in results:
+            if not result.ok:
+                logger.warning(f"No curated answer for {result.query!r}: {result.error}")
+        return cls(index_version, answers, datetime.now().isoformat(timespec="seconds"))
+
+    def save(self, directory: str):
+        data = {
+            "index_version": self.index_version,
+            "generated_at": self.generated_at,
+            "answers": self.answers,
+        }
+        with atomic_path(os.path.join(directory, CURATED_ANSWERS_FILE)) as tmp_path:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, directory: str, index_version=None):
+        """Load the store, or return None if it is missing or was built for another index."""
+        path = os.path.join(directory, CURATED_ANSWERS_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if index_version is not None and data["index_version"] != index_version:
+            logger.info(
+                f"Curated answers were built for index {data['index_version']}, "
+                f"not {index_version}; ignoring them"
+            )
+            return None
+        return cls(data["index_version"], data["answers"], data.get("generated_at"))
@@ -6,16 +6,49 @@ class AnimeDataLoader:
         self.original_csv = original_csv
         self.processed_csv = processed_csv
 
-    def load_and_process(self):
-        df = pd.read_csv(self.original_csv, encoding='utf-8', on_bad_lines='skip').dropna()
-        required_cols = {"Name", "Genres", "Synopsis"}
+    @staticmethod
+    def _process(df):
+        required_cols = {"MAL_ID", "Name", "Genres", "Synopsis"}
 
         missing = required_cols - set(df.columns)
         if missing:
             raise ValueError(f"Missing required columns: {missing}")
 
+        # Only a blank required field disqualifies a title
+        df = df.dropna(subset=sorted(required_cols)).copy()
+        if 'Score' in df.columns:
+            # The full MAL export marks unscored titles "Unknown"; keep them, unscored
+            df['Score'] = pd.to_numeric(df['Score'], errors='coerce')
+        else:
+            df['Score'] = float('nan')
+
         df['combined_info'] = ( "Title: " + df['Name'] + " Overview: " + df['Synopsis'] + " Genres: " + df['Genres'] )
 
-        df[['combined_info']].to_csv(self.processed_csv, index=False, encoding='utf-8')
-        
-        return self.processed_csv
\ No newline at end of file
+        return df
+
+    def load_dataframe(self):
+        df = pd.read_csv(self.original_csv, encoding='utf-8', on_bad_lines='skip')
+        return self._process(df)
+
+    def iter_chunks(self, chunksize: int):
+        """Yield validated, combined DataFrames of at most ``chunksize`` source rows."""
+        reader = pd.read_csv(self.original_csv, encoding='utf-8', on_bad_lines='skip', chunksize=chunksize)
+        for chunk in reader:
+            yield self._process(chunk)
+
+    def load_and_process(self, chunksize: int = None):
+        # MAL_ID tracks rows across rebuilds; Name, Score and Genres become
+        # columns of the document store
+        columns = ['MAL_ID', 'Name', 'Score', 'Genres', 'combined_info']
+
+        if chunksize is None:
+            df = self.load_dataframe()
+            df[columns].to_csv(self.processed_csv, index=False, encoding='utf-8')
+            return self.processed_csv
+
+        # Streaming mode: only one chunk of the source is in memory at a time
+        with open(self.processed_csv, 'w', encoding='utf-8', newline='') as f:
+            for i, df in enumerate(self.iter_chunks(chunksize)):
+                df[columns].to_csv(f, index=False, header=(i == 0))
+
+        return self.processed_csv
@@ -0,0 +1,199 @@
+import json
+import math
+import os
+from collections.abc import Mapping
+
+import numpy as np
+from langchain_core.documents import Document
+
+from utils.atomic_io import atomic_path, save_array
+
+DOCSTORE_DIR = "docstore"
+COLUMNS_FILE = "columns.json"
+TEXT_COLUMNS = ("text", "name", "genres")
+
+
+def chunk_id(mal_id, chunk) -> str:
+    return f"{int(mal_id)}:{int(chunk)}"
+
+
+class ColumnarDocStoreWriter:
+    """Append documents row by row and write the columnar artifact on ``close``.
+
+    Text columns are streamed straight into their ``.bin`` blobs, so only the
+    fixed-width columns and offsets are held in memory while writing.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = os.path.join(directory, DOCSTORE_DIR)
+        os.makedirs(self.directory, exist_ok=True)
+        self._mal_ids, self._chunks, self._scores = [], [], []
+        self._offsets = {column: [0] for column in TEXT_COLUMNS}
+        # Blobs are written under temporary names and swapped in by ``close``
+        self._blobs = {
+            column: open(self._blob_path(column) + ".tmp", "wb")
+            for column in TEXT_COLUMNS
+        }
+
+    def _blob_path(self, column):
+        return os.path.join(self.directory, f"{column}.bin")
+
+    def append(self, document: Document, mal_id, chunk):
+        metadata = document.metadata
+        score = metadata.get("Score")
+        values = {
+            "text": document.page_content,
+            "name": metadata.get("Name") or "",
+            "genres": metadata.get("Genres") or "",
+        }
+
+        self._mal_ids.append(int(mal_id))
+        self._chunks.append(int(chunk))
+        self._scores.append(np.nan if score is None else float(score))
+        for column, value in values.items():
+            data = value.encode("utf-8")
+            self._blobs[column].write(data)
+            self._offsets[column].append(self._offsets[column][-1] + len(data))
+
+    def close(self):
+        for blob in self._blobs.values():
+            blob.close()
+
+        mal_ids = np.asarray(self._mal_ids, dtype=np.int64)
+        chunks = np.asarray(self._chunks, dtype=np.int32)
+        save_array(os.path.join(self.directory, "mal_id.npy"), mal_ids)
+        save_array(os.path.join(self.directory, "chunk.npy"), chunks)
+        save_array(os.path.join(self.directory, "score.npy"), np.asarray(self._scores, dtype=np.float32))
+        # Sorted (MAL_ID, chunk) order lets readers find a chunk id by binary search
+        id_order = np.lexsort((chunks, mal_ids)).astype(np.int64)
+        save_array(os.path.join(self.directory, "id_order.npy"), id_order)
+        save_array(os.path.join(self.directory, "sorted_mal_id.npy"), mal_ids[id_order])
+        for column, offsets in self._offsets.items():
+            save_array(
+                os.path.join(self.directory, f"{column}_offsets.npy"),
+                np.asarray(offsets, dtype=np.int64),
+            )
+            os.replace(self._blob_path(column) + ".tmp", self._blob_path(column))
+
+        with atomic_path(os.path.join(self.directory, COLUMNS_FILE)) as tmp_path:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"rows": len(mal_ids), "text_columns": list(TEXT_COLUMNS)}, f)
+
+
+class ColumnarDocStore:
+    """Read-only, memory-mapped docstore compatible with langchain's FAISS wrapper.
+
+    Row ``i`` holds the document for FAISS vector ``i``. Nothing is decoded
+    until ``search`` or ``document`` asks for a row, so load time and resident
+    memory do not grow with the catalog.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = os.path.join(directory, DOCSTORE_DIR)
+        with open(os.path.join(self.directory, COLUMNS_FILE), encoding="utf-8") as f:
+            self.rows = json.load(f)["rows"]
+
+        self.mal_ids = self._load("mal_id.npy")
+        self.chunks = self._load("chunk.npy")
+        self.scores = self._load("score.npy")
+        self._id_order = self._load("id_order.npy")
+        self._sorted_mal_ids = self._load("sorted_mal_id.npy")
+        self._offsets = {column: self._load(f"{column}_offsets.npy") for column in TEXT_COLUMNS}
+        self._blobs = {column: self._map_blob(f"{column}.bin") for column in TEXT_COLUMNS}
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        return os.path.exists(os.path.join(directory, DOCSTORE_DIR, COLUMNS_FILE))
+
+    # Plain ndarray views of the maps: still file-backed, but indexing skips
+    # np.memmap's per-access subclass overhead
+    def _load(self, name):
+        return np.load(os.path.join(self.directory, name), mmap_mode="r").view(np.ndarray)
+
+    def _map_blob(self, name):
+        path = os.path.join(self.directory, name)
+        if os.path.getsize(path) == 0:
+            return np.zeros(0, dtype=np.uint8)
+        return np.memmap(path, dtype=np.uint8, mode="r").view(np.ndarray)
+
+    def __len__(self):
+        return self.rows
+
+    def _text(self, column, row):
+        offsets = self._offsets[column]
+        return self._blobs[column][offsets[row]:offsets[row + 1]].tobytes().decode("utf-8")
+
+    def chunk_id(self, row: int) -> str:
+        return chunk_id(self.mal_ids[row], self.chunks[row])
+
+    def row_of(self, doc_id):
+        """Return the row for a ``"<MAL_ID>:<chunk>"`` id, or None."""
+        try:
+            mal_id, chunk = (int(part) for part in str(doc_id).split(":"))
+        except ValueError:
+            return None
+
+        lo = int(np.searchsorted(self._sorted_mal_ids, mal_id, side="left"))
+        hi = int(np.searchsorted(self._sorted_mal_ids, mal_id, side="right"))
+        for position in range(lo, hi):
+            row = int(self._id_order[position])
+            if self.chunks[row] == chunk:
+                return row
+        return None
+
+    def title_rows(self, mal_ids):
+        """Vectorized ``row_of(f"{mal_id}:0")``: first-chunk rows, -1 where missing."""
+        mal_ids = np.asarray(mal_ids, dtype=np.int64)
+        if self.rows == 0:
+            return np.full(len(mal_ids), -1, dtype=np.int64)
+        positions = np.minimum(
+            np.searchsorted(self._sorted_mal_ids, mal_ids, side="left"), self.rows - 1
+        )
+        # Ids are sorted by (MAL_ID, chunk), so the first position is chunk 0
+        rows = self._id_order[positions]
+        found = (self._sorted_mal_ids[positions] == mal_ids) & (self.chunks[rows] == 0)
+        return np.where(found, rows, -1)
+
+    def name(self, row: int) -> str:
+        return self._text("name", row)
+
+    def document(self, row: int) -> Document:
+        score = float(self.scores[row])
+        return Document(
+            page_content=self._text("text", row),
+            metadata={
+                "MAL_ID": int(self.mal_ids[row]),
+                "Name": self._text("name", row),
+                "Genres": self._text("genres", row),
+                "Score": None if math.isnan(score) else round(score, 4),
+            },
+        )
+
+    def search(self, search: str):
+        # Same contract as langchain's InMemoryDocstore.search
+        row = self.row_of(search)
+        if row is None:
+            return f"ID {search} not found."
+        return self.document(row)
+
+    def iter_documents(self):
+        for row in range(self.rows):
+            yield self.chunk_id(row), self.document(row)
+
+
+class RowIdMapping(Mapping):
+    """Lazy ``index_to_docstore_id`` mapping FAISS row ``i`` to its chunk id."""
+
+    def __init__(self, store: ColumnarDocStore):
+        self.store = store
+
+    def __getitem__(self, row):
+        if not 0 <= row < len(self.store):
+            raise KeyError(row)
+        return self.store.chunk_id(row)
+
+    def __iter__(self):
+        return iter(range(len(self.store)))
+
+    def __len__(self):
+        return len(self.store)
@@ -0,0 +1,70 @@
+from configs.config import EMBEDDING_BACKEND
+from utils.logger import get_logger
+
+logger = get_logger()
+
+# "fp32": the sentence-transformer as published. "int8": the same weights with
+# every Linear layer dynamically quantized to int8 for CPU inference.
+EMBEDDING_BACKENDS = ("fp32", "int8")
+
+
+class EmbeddingMismatchError(ValueError):
+    """The query embeddings do not come from the model and backend the index was built with."""
+
+
+def validate_backend(backend: str) -> str:
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend {backend!r}, expected one of {EMBEDDING_BACKENDS}")
+    return backend
+
+
+def load_model(source: str, backend: str = EMBEDDING_BACKEND):
+    """Load a sentence-transformer from ``source`` for ``backend``."""
+    from sentence_transformers import SentenceTransformer
+
+    validate_backend(backend)
+    if backend == "fp32":
+        return SentenceTransformer(source)
+
+    import torch
+
+    # Dynamic quantization only has CPU kernels
+    model = SentenceTransformer(source, device="cpu")
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def embedding_identity(embeddings) -> dict:
+    """Return ``{"model": ..., "backend": ...}`` describing what produces these vectors.
+
+    Wrappers (the batching encoder, the embedding server client) report the
+    identity of what they wrap. Embeddings that do not declare a model, such
+    as the benchmark stubs, are identified by their class name.
+    """
+    if hasattr(embeddings, "identity"):
+        return embeddings.identity()
+    model_name = getattr(embeddings, "model_name", None)
+    if model_name is None:
+        return {"model": type(embeddings).__name__, "backend": "custom"}
+    return {"model": model_name, "backend": getattr(embeddings, "backend", "fp32")}
+
+
+def manifest_identity(manifest: dict) -> dict:
+    # Manifests written before backends existed were always fp32
+    return {
+        "model": manifest.get("embedding_model"),
+        "backend": manifest.get("embedding_backend", "fp32"),
+    }
+
+
+def check_embeddings(manifest: dict, embeddings):
+    """Raise EmbeddingMismatchError unless ``embeddings`` match the index ``manifest``."""
+    if manifest is None:
+        return
+    built = manifest_identity(manifest)
+    serving = embedding_identity(embeddings)
+    if built != serving:
+        raise EmbeddingMismatchError(
+            f"Index was built with {built['model']} ({built['backend']}) but queries would be "
+            f"embedded with {serving['model']} ({serving['backend']}); rebuild the index or set "
+            f"EMBEDDING_BACKEND to match"
+        )
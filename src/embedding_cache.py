@@ -0,0 +1,250 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from configs.config import (
+    EMBEDDING_BACKEND,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_CACHE_DIR,
+    EMBEDDING_MODEL_DIR,
+    EMBEDDING_MODEL_NAME,
+    EMBEDDING_WORKERS,
+)
+from src.embedding_backends import load_model, validate_backend
+from utils.logger import get_logger
+from utils.metrics import increment, span
+
+logger = get_logger()
+
+VECTORS_FILE = "vectors.f32"
+KEYS_FILE = "keys.txt"
+META_FILE = "meta.json"
+
+
+def _safe_name(model_name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+
+
+def baked_model_path(model_name: str) -> str:
+    return os.path.join(EMBEDDING_MODEL_DIR, _safe_name(model_name))
+
+
+class EmbeddingCache:
+    """Content-addressed, append-only embedding store for a single model.
+
+    Vectors live in a raw float32 file that is memory-mapped on read, and
+    ``keys.txt`` holds one sha256(model, text) key per row in the same order.
+    Rows are only ever appended, so a build killed half way leaves at most a
+    trailing partial row, which is ignored on the next open.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str):
+        self.model_name = model_name
+        self.directory = os.path.join(cache_dir, _safe_name(model_name))
+        self.dim = None
+        self._rows = {}
+        self._vectors = None
+        self._lock = threading.Lock()
+        self._open()
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _open(self):
+        if not os.path.exists(self._path(META_FILE)):
+            return
+
+        with open(self._path(META_FILE), encoding="utf-8") as f:
+            self.dim = json.load(f)["dim"]
+        with open(self._path(KEYS_FILE), encoding="utf-8") as f:
+            keys = f.read().split()
+
+        row_count = min(
+            len(keys), os.path.getsize(self._path(VECTORS_FILE)) // (4 * self.dim)
+        )
+        self._rows = {key: row for row, key in enumerate(keys[:row_count])}
+        self._map(row_count)
+
+    def _map(self, row_count):
+        self._vectors = (
+            np.memmap(
+                self._path(VECTORS_FILE),
+                dtype=np.float32,
+                mode="r",
+                shape=(row_count, self.dim),
+            )
+            if row_count
+            else None
+        )
+
+    def __len__(self):
+        return len(self._rows)
+
+    def get_many(self, keys):
+        """Return a list with a vector for every cached key and None otherwise."""
+        return [
+            self._vectors[self._rows[key]] if key in self._rows else None
+            for key in keys
+        ]
+
+    def put_many(self, keys, vectors):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                with open(self._path(META_FILE), "w", encoding="utf-8") as f:
+                    json.dump({"model": self.model_name, "dim": self.dim}, f)
+
+            new = [i for i, key in enumerate(keys) if key not in self._rows]
+            if not new:
+                return
+
+            row_count = len(self._rows)
+            # Vectors are written before keys so a key never points past the data
+            with open(self._path(VECTORS_FILE), "ab") as f:
+                f.truncate(row_count * 4 * self.dim)
+                f.write(vectors[new].tobytes())
+            with open(self._path(KEYS_FILE), "a", encoding="utf-8") as f:
+                f.write("".join(f"{keys[i]}\n" for i in new))
+
+            for offset, i in enumerate(new):
+                self._rows[keys[i]] = row_count + offset
+            self._map(len(self._rows))
+
+
+class CachedEmbeddings(Embeddings):
+    """Sentence-transformer embeddings backed by an on-disk ``EmbeddingCache``.
+
+    Document texts that miss the cache are encoded in batches of
+    ``batch_size``; large misses are spread over ``num_workers`` processes.
+    Queries bypass the disk cache. ``backend`` selects the inference backend
+    (see ``src.embedding_backends``); each backend gets its own cache.
+    """
+
+    def __init__(
+        self,
+        model_name: str = EMBEDDING_MODEL_NAME,
+        cache_dir: str = EMBEDDING_CACHE_DIR,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        num_workers: int = EMBEDDING_WORKERS,
+        backend: str = EMBEDDING_BACKEND,
+    ):
+        self.model_name = model_name
+        self.backend = validate_backend(backend)
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+        # fp32 keeps the original cache namespace so existing caches stay valid
+        cache_name = model_name if backend == "fp32" else f"{model_name}-{backend}"
+        self.cache = EmbeddingCache(cache_dir, cache_name)
+        self._model = None
+        self._pool = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            # Prefer weights baked into the image over a hub download
+            baked_path = baked_model_path(self.model_name)
+            source = baked_path if os.path.isdir(baked_path) else self.model_name
+            logger.info(f"Loading embedding model from {source} ({self.backend})")
+            self._model = load_model(source, self.backend)
+        return self._model
+
+    @contextmanager
+    def worker_pool(self):
+        """Keep one encoder process pool open across ``embed_documents`` calls.
+
+        Streaming builds embed many small batches; without this each large
+        enough batch would start (and load the model into) a fresh pool.
+        """
+        if self.num_workers <= 1 or self._pool is not None:
+            yield
+            return
+        self._pool = self.model.start_multi_process_pool(
+            target_devices=["cpu"] * self.num_workers
+        )
+        try:
+            yield
+        finally:
+            pool, self._pool = self._pool, None
+            self.model.stop_multi_process_pool(pool)
+
+    def _encode(self, texts):
+        # A pool opened by worker_pool() is already paid for; use it for
+        # anything bigger than a couple of batches
+        if self._pool is not None and len(texts) >= 2 * self.batch_size:
+            return self.model.encode_multi_process(
+                texts, self._pool, batch_size=self.batch_size
+            )
+
+        # Starting a pool costs a model load per worker, so only do it when
+        # every worker gets at least a couple of batches
+        if self._pool is None and self.num_workers > 1 and len(texts) >= 2 * self.batch_size * self.num_workers:
+            logger.info(
+                f"Encoding {len(texts)} texts on {self.num_workers} worker processes..."
+            )
+            pool = self.model.start_multi_process_pool(
+                target_devices=["cpu"] * self.num_workers
+            )
+            try:
+                return self.model.encode_multi_process(
+                    texts, pool, batch_size=self.batch_size
+                )
+            finally:
+                self.model.stop_multi_process_pool(pool)
+
+        return self.model.encode(
+            texts, batch_size=self.batch_size, convert_to_numpy=True
+        )
+
+    def embed_documents(self, texts):
+        # Same newline handling as SentenceTransformerEmbeddings so cached and
+        # uncached vectors are interchangeable
+        texts = [text.replace("\n", " ") for text in texts]
+        keys = [self.cache.key(text) for text in texts]
+        vectors = self.cache.get_many(keys)
+
+        missing = {}
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                missing.setdefault(keys[i], texts[i])
+
+        hits = len(texts) - sum(v is None for v in vectors)
+        increment("getanime_cache_requests_total", hits, cache="embedding", outcome="hit")
+        increment("getanime_cache_requests_total", len(texts) - hits, cache="embedding", outcome="miss")
+        logger.info(
+            f"Embedding cache: {hits} hits, {len(missing)} unique texts to encode"
+        )
+        if missing:
+            missing_keys = list(missing)
+            with span("embed.documents", texts=len(missing_keys)):
+                encoded = self._encode([missing[key] for key in missing_keys])
+            self.cache.put_many(missing_keys, encoded)
+            fresh = dict(zip(missing_keys, encoded))
+            vectors = [
+                fresh[key] if vector is None else vector
+                for key, vector in zip(keys, vectors)
+            ]
+
+        return [np.asarray(vector, dtype=np.float32).tolist() for vector in vectors]
+
+    def embed_query(self, text):
+        with span("embed.query"):
+            return self.model.encode(text.replace("\n", " "), convert_to_numpy=True).tolist()
+
+    def embed_queries(self, texts):
+        """Encode many queries in one batched call, bypassing the disk cache."""
+        texts = [text.replace("\n", " ") for text in texts]
+        with span("embed.queries", texts=len(texts)):
+            return self.model.encode(
+                texts, batch_size=self.batch_size, convert_to_numpy=True
+            ).tolist()
@@ -0,0 +1,112 @@
+import os
+import threading
+import time
+
+from langchain_core.embeddings import Embeddings
+
+from configs.config import (
+    EMBEDDING_SERVER_ADDRESS,
+    EMBEDDING_SERVER_AUTHKEY,
+    EMBEDDING_SERVER_CONNECT_TIMEOUT,
+)
+from utils.logger import get_logger
+from utils.metrics import span
+
+logger = get_logger()
+
+
+class EmbeddingServerError(RuntimeError):
+    pass
+
+
+def server_authkey(authkey: str = None) -> bytes:
+    """The embedding server's shared secret, which must be configured.
+
+    Falls back to the environment at call time, so a key that
+    ``python -m app.server`` generated after import still reaches its workers.
+    """
+    authkey = authkey or EMBEDDING_SERVER_AUTHKEY or os.getenv("EMBEDDING_SERVER_AUTHKEY")
+    if not authkey:
+        raise ValueError("Set EMBEDDING_SERVER_AUTHKEY to a private key for the embedding server")
+    return authkey.encode("utf-8")
+
+
+class RemoteEmbeddings(Embeddings):
+    """Embeddings computed by a shared ``app.embedding_server`` process.
+
+    Worker processes that use this instead of ``CachedEmbeddings`` never load
+    the model, so adding workers adds throughput without adding model RSS.
+    Each thread keeps its own connection; a dropped connection is reopened
+    once per call, waiting up to ``connect_timeout`` for the server.
+    """
+
+    def __init__(
+        self,
+        address: str = EMBEDDING_SERVER_ADDRESS,
+        authkey: str = None,
+        connect_timeout: float = EMBEDDING_SERVER_CONNECT_TIMEOUT,
+    ):
+        if not address:
+            raise ValueError("RemoteEmbeddings needs an embedding server address")
+        self.address = address
+        self.authkey = server_authkey(authkey)
+        self.connect_timeout = connect_timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        from multiprocessing.connection import Client
+
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            try:
+                return Client(self.address, family="AF_UNIX", authkey=self.authkey)
+            except (FileNotFoundError, ConnectionRefusedError) as e:
+                if time.monotonic() >= deadline:
+                    raise EmbeddingServerError(
+                        f"Embedding server at {self.address} is not reachable"
+                    ) from e
+                time.sleep(0.2)
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def _drop_connection(self):
+        connection = getattr(self._local, "connection", None)
+        self._local.connection = None
+        if connection is not None:
+            connection.close()
+
+    def _call(self, method, payload):
+        for attempt in range(2):
+            try:
+                connection = self._connection()
+                connection.send((method, payload))
+                status, result = connection.recv()
+                break
+            except (EOFError, OSError):
+                # The server restarted (or this thread's socket went stale)
+                self._drop_connection()
+                if attempt:
+                    raise
+                logger.warning(f"Lost connection to the embedding server at {self.address}, reconnecting")
+
+        if status != "ok":
+            raise EmbeddingServerError(result)
+        return result
+
+    def embed_documents(self, texts):
+        return self._call("embed_documents", list(texts))
+
+    def embed_query(self, text):
+        with span("embed.remote", texts=1):
+            return self._call("embed_query", text)
+
+    def embed_queries(self, texts):
+        with span("embed.remote", texts=len(texts)):
+            return self._call("embed_queries", list(texts))
+
+    def identity(self):
+        return self._call("identity", None)
@@ -0,0 +1,205 @@
+from typing import Any, List, Optional
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from configs.config import (
+    RERANK_CANDIDATES,
+    RETRIEVER_FETCH_K,
+    RETRIEVER_K,
+    RRF_K,
+    SKIP_DENSE_ON_TITLE_MATCH,
+    TITLE_AGGREGATION,
+    TITLE_MATCH_MIN_TOKENS,
+)
+from utils.logger import get_logger
+from utils.metrics import span
+
+logger = get_logger()
+
+
+class HybridRetriever(BaseRetriever):
+    """Fuse BM25 and FAISS rankings with reciprocal rank fusion.
+
+    Both rankers contribute ``fetch_k`` candidates per query and each title
+    scores ``sum(1 / (rrf_k + rank))`` over the rankings it appears in. When
+    the query quotes a catalog title verbatim the dense search is skipped and
+    the lexical ranking is used on its own. Without a lexical index this is a
+    plain dense retriever.
+
+    Dense hits are ranked per title, not per chunk: ``fetch_k`` chunks are
+    fetched, rescored exactly against ``vectors`` when given, and grouped by
+    MAL_ID with the best (``"max"``) or summed (``"sum"``) chunk similarity.
+    The search widens until ``k`` distinct titles are found, so several
+    chunks of one anime never crowd out other candidates.
+
+    With a ``reranker`` (and ``vectors``) the top ``rerank_candidates`` fused
+    titles are reranked for relevance, MAL Score and diversity before the
+    final ``k`` are taken (see ``src.reranker.Reranker``).
+    """
+
+    vector_store: Any
+    lexical_index: Any = None
+    k: int = RETRIEVER_K
+    fetch_k: int = RETRIEVER_FETCH_K
+    rrf_k: int = RRF_K
+    skip_dense_on_title_match: bool = SKIP_DENSE_ON_TITLE_MATCH
+    title_match_min_tokens: int = TITLE_MATCH_MIN_TOKENS
+    title_aggregation: str = TITLE_AGGREGATION
+    vectors: Any = None
+    reranker: Any = None
+    rerank_candidates: int = RERANK_CANDIDATES
+
+    def _document_for(self, mal_id: str) -> Optional[Document]:
+        # Chunk ids are "<MAL_ID>:<chunk>" (see VectorStoreBuilder); the first
+        # chunk carries the title
+        document = self.vector_store.docstore.search(f"{mal_id}:0")
+        return document if isinstance(document, Document) else None
+
+    def _row_mal_ids(self, rows):
+        docstore = self.vector_store.docstore
+        if hasattr(docstore, "mal_ids"):
+            return np.asarray(docstore.mal_ids[rows])
+        ids = self.vector_store.index_to_docstore_id
+        return np.array([int(ids[row].split(":")[0]) for row in rows], dtype=np.int64)
+
+    def _title_rows(self, mal_ids) -> np.ndarray:
+        docstore = self.vector_store.docstore
+        if hasattr(docstore, "title_rows"):
+            return docstore.title_rows([int(mal_id) for mal_id in mal_ids])
+        return np.full(len(mal_ids), -1, dtype=np.int64)
+
+    def _chunk_document(self, row: int) -> Optional[Document]:
+        docstore = self.vector_store.docstore
+        if hasattr(docstore, "document"):
+            return docstore.document(row)
+        document = docstore.search(self.vector_store.index_to_docstore_id[row])
+        return document if isinstance(document, Document) else None
+
+    def _score_titles(self, query_vector, rows, distances):
+        """Group candidate chunk ``rows`` by title; return (mal_ids, scores, best rows)."""
+        if self.vectors is not None:
+            # Exact cosine similarity on the candidate matrix, also undoing ANN
+            # error; sorted rows keep the memory-mapped reads sequential
+            rows = np.sort(rows)
+            matrix = np.asarray(self.vectors[rows], dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query_vector)
+            similarities = matrix @ query_vector / np.maximum(norms, 1e-12)
+        else:
+            # FAISS reports squared L2; for unit vectors that is 2 - 2 * cosine
+            similarities = 1.0 - distances / 2.0
+
+        mal_ids, groups = np.unique(self._row_mal_ids(rows), return_inverse=True)
+        best = np.full(len(mal_ids), -np.inf, dtype=np.float32)
+        np.maximum.at(best, groups, similarities)
+        if self.title_aggregation == "sum":
+            scores = np.zeros(len(mal_ids), dtype=np.float32)
+            np.add.at(scores, groups, similarities)
+        else:
+            scores = best
+
+        # Best chunk per title: the row whose similarity equals the title maximum
+        best_rows = np.empty(len(mal_ids), dtype=np.int64)
+        is_best = similarities >= best[groups]
+        best_rows[groups[is_best]] = rows[is_best]
+        return mal_ids, scores, best_rows
+
+    def _dense_search(self, query_embedding, fetch_k: int, k: int = None):
+        """Return up to ``k`` distinct titles as ``(MAL_ID str, best chunk row)``, best first."""
+        k = k or fetch_k
+        with span("retrieve.dense", k=fetch_k):
+            query_vector = np.asarray(query_embedding, dtype=np.float32)
+            index = self.vector_store.index
+            total = index.ntotal
+
+            fetch = min(max(fetch_k, k), total)
+            while True:
+                distances, rows = index.search(query_vector[None, :], fetch)
+                found = rows[0] >= 0
+                rows, distances = rows[0][found], distances[0][found]
+                mal_ids, scores, best_rows = self._score_titles(query_vector, rows, distances)
+                # Oversample further while chunks of few titles fill the candidates
+                if len(mal_ids) >= k or fetch >= total:
+                    break
+                fetch = min(fetch * 2, total)
+
+            order = np.argsort(-scores, kind="stable")[:k]
+            return [(str(int(mal_ids[position])), int(best_rows[position])) for position in order]
+
+    def _rerank(self, query_embedding, rows, k: int):
+        """Return the positions of the ``k`` candidate ``rows`` the reranker keeps."""
+        with span("retrieve.rerank", candidates=len(rows)):
+            rows = np.asarray(rows, dtype=np.int64)
+            docstore = self.vector_store.docstore
+            if hasattr(docstore, "scores"):
+                scores = docstore.scores[rows]
+            else:
+                scores = [
+                    document.metadata.get("Score") if document is not None else None
+                    for document in map(self._chunk_document, rows)
+                ]
+                scores = np.array([np.nan if score is None else score for score in scores], dtype=np.float32)
+            return self.reranker.rerank(query_embedding, self.vectors[rows], scores, k)
+
+    def retrieve(self, query: str, k: int = None, query_embedding=None) -> List[Document]:
+        k = k or self.k
+        fetch_k = max(self.fetch_k, k)
+        rerank = self.reranker is not None and self.vectors is not None
+
+        if self.lexical_index is None:
+            if query_embedding is None:
+                query_embedding = self.vector_store.embeddings.embed_query(query)
+            hits = self._dense_search(query_embedding, fetch_k, max(fetch_k, self.rerank_candidates) if rerank else k)
+            if rerank:
+                hits = [hits[position] for position in self._rerank(query_embedding, [row for _, row in hits], k)]
+            documents = (self._chunk_document(row) for _, row in hits)
+            return [document for document in documents if document is not None]
+
+        with span("retrieve.lexical", k=fetch_k):
+            lexical_hits = self.lexical_index.search(query, k=fetch_k)
+
+        if self.skip_dense_on_title_match and lexical_hits:
+            title_id = self.lexical_index.match_title(query, self.title_match_min_tokens)
+            if title_id is not None:
+                logger.info(f"Exact title hit ({title_id}), skipping dense search")
+                documents = [self._document_for(mal_id) for mal_id, _ in lexical_hits[:k]]
+                return [doc for doc in documents if doc is not None]
+
+        if query_embedding is None:
+            query_embedding = self.vector_store.embeddings.embed_query(query)
+        dense_hits = self._dense_search(query_embedding, fetch_k)
+
+        with span("retrieve.fusion"):
+            scores = {}
+            rows = {}
+            for rank, (key, row) in enumerate(dense_hits):
+                rows[key] = row
+                scores[key] = 1.0 / (self.rrf_k + rank + 1)
+            for rank, (mal_id, _) in enumerate(lexical_hits):
+                scores[mal_id] = scores.get(mal_id, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+            ranked = sorted(scores, key=scores.get, reverse=True)
+
+        if rerank:
+            # The reranker sees a wider pool of fused titles than it returns
+            pool = ranked[:max(k, self.rerank_candidates)]
+            lexical_only = [key for key in pool if key not in rows]
+            rows.update(zip(lexical_only, self._title_rows(lexical_only).tolist()))
+            pool = [key for key in pool if rows[key] >= 0]
+            ranked = [pool[position] for position in self._rerank(query_embedding, [rows[key] for key in pool], k)]
+
+        # Documents are only decoded for the titles that are returned
+        results = []
+        for key in ranked:
+            document = self._chunk_document(rows[key]) if key in rows else self._document_for(key)
+            if document is not None:
+                results.append(document)
+            if len(results) == k:
+                break
+        return results
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self.retrieve(query)
@@ -0,0 +1,127 @@
+import os
+import shutil
+from contextlib import contextmanager
+from datetime import datetime
+
+from configs.config import INDEX_KEEP_VERSIONS
+from utils.atomic_io import atomic_path
+from utils.logger import get_logger
+
+logger = get_logger()
+
+# <root>/CURRENT names the live version; every build goes to <root>/versions/<name>
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+
+
+def current_version(root: str):
+    """Name of the published version under ``root``, or None for a flat (unversioned) index."""
+    try:
+        with open(os.path.join(root, CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def version_dir(root: str, name: str) -> str:
+    return os.path.join(root, VERSIONS_DIR, name)
+
+
+def resolve_index_dir(root: str) -> str:
+    """Directory holding the live artifacts: the published version, else ``root`` itself."""
+    name = current_version(root)
+    return root if name is None else version_dir(root, name)
+
+
+def publish_version(root: str, name: str):
+    """Point ``CURRENT`` at ``name`` with a single atomic rename."""
+    with atomic_path(os.path.join(root, CURRENT_FILE)) as tmp_path:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(name + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+    logger.info(f"Published index version {name}")
+
+
+def _link_or_copy(src, dst):
+    # Artifacts are only ever replaced, never modified in place, so a build
+    # can share the previous version's files through hard links
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _seed(source: str, target: str):
+    """Hard-link the artifacts in ``source`` into the empty ``target`` directory."""
+    ignore = shutil.ignore_patterns(CURRENT_FILE, VERSIONS_DIR, "*.tmp", "*.tmp-*", "*.part")
+    if os.path.isdir(source):
+        shutil.copytree(source, target, copy_function=_link_or_copy, ignore=ignore, dirs_exist_ok=True)
+
+
+def _files(directory: str):
+    return {
+        os.path.relpath(os.path.join(parent, name), directory)
+        for parent, _, names in os.walk(directory)
+        for name in names
+    }
+
+
+def _same_files(source: str, target: str) -> bool:
+    """True when ``target`` holds exactly ``source``'s files, all still hard links to them."""
+    names = _files(target)
+    return names == _files(source) and all(
+        os.path.samefile(os.path.join(source, name), os.path.join(target, name)) for name in names
+    )
+
+
+def prune_versions(root: str, keep: int = INDEX_KEEP_VERSIONS):
+    """Delete all but the ``keep`` newest versions up to and including the published one.
+
+    Older versions stay readable by processes that still have them mapped:
+    unlinking a file does not invalidate existing mappings.
+    """
+    current = current_version(root)
+    versions_root = os.path.join(root, VERSIONS_DIR)
+    if current is None or not os.path.isdir(versions_root):
+        return []
+    # Names sort chronologically; newer unpublished builds are left alone
+    older = sorted(name for name in os.listdir(versions_root) if name < current)
+    removed = older[:max(0, len(older) - max(keep - 1, 0))]
+    for name in removed:
+        shutil.rmtree(version_dir(root, name), ignore_errors=True)
+    if removed:
+        logger.info(f"Pruned index versions {removed}")
+    return removed
+
+
+@contextmanager
+def staged_version(root: str, keep: int = INDEX_KEEP_VERSIONS):
+    """Yield a fresh version directory to build into; publish it if the block succeeds.
+
+    The directory starts as hard links to the live artifacts (a flat legacy
+    index under ``root`` included), so incremental builds see the previous
+    state without copying it. Readers keep using the old version until the
+    ``CURRENT`` pointer moves; a failed build is discarded, and so is one
+    that replaced no artifact, so a no-op build neither publishes nor prunes.
+    """
+    name = datetime.now().strftime("%Y%m%d%H%M%S%f")
+    target = version_dir(root, name)
+    os.makedirs(os.path.join(root, VERSIONS_DIR), exist_ok=True)
+    _seed(resolve_index_dir(root), target)
+    os.makedirs(target, exist_ok=True)
+
+    try:
+        yield target
+    except BaseException:
+        shutil.rmtree(target, ignore_errors=True)
+        raise
+
+    live = current_version(root)
+    if live is not None and _same_files(version_dir(root, live), target):
+        shutil.rmtree(target, ignore_errors=True)
+        logger.info(f"Build changed nothing, index version {live} stays published")
+        return
+
+    publish_version(root, name)
+    prune_versions(root, keep)
@@ -0,0 +1,146 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+
+import numpy as np
+
+from utils.logger import get_logger
+
+logger = get_logger()
+
+LEXICAL_INDEX_FILE = "lexical_index.json"
+
+# Title terms count more than genre terms, which count more than synopsis terms
+FIELD_WEIGHTS = {"Name": 3, "Genres": 2, "Synopsis": 1}
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str):
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+class BM25Index:
+    """In-memory BM25 inverted index over the Name/Genres/Synopsis fields.
+
+    Field weighting is done by repeating a field's terms ``FIELD_WEIGHTS``
+    times, a cheap approximation of BM25F. Postings are kept as numpy arrays
+    so scoring a query is a handful of vectorized updates per query term.
+    """
+
+    def __init__(self, doc_ids, titles, doc_lengths, postings, k1=1.5, b=0.75):
+        self.doc_ids = list(doc_ids)
+        self.titles = list(titles)
+        self.doc_lengths = np.asarray(doc_lengths, dtype=np.float32)
+        self.k1 = k1
+        self.b = b
+        self.postings = {
+            term: (np.asarray(docs, dtype=np.int32), np.asarray(tfs, dtype=np.float32))
+            for term, (docs, tfs) in postings.items()
+        }
+        self.avg_length = float(self.doc_lengths.mean()) if len(self.doc_lengths) else 0.0
+
+        self._title_lookup = {}
+        for position, title in enumerate(self.titles):
+            self._title_lookup.setdefault(" ".join(tokenize(title)), position)
+        self._max_title_tokens = max(
+            (len(key.split()) for key in self._title_lookup), default=0
+        )
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    @classmethod
+    def build(cls, df, k1=1.5, b=0.75):
+        """Index a DataFrame, or an iterable of DataFrame chunks (streaming builds)."""
+        doc_ids, titles, doc_lengths = [], [], []
+        postings = {}
+
+        frames = [df] if hasattr(df, "itertuples") else df
+        rows = (row for frame in frames for row in frame.itertuples(index=False))
+        for position, row in enumerate(rows):
+            terms = Counter()
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in tokenize(getattr(row, field)):
+                    terms[token] += weight
+
+            doc_ids.append(str(row.MAL_ID))
+            titles.append(str(row.Name))
+            doc_lengths.append(sum(terms.values()))
+            for term, tf in terms.items():
+                docs, tfs = postings.setdefault(term, ([], []))
+                docs.append(position)
+                tfs.append(tf)
+
+        logger.info(f"Built lexical index over {len(doc_ids)} titles and {len(postings)} terms")
+        return cls(doc_ids, titles, doc_lengths, postings, k1=k1, b=b)
+
+    def save(self, directory: str):
+        data = {
+            "k1": self.k1,
+            "b": self.b,
+            "doc_ids": self.doc_ids,
+            "titles": self.titles,
+            "doc_lengths": self.doc_lengths.tolist(),
+            "postings": {
+                term: [docs.tolist(), tfs.tolist()]
+                for term, (docs, tfs) in self.postings.items()
+            },
+        }
+        path = os.path.join(directory, LEXICAL_INDEX_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, directory: str):
+        """Load the persisted index, or return None if the build did not write one."""
+        path = os.path.join(directory, LEXICAL_INDEX_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(
+            data["doc_ids"],
+            data["titles"],
+            data["doc_lengths"],
+            data["postings"],
+            k1=data["k1"],
+            b=data["b"],
+        )
+
+    def search(self, query: str, k: int = 10):
+        """Return up to ``k`` ``(MAL_ID, score)`` pairs, best first."""
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        n_docs = len(self.doc_ids)
+
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            docs, tfs = self.postings[term]
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[docs] / self.avg_length)
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+        hits = np.flatnonzero(scores)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(self.doc_ids[i], float(scores[i])) for i in hits]
+
+    def match_title(self, query: str, min_tokens: int = 2):
+        """Return the MAL_ID of the longest title quoted verbatim in ``query``.
+
+        Titles shorter than ``min_tokens`` tokens are ignored so that common
+        words ("Monster", "Another") do not count as title hits.
+        """
+        tokens = tokenize(query)
+        for size in range(min(len(tokens), self._max_title_tokens), min_tokens - 1, -1):
+            for start in range(len(tokens) - size + 1):
+                position = self._title_lookup.get(" ".join(tokens[start:start + size]))
+                if position is not None:
+                    return self.doc_ids[position]
+        return None
@@ -0,0 +1,398 @@
+import json
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, List, Optional
+
+import httpx
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, convert_to_openai_messages
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from configs.config import (
+    LLM_BACKOFF_MAX_SECONDS,
+    LLM_BACKOFF_SECONDS,
+    LLM_BASE_URL,
+    LLM_BREAKER_FAILURES,
+    LLM_BREAKER_RESET_SECONDS,
+    LLM_HEDGE,
+    LLM_HEDGE_MIN_SAMPLES,
+    LLM_MAX_CONNECTIONS,
+    LLM_MAX_RETRIES,
+    LLM_TIMEOUT_SECONDS,
+)
+from utils.logger import get_logger
+from utils.metrics import increment
+
+logger = get_logger()
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class LLMError(RuntimeError):
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self):
+        return self.status is None or self.status in RETRYABLE_STATUS
+
+
+class CircuitOpenError(LLMError):
+    def __init__(self, message):
+        super().__init__(message, status=503)
+
+    @property
+    def retryable(self):
+        return False
+
+
+class CircuitBreaker:
+    """Open after ``failure_threshold`` consecutive failures, probe again after ``reset_seconds``."""
+
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURES, reset_seconds: float = LLM_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._probe_thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_seconds:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_seconds or self._probing:
+                return False
+            # Half-open: let exactly one probe through
+            self._probing = True
+            self._probe_thread = threading.get_ident()
+            return True
+
+    def release_probe(self):
+        """Let another probe through if this thread's probe ended without a verdict."""
+        with self._lock:
+            if self._probing and self._probe_thread == threading.get_ident():
+                self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            # A failed half-open probe re-opens at once; late failures of calls
+            # started before the breaker opened do not extend the open period
+            if self._probing or (self._opened_at is None and self._failures >= self.failure_threshold):
+                logger.warning(f"LLM circuit breaker opened after {self._failures} consecutive failures")
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+class LatencyWindow:
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float, min_samples: int = 1):
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def shared_http_client(base_url: str, max_connections: int = LLM_MAX_CONNECTIONS) -> httpx.Client:
+    """One keep-alive connection pool per upstream, shared by every client in the process."""
+    with _clients_lock:
+        client = _clients.get(base_url)
+        if client is None or client.is_closed:
+            client = _clients[base_url] = httpx.Client(
+                base_url=base_url,
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections,
+                ),
+            )
+        return client
+
+
+_hedge_executor = ThreadPoolExecutor(max_workers=LLM_MAX_CONNECTIONS, thread_name_prefix="llm-hedge")
+
+
+class ResilientLLMClient:
+    """Chat completions over an OpenAI-compatible HTTP API.
+
+    Every call gets an overall ``timeout`` deadline. Within it, 429 and 5xx
+    responses and transport errors are retried with exponential backoff and
+    full jitter, honouring ``Retry-After``. With ``hedge`` enabled, an attempt
+    that outlives the observed p95 latency gets a duplicate request and the
+    first success wins. A circuit breaker fails calls fast while the upstream
+    keeps failing.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        base_url: str = LLM_BASE_URL,
+        timeout: float = LLM_TIMEOUT_SECONDS,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff: float = LLM_BACKOFF_SECONDS,
+        backoff_max: float = LLM_BACKOFF_MAX_SECONDS,
+        hedge: bool = LLM_HEDGE,
+        hedge_min_samples: int = LLM_HEDGE_MIN_SAMPLES,
+        breaker: CircuitBreaker = None,
+        temperature: float = 0,
+    ):
+        if not api_key:
+            # Fail at startup, not with a 401 for "Bearer None" on the first query
+            raise ValueError("No LLM API key configured; set GROQ_API_KEY")
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = breaker or CircuitBreaker()
+        self.temperature = temperature
+        self.latency = LatencyWindow()
+        self.http = shared_http_client(self.base_url)
+
+    def _payload(self, messages, stream=False, **params):
+        return {
+            "model": self.model,
+            "messages": messages,
+            "temperature": self.temperature,
+            "stream": stream,
+            **params,
+        }
+
+    @property
+    def _headers(self):
+        return {"Authorization": f"Bearer {self.api_key}"}
+
+    @staticmethod
+    def _check(response: httpx.Response):
+        if response.status_code < 400:
+            return
+        retry_after = response.headers.get("retry-after")
+        try:
+            retry_after = float(retry_after) if retry_after else None
+        except ValueError:
+            retry_after = None
+        raise LLMError(
+            f"LLM request failed with HTTP {response.status_code}: {response.text[:200]}",
+            status=response.status_code,
+            retry_after=retry_after,
+        )
+
+    def _attempt(self, payload, deadline):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise LLMError("LLM call deadline exceeded")
+        start = time.monotonic()
+        try:
+            response = self.http.post(
+                "/chat/completions", json=payload, headers=self._headers, timeout=remaining
+            )
+            self._check(response)
+        except httpx.TransportError as e:
+            # Timeouts and connection errors: the upstream is unhealthy
+            self.breaker.record_failure()
+            raise LLMError(f"LLM request failed: {e!r}") from e
+        except LLMError as e:
+            # Any completed HTTP exchange, a 4xx included, shows the upstream is up
+            if e.retryable:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+
+        self.breaker.record_success()
+        self.latency.observe(time.monotonic() - start)
+        return response.json()
+
+    def _hedged_attempt(self, payload, deadline):
+        delay = self.latency.percentile(0.95, self.hedge_min_samples) if self.hedge else None
+        if delay is None:
+            return self._attempt(payload, deadline)
+
+        primary = _hedge_executor.submit(self._attempt, payload, deadline)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        increment("getanime_llm_hedged_total")
+        pending = {primary, _hedge_executor.submit(self._attempt, payload, deadline)}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    # The slower duplicate finishes in the background and is dropped
+                    return future.result()
+                except LLMError as e:
+                    error = e
+        raise error
+
+    def _backoff_delay(self, attempt, error, deadline):
+        delay = random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt))
+        if error.retry_after is not None:
+            delay = max(delay, min(error.retry_after, self.backoff_max))
+        return min(delay, max(0.0, deadline - time.monotonic()))
+
+    def _call(self, send, timeout=None):
+        deadline = time.monotonic() + (timeout or self.timeout)
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                increment("getanime_llm_requests_total", outcome="circuit_open")
+                raise CircuitOpenError("LLM circuit breaker is open, failing fast")
+            try:
+                result = send(deadline)
+                increment("getanime_llm_requests_total", outcome="ok")
+                return result
+            except LLMError as e:
+                if not e.retryable or attempt >= self.max_retries or time.monotonic() >= deadline:
+                    increment("getanime_llm_requests_total", outcome="error")
+                    raise
+                error = e
+            finally:
+                # Deadline and unexpected errors record nothing; never leave a probe pending
+                self.breaker.release_probe()
+            delay = self._backoff_delay(attempt, error, deadline)
+            logger.warning(f"{error} - retrying in {delay:.2f}s (attempt {attempt + 1}/{self.max_retries})")
+            increment("getanime_llm_retries_total")
+            time.sleep(delay)
+            attempt += 1
+
+    def complete(self, messages, timeout: float = None, **params) -> dict:
+        """Return the chat completion response body for OpenAI-style ``messages``."""
+        payload = self._payload(messages, **params)
+        return self._call(lambda deadline: self._hedged_attempt(payload, deadline), timeout)
+
+    def _open_stream(self, payload, deadline):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise LLMError("LLM call deadline exceeded")
+        try:
+            request = self.http.build_request(
+                "POST", "/chat/completions", json=payload, headers=self._headers, timeout=remaining
+            )
+            response = self.http.send(request, stream=True)
+        except httpx.TransportError as e:
+            self.breaker.record_failure()
+            raise LLMError(f"LLM request failed: {e!r}") from e
+        try:
+            if response.status_code >= 400:
+                response.read()
+            self._check(response)
+        except LLMError as e:
+            response.close()
+            if e.retryable:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+        self.breaker.record_success()
+        return response
+
+    def stream(self, messages, timeout: float = None, **params):
+        """Yield parsed server-sent chunks of a streamed chat completion.
+
+        Only opening the stream is retried; once chunks flow, a failure is
+        raised to the caller. ``timeout`` bounds each read, not the whole stream.
+        """
+        payload = self._payload(messages, stream=True, **params)
+        response = self._call(lambda deadline: self._open_stream(payload, deadline), timeout)
+        try:
+            for line in response.iter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                yield json.loads(data)
+        finally:
+            response.close()
+
+
+def _usage_metadata(usage):
+    if not usage:
+        return None
+    input_tokens = usage.get("prompt_tokens", 0)
+    output_tokens = usage.get("completion_tokens", 0)
+    return {
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "total_tokens": usage.get("total_tokens", input_tokens + output_tokens),
+    }
+
+
+class ResilientChatModel(BaseChatModel):
+    """LangChain chat model backed by ``ResilientLLMClient``."""
+
+    client: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return "resilient-openai-compatible"
+
+    def _generate(self, messages, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> ChatResult:
+        params = {"stop": stop} if stop else {}
+        body = self.client.complete(convert_to_openai_messages(messages), **params)
+        message = body["choices"][0]["message"]
+        return ChatResult(
+            generations=[
+                ChatGeneration(
+                    message=AIMessage(
+                        content=message.get("content") or "",
+                        usage_metadata=_usage_metadata(body.get("usage")),
+                    )
+                )
+            ]
+        )
+
+    def _stream(self, messages, stop: Optional[List[str]] = None, run_manager=None, **kwargs):
+        params = {"stop": stop} if stop else {}
+        for event in self.client.stream(convert_to_openai_messages(messages), **params):
+            choices = event.get("choices") or []
+            content = (choices[0].get("delta") or {}).get("content") if choices else None
+            usage = _usage_metadata(event.get("usage") or (event.get("x_groq") or {}).get("usage"))
+            if not content and usage is None:
+                continue
+            chunk = ChatGenerationChunk(
+                message=AIMessageChunk(content=content or "", usage_metadata=usage)
+            )
+            if run_manager and content:
+                run_manager.on_llm_new_token(content, chunk=chunk)
+            yield chunk
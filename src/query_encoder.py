@@ -0,0 +1,173 @@
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.embedding_backends import embedding_identity
+from configs.config import (
+    QUERY_BATCH_MAX_SIZE,
+    QUERY_BATCH_WINDOW_MS,
+    QUERY_EMBEDDING_CACHE_SIZE,
+    QUERY_ENCODE_TIMEOUT_SECONDS,
+)
+from utils.logger import get_logger
+from utils.metrics import describe, increment, observe
+
+logger = get_logger()
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class _Request:
+    __slots__ = ("text", "future")
+
+    def __init__(self, text):
+        self.text = text
+        self.future = Future()
+
+
+class BatchingQueryEncoder(Embeddings):
+    """Encode concurrent queries together, with an LRU of recent query embeddings.
+
+    Queries that miss the cache are handed to one encoder thread, which
+    collects them for up to ``window_ms`` (at most ``max_batch`` texts) and
+    runs a single batched ``embed_queries`` call on ``base``. Queries that
+    arrive while a batch is encoding simply join the next one. The window is
+    only waited out when the previous batch had company, so a lone caller is
+    never delayed. Document embedding is passed straight through.
+
+    A failing batch fails only its own callers; the thread keeps serving.
+    Callers give up after ``timeout`` seconds rather than hang on a stuck
+    encoder.
+    """
+
+    def __init__(
+        self,
+        base: Embeddings,
+        window_ms: float = QUERY_BATCH_WINDOW_MS,
+        max_batch: int = QUERY_BATCH_MAX_SIZE,
+        cache_size: int = QUERY_EMBEDDING_CACHE_SIZE,
+        timeout: float = QUERY_ENCODE_TIMEOUT_SECONDS,
+    ):
+        self.base = base
+        self.timeout = timeout
+        self.window = window_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._queue = queue.SimpleQueue()
+        self._last_batch_size = 0
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def _cached(self, text):
+        with self._cache_lock:
+            vector = self._cache.get(text)
+            if vector is not None:
+                self._cache.move_to_end(text)
+        return vector
+
+    def _remember(self, text, vector):
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache[text] = vector
+            self._cache.move_to_end(text)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._thread_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, daemon=True, name="query-encoder"
+                    )
+                    self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + (self.window if self._last_batch_size > 1 else 0.0)
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = []
+            try:
+                # Requests whose caller timed out were cancelled; the rest can no longer be
+                batch = [request for request in self._collect() if request.future.set_running_or_notify_cancel()]
+                if not batch:
+                    continue
+                self._last_batch_size = len(batch)
+                texts = list(dict.fromkeys(request.text for request in batch))
+                observe("getanime_query_batch_size", len(texts), buckets=BATCH_SIZE_BUCKETS)
+                embed_batch = getattr(self.base, "embed_queries", self.base.embed_documents)
+                vectors = dict(zip(texts, np.asarray(embed_batch(texts), dtype=np.float32)))
+
+                for text, vector in vectors.items():
+                    self._remember(text, vector)
+                for request in batch:
+                    request.future.set_result(vectors[request.text])
+            except Exception as e:
+                # Any failure is this batch's alone: the thread must outlive it
+                logger.error(f"Batched query encoding failed for {len(batch)} queries: {str(e)}")
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+
+    def _encode(self, texts):
+        texts = [text.replace("\n", " ") for text in texts]
+        vectors = [self._cached(text) for text in texts]
+        hits = sum(vector is not None for vector in vectors)
+        increment("getanime_cache_requests_total", hits, cache="query_embedding", outcome="hit")
+        increment("getanime_cache_requests_total", len(texts) - hits, cache="query_embedding", outcome="miss")
+
+        if hits < len(texts):
+            self._ensure_thread()
+            pending = {}
+            for text, vector in zip(texts, vectors):
+                if vector is None and text not in pending:
+                    pending[text] = _Request(text)
+                    self._queue.put(pending[text])
+            deadline = time.monotonic() + self.timeout
+            try:
+                vectors = [
+                    vector if vector is not None
+                    else pending[text].future.result(timeout=max(0.0, deadline - time.monotonic()))
+                    for text, vector in zip(texts, vectors)
+                ]
+            except FutureTimeoutError:
+                for request in pending.values():
+                    request.future.cancel()
+                raise TimeoutError(f"Query encoding did not finish within {self.timeout}s") from None
+        return [vector.tolist() for vector in vectors]
+
+    def embed_query(self, text):
+        return self._encode([text])[0]
+
+    def embed_queries(self, texts):
+        return self._encode(texts)
+
+    def embed_documents(self, texts):
+        return self.base.embed_documents(texts)
+
+    def identity(self):
+        return embedding_identity(self.base)
+
+
+describe("getanime_query_batch_size", "Distinct queries per batched encoder call")
@@ -0,0 +1,91 @@
+import atexit
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import Counter
+
+from configs.config import QUERY_LOG_PATH, QUERY_LOG_SAMPLE_RATE
+from src.response_cache import normalize_query
+from utils.logger import get_logger
+
+logger = get_logger()
+
+
+class QueryLogWriter:
+    """Append sampled query records to a JSON-lines file from a background thread.
+
+    ``record`` never blocks the request: it only enqueues, and records are
+    dropped (and counted in ``dropped``) when the queue is full.
+    """
+
+    def __init__(self, path: str = QUERY_LOG_PATH, sample_rate: float = QUERY_LOG_SAMPLE_RATE, max_pending: int = 10000):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, daemon=True, name="query-log")
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, query: str, latency_s: float, cache: str, mode: str = "recommend"):
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        record = {
+            "ts": round(time.time(), 3),
+            "query": normalize_query(query),
+            "latency_ms": round(latency_s * 1000, 1),
+            "cache": cache,
+            "mode": mode,
+        }
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    break
+                f.write(json.dumps(record) + "\n")
+                # Flush once the burst is written rather than per record
+                if self._queue.empty():
+                    f.flush()
+
+    def close(self):
+        if self._thread.is_alive():
+            try:
+                self._queue.put(None, timeout=5)
+            except queue.Full:
+                return
+            self._thread.join(timeout=5)
+
+
+def read_query_log(path: str = QUERY_LOG_PATH):
+    """Yield records from a query log, skipping lines that do not parse."""
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def frequent_queries(path: str = QUERY_LOG_PATH, limit: int = 50, max_age_seconds: float = None):
+    """Return the ``limit`` most frequent normalized queries, most frequent first."""
+    cutoff = time.time() - max_age_seconds if max_age_seconds else None
+    counts = Counter(
+        record["query"]
+        for record in read_query_log(path)
+        if record.get("query") and (cutoff is None or record.get("ts", 0) >= cutoff)
+    )
+    return [query for query, _ in counts.most_common(limit)]
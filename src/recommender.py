@@ -1,23 +1,73 @@
-from langchain.chains import RetrievalQA
-from langchain_groq import ChatGroq
-from src.prompt_template import get_anime_prompt
+import time
+
+from src.context_builder import ContextBuilder
+from utils.metrics import STAGE_LATENCY, increment, observe, span
+
+
+def _record_usage(message):
+    # Providers that report usage (Groq does) attach it as usage_metadata
+    usage = getattr(message, "usage_metadata", None) or {}
+    if usage.get("input_tokens"):
+        increment("getanime_llm_tokens_total", usage["input_tokens"], kind="prompt")
+    if usage.get("output_tokens"):
+        increment("getanime_llm_tokens_total", usage["output_tokens"], kind="completion")
 
 
 class AnimeRecommender:
-    def __init__(self, retriever, api_key: str, model_name: str):
-        self.llm = ChatGroq(api_key=api_key, model=model_name, temperature=0)
+    def __init__(self, retriever, api_key: str, model_name: str, llm=None, context_builder=None):
+        if llm is None:
+            # Imported here so importing the pipeline stays cheap at process start
+            from src.llm_client import ResilientChatModel, ResilientLLMClient
+
+            llm = ResilientChatModel(client=ResilientLLMClient(api_key=api_key, model=model_name))
+        self.llm = llm
+        # langchain's prompt machinery is heavy; load it with the first recommender
+        from src.prompt_template import get_anime_prompt
+
         self.prompt = get_anime_prompt()
+        self.retriever = retriever
+        self.context_builder = context_builder or ContextBuilder()
+
+    def build_prompt(self, query: str, documents=None) -> str:
+        if documents is None:
+            with span("retrieve"):
+                documents = self.retriever.invoke(query)
+
+        with span("prompt.assemble", documents=len(documents)) as assemble:
+            context, stats = self.context_builder.build(query, documents)
+            assemble.set(**stats)
+            return self.prompt.format(context=context, question=query)
+
+    def get_recommendation(self, query: str, documents=None):
+        prompt = self.build_prompt(query, documents)
+        with span("llm.generate"):
+            response = self.llm.invoke(prompt)
+        _record_usage(response)
+        return response.content
+
+    async def aget_recommendation(self, query: str, documents=None):
+        if documents is None:
+            documents = await self.retriever.ainvoke(query)
+        prompt = self.build_prompt(query, documents)
+        with span("llm.generate"):
+            response = await self.llm.ainvoke(prompt)
+        _record_usage(response)
+        return response.content
 
-        self.qa_chain = RetrievalQA.from_chain_type(
-            llm=self.llm,
-            chain_type="stuff",
-            retriever=retriever,
-            return_source_documents=True,
-            chain_type_kwargs={"prompt": self.prompt},
-        )
-
-    def get_recommendation(self, query: str):
-        result = self.qa_chain.invoke(
-            {"query": query}
-        )  # Changed from .run() to .invoke()
-        return result["result"]
+    def stream_recommendation(self, query: str, documents=None):
+        """Yield the answer text chunk by chunk as the LLM produces it."""
+        prompt = self.build_prompt(query, documents)
+        usage = None
+        with span("llm.stream"):
+            start = time.perf_counter()
+            first_token = True
+            for chunk in self.llm.stream(prompt):
+                if first_token and chunk.content:
+                    observe(STAGE_LATENCY, time.perf_counter() - start, stage="llm.first_token")
+                    first_token = False
+                if getattr(chunk, "usage_metadata", None):
+                    usage = chunk
+                if chunk.content:
+                    yield chunk.content
+        if usage is not None:
+            _record_usage(usage)
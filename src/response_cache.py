@@ -0,0 +1,130 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from configs.config import (
+    RESPONSE_CACHE_SIMILARITY,
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_CACHE_TTL_SECONDS,
+)
+from utils.metrics import increment
+
+
+def normalize_query(query: str) -> str:
+    query = re.sub(r"[^\w\s]", " ", query.lower())
+    return " ".join(query.split())
+
+
+class _Entry:
+    __slots__ = ("response", "embedding", "expires_at")
+
+    def __init__(self, response, embedding, expires_at):
+        self.response = response
+        self.embedding = embedding
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """Two-level LRU cache of recommendation answers.
+
+    Lookups first try an exact match on the normalized query text and then,
+    if a query embedding is given, the most similar cached query whose cosine
+    similarity reaches ``similarity_threshold``. Entries expire after
+    ``ttl_seconds`` and the whole cache is dropped when the index it was
+    filled from changes (see ``bind_index``).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = RESPONSE_CACHE_SIZE,
+        ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+        similarity_threshold: float = RESPONSE_CACHE_SIMILARITY,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.index_version = None
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def bind_index(self, version):
+        """Invalidate every entry if ``version`` differs from the bound index."""
+        with self._lock:
+            if version != self.index_version:
+                self._entries.clear()
+                self.index_version = version
+
+    @staticmethod
+    def _unit(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _evict_expired(self, now):
+        expired = [key for key, entry in self._entries.items() if entry.expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+
+    def get_exact(self, query: str):
+        key = normalize_query(query)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= now:
+                return None
+            self._entries.move_to_end(key)
+            self.stats["exact_hits"] += 1
+        increment("getanime_cache_requests_total", cache="response", outcome="exact_hit")
+        return entry.response
+
+    def get_similar(self, embedding):
+        now = time.monotonic()
+        query = self._unit(embedding)
+        with self._lock:
+            self._evict_expired(now)
+            candidates = [
+                (key, entry)
+                for key, entry in self._entries.items()
+                if entry.embedding is not None
+            ]
+            if candidates:
+                matrix = np.stack([entry.embedding for _, entry in candidates])
+                scores = matrix @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.similarity_threshold:
+                    key, entry = candidates[best]
+                    self._entries.move_to_end(key)
+                    self.stats["semantic_hits"] += 1
+                    increment("getanime_cache_requests_total", cache="response", outcome="semantic_hit")
+                    return entry.response
+
+            self.stats["misses"] += 1
+        increment("getanime_cache_requests_total", cache="response", outcome="miss")
+        return None
+
+    def put(self, query: str, response: str, embedding=None):
+        if self.max_entries <= 0:
+            return
+
+        key = normalize_query(query)
+        entry = _Entry(
+            response,
+            self._unit(embedding) if embedding is not None else None,
+            time.monotonic() + self.ttl_seconds,
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
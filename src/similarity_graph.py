@@ -0,0 +1,119 @@
+import json
+import os
+
+import numpy as np
+
+from configs.config import SIMILAR_TOP_N, SIMILARITY_BLOCK_ROWS
+from utils.atomic_io import atomic_path, save_array
+from utils.logger import get_logger
+
+logger = get_logger()
+
+SIMILARITY_DIR = "similarity"
+
+
+def title_vectors(vectors: np.ndarray, row_mal_ids: np.ndarray):
+    """Average chunk vectors per MAL_ID.
+
+    Returns (sorted MAL_IDs, first docstore row of each title, unit title vectors).
+    """
+    mal_ids, first_rows, groups = np.unique(
+        np.asarray(row_mal_ids), return_index=True, return_inverse=True
+    )
+    titles = np.zeros((len(mal_ids), vectors.shape[1]), dtype=np.float32)
+    np.add.at(titles, groups, np.asarray(vectors, dtype=np.float32))
+    titles /= np.maximum(np.linalg.norm(titles, axis=1, keepdims=True), 1e-12)
+    return mal_ids, first_rows, titles
+
+
+class SimilarityGraph:
+    """Top-N cosine nearest neighbours of every title, keyed by MAL_ID.
+
+    Stored as arrays: sorted MAL_IDs, each title's first docstore row, an
+    ``(titles, N)`` int32 matrix of neighbour positions and the matching
+    float16 similarities. Lookups are a binary search plus a row slice.
+    """
+
+    def __init__(self, mal_ids, rows, neighbors, scores):
+        self.mal_ids = mal_ids
+        self.rows = rows
+        self.neighbors = neighbors
+        self.scores = scores
+
+    def __len__(self):
+        return len(self.mal_ids)
+
+    @property
+    def top_n(self):
+        return self.neighbors.shape[1]
+
+    @classmethod
+    def build(cls, vectors, row_mal_ids, top_n: int = SIMILAR_TOP_N, block_rows: int = SIMILARITY_BLOCK_ROWS):
+        mal_ids, rows, titles = title_vectors(vectors, row_mal_ids)
+        count = len(mal_ids)
+        top_n = max(0, min(top_n, count - 1))
+        neighbors = np.empty((count, top_n), dtype=np.int32)
+        scores = np.empty((count, top_n), dtype=np.float16)
+
+        # One (block_rows x titles) similarity block at a time keeps memory flat
+        for start in range(0, count, block_rows):
+            stop = min(start + block_rows, count)
+            block = titles[start:stop] @ titles.T
+            block[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+            if top_n == 0:
+                continue
+            top = np.argpartition(-block, top_n - 1, axis=1)[:, :top_n]
+            top_scores = np.take_along_axis(block, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind="stable")
+            neighbors[start:stop] = np.take_along_axis(top, order, axis=1)
+            scores[start:stop] = np.take_along_axis(top_scores, order, axis=1)
+
+        logger.info(f"Built similarity graph: {count} titles x {top_n} neighbours")
+        return cls(mal_ids, rows.astype(np.int64), neighbors, scores)
+
+    def save(self, directory: str):
+        path = os.path.join(directory, SIMILARITY_DIR)
+        os.makedirs(path, exist_ok=True)
+        save_array(os.path.join(path, "mal_id.npy"), self.mal_ids)
+        save_array(os.path.join(path, "row.npy"), self.rows)
+        save_array(os.path.join(path, "neighbors.npy"), self.neighbors)
+        save_array(os.path.join(path, "scores.npy"), self.scores)
+        with atomic_path(os.path.join(path, "graph.json")) as tmp_path:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"titles": len(self), "top_n": self.top_n}, f)
+
+    @classmethod
+    def load(cls, directory: str):
+        """Memory-map the persisted graph, or return None if the build did not write one."""
+        path = os.path.join(directory, SIMILARITY_DIR)
+        if not os.path.exists(os.path.join(path, "graph.json")):
+            return None
+        return cls(
+            np.load(os.path.join(path, "mal_id.npy"), mmap_mode="r"),
+            np.load(os.path.join(path, "row.npy"), mmap_mode="r"),
+            np.load(os.path.join(path, "neighbors.npy"), mmap_mode="r"),
+            np.load(os.path.join(path, "scores.npy"), mmap_mode="r"),
+        )
+
+    def position(self, mal_id):
+        position = int(np.searchsorted(self.mal_ids, int(mal_id)))
+        if position < len(self.mal_ids) and self.mal_ids[position] == int(mal_id):
+            return position
+        return None
+
+    def row(self, mal_id):
+        """Docstore row of the title's first chunk, or None."""
+        position = self.position(mal_id)
+        return None if position is None else int(self.rows[position])
+
+    def similar(self, mal_id, k: int = 10):
+        """Return up to ``k`` ``(MAL_ID, similarity, docstore row)``, most similar first."""
+        position = self.position(mal_id)
+        if position is None:
+            return []
+        neighbors = self.neighbors[position, :k]
+        return list(zip(
+            self.mal_ids[neighbors].tolist(),
+            self.scores[position, :k].astype(float).tolist(),
+            self.rows[neighbors].tolist(),
+        ))
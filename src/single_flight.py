@@ -0,0 +1,121 @@
+import asyncio
+import threading
+
+from utils.logger import get_logger
+from utils.metrics import increment
+
+logger = get_logger()
+
+
+class Flight:
+    """One in-flight computation; followers wait on it or read its chunks live."""
+
+    def __init__(self):
+        self.chunks = []
+        self.result = None
+        self.error = None
+        self.done = False
+        self._cond = threading.Condition()
+
+    def publish(self, chunk):
+        with self._cond:
+            self.chunks.append(chunk)
+            self._cond.notify_all()
+
+    def finish(self, result=None, error=None):
+        with self._cond:
+            self.result = result
+            self.error = error
+            self.done = True
+            self._cond.notify_all()
+
+    def wait(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self.done)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    def iter_chunks(self):
+        """Yield published chunks as they arrive, then raise the leader's error if any."""
+        position = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self.done or len(self.chunks) > position)
+                chunks = self.chunks[position:]
+                done = self.done
+            yield from chunks
+            position += len(chunks)
+            if done and position == len(self.chunks):
+                if self.error is not None:
+                    raise self.error
+                return
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one computation.
+
+    The first caller for a key becomes the leader and runs the work; callers
+    arriving while it is in flight share its result instead of repeating
+    it. ``saved`` counts the calls that were coalesced.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.saved = 0
+
+    def join(self, key):
+        """Return ``(is_leader, flight)``; a leader must call ``release`` when done."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.saved += 1
+                increment("getanime_coalesced_requests_total")
+                return False, flight
+            flight = self._flights[key] = Flight()
+            return True, flight
+
+    def release(self, key, flight, result=None, error=None):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.finish(result, error)
+
+    def do(self, key, fn):
+        """Run ``fn()`` once for all concurrent callers with ``key``.
+
+        Returns ``(result, shared)``; ``shared`` is True for callers that
+        joined another caller's computation.
+        """
+        leader, flight = self.join(key)
+        if not leader:
+            logger.info("Joined an identical in-flight request")
+            return flight.wait(), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self.release(key, flight, error=e)
+            raise
+        self.release(key, flight, result=result)
+        return result, False
+
+    async def ado(self, key, fn):
+        """``do`` for coroutines: the leader awaits ``fn()``, followers wait off the loop.
+
+        Shares flights with ``do`` and streaming leaders, so sync and async
+        callers of one key still make a single computation.
+        """
+        leader, flight = self.join(key)
+        if not leader:
+            logger.info("Joined an identical in-flight request")
+            return await asyncio.to_thread(flight.wait), True
+
+        try:
+            result = await fn()
+        except BaseException as e:
+            self.release(key, flight, error=e)
+            raise
+        self.release(key, flight, result=result)
+        return result, False
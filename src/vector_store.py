@@ -1,9 +1,19 @@
-from langchain.text_splitter import CharacterTextSplitter
-from langchain_community.vectorstores import FAISS
-from langchain_community.document_loaders.csv_loader import CSVLoader
-from langchain_community.embeddings import SentenceTransformerEmbeddings
+from src.ann_index import ADD_BLOCK_ROWS, create_index, default_index_config, empty_index, needs_training
+from src.doc_store import ColumnarDocStore, ColumnarDocStoreWriter, RowIdMapping
+from src.embedding_backends import check_embeddings, embedding_identity, manifest_identity
+from src.embedding_cache import CachedEmbeddings
+from configs.config import EMBEDDING_MODEL_NAME, INDEX_MMAP, STREAM_CHUNK_ROWS, STREAM_QUEUE_SIZE
 from utils.logger import get_logger
+from utils.atomic_io import atomic_path, save_array
+from utils.metrics import span
+from contextlib import nullcontext
+from datetime import datetime
+import hashlib
+import json
 import os
+import queue
+import threading
+import numpy as np
 
 from dotenv import load_dotenv
 
@@ -11,29 +21,240 @@ load_dotenv()
 
 logger = get_logger()
 
+# langchain modules are imported inside the methods that use them so that
+# importing this module (and the serving pipeline) stays cheap at cold start
+
+MANIFEST_FILE = "manifest.json"
+INDEX_FILE = "index.faiss"
+VECTORS_FILE = "vectors.npy"
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def read_index_version(persist_dir: str):
+    """Version of the index persisted in ``persist_dir``, or None before the first build."""
+    path = os.path.join(persist_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["version"]
+
+
+_END = object()
+
+
+class _StageFailed:
+    def __init__(self, error):
+        self.error = error
+
+
+def _run_stage(items, out_queue, stop):
+    """Thread target: feed ``items`` into the bounded ``out_queue``, then an end marker."""
+    def put(item):
+        while not stop.is_set():
+            try:
+                out_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        for item in items:
+            if not put(item):
+                return
+        put(_END)
+    except Exception as e:
+        put(_StageFailed(e))
+
+
+def _drain(in_queue, stop):
+    while not stop.is_set():
+        try:
+            item = in_queue.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        if item is _END:
+            return
+        if isinstance(item, _StageFailed):
+            raise item.error
+        yield item
+
 
 class VectorStoreBuilder:
-    def __init__(self, csv_path: str, persist_directory: str = "faiss_db"):
+    def __init__(
+        self,
+        csv_path: str,
+        persist_directory: str = "faiss_db",
+        batch_size: int = None,
+        num_workers: int = None,
+        index_config: dict = None,
+        embeddings=None,
+        embedding_backend: str = None,
+    ):
         self.csv_path = csv_path
         self.persist_dir = persist_directory
+        self.index_config = index_config or default_index_config()
         os.makedirs(persist_directory, exist_ok=True)
-        self.embeddings = SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2")
+
+        if embeddings is not None:
+            # Any langchain Embeddings, e.g. the deterministic stub used by benchmarks
+            self.embeddings = embeddings
+            return
+
+        embedding_kwargs = {}
+        if batch_size is not None:
+            embedding_kwargs["batch_size"] = batch_size
+        if num_workers is not None:
+            embedding_kwargs["num_workers"] = num_workers
+        if embedding_backend is not None:
+            embedding_kwargs["backend"] = embedding_backend
+        self.embeddings = CachedEmbeddings(
+            model_name=EMBEDDING_MODEL_NAME, **embedding_kwargs
+        )
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.persist_dir, MANIFEST_FILE)
+
+    @property
+    def vectors_path(self):
+        return os.path.join(self.persist_dir, VECTORS_FILE)
+
+    def load_vectors(self):
+        """Memory-map the raw embedding matrix (row ``i`` is docstore row ``i``)."""
+        return np.load(self.vectors_path, mmap_mode="r")
+
+    def _load_documents(self):
+        import pandas as pd
+
+        logger.info("Loading documents from CSV...")
+        return self._documents_from_frame(pd.read_csv(self.csv_path, encoding="utf-8"))
+
+    @staticmethod
+    def _documents_from_frame(df):
+        import pandas as pd
+        from langchain_core.documents import Document
+
+        documents = []
+        for row in df.itertuples(index=False):
+            documents.append(
+                Document(
+                    # Same page content CSVLoader used to produce, so embeddings
+                    # cached by earlier builds stay valid
+                    page_content=f"combined_info: {str(row.combined_info).strip()}",
+                    metadata={
+                        "MAL_ID": int(row.MAL_ID),
+                        "Name": row.Name,
+                        "Genres": row.Genres,
+                        "Score": None if pd.isna(row.Score) else float(row.Score),
+                    },
+                )
+            )
+        return documents
+
+    def _iter_document_batches(self, chunk_rows: int):
+        import pandas as pd
+
+        reader = pd.read_csv(self.csv_path, encoding="utf-8", chunksize=chunk_rows)
+        for df in reader:
+            yield self._documents_from_frame(df)
+
+    def _split_by_title(self, documents):
+        """Split documents into chunks and group them by MAL_ID.
+
+        Returns a mapping of MAL_ID -> (content hash, chunks, chunk ids).
+        """
+        from langchain.text_splitter import CharacterTextSplitter
+
+        logger.info("Splitting documents...")
+        text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=0)
+
+        rows = {}
+        for document in documents:
+            mal_id = str(document.metadata["MAL_ID"])
+            chunks = text_splitter.split_documents([document])
+            ids = [f"{mal_id}:{i}" for i in range(len(chunks))]
+            rows[mal_id] = (content_hash(document.page_content), chunks, ids)
+        return rows
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return None
+        with open(self.manifest_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_manifest(self, rows):
+        manifest = {
+            "version": datetime.now().strftime("%Y%m%d%H%M%S%f"),
+            **{f"embedding_{key}": value for key, value in embedding_identity(self.embeddings).items()},
+            "index": self.index_config,
+            "rows": {
+                mal_id: {"hash": row_hash, "ids": ids}
+                for mal_id, (row_hash, _, ids) in rows.items()
+            },
+        }
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+        return manifest
+
+    def _save(self, vectorstore):
+        """Write the vectors, the serving FAISS index and the columnar docstore.
+
+        ``vectorstore`` must hold a flat working index; the serving index of
+        type ``self.index_config`` is rebuilt from its vectors and swapped in.
+        """
+        import faiss
+
+        vectors = vectorstore.index.reconstruct_n(0, vectorstore.index.ntotal)
+        save_array(self.vectors_path, vectors)
+
+        logger.info(f"Building {self.index_config['type']} index over {len(vectors)} vectors...")
+        with span("build.index", index_type=self.index_config["type"], vectors=len(vectors)):
+            vectorstore.index = create_index(vectors, self.index_config)
+            with atomic_path(os.path.join(self.persist_dir, INDEX_FILE)) as index_path:
+                faiss.write_index(vectorstore.index, index_path)
+
+        with span("build.docstore"):
+            writer = ColumnarDocStoreWriter(self.persist_dir)
+            for position in range(vectorstore.index.ntotal):
+                doc_id = vectorstore.index_to_docstore_id[position]
+                mal_id, chunk = doc_id.split(":")
+                writer.append(vectorstore.docstore.search(doc_id), mal_id, chunk)
+            writer.close()
+
+        # Builds before the columnar docstore pickled it; never leave that around
+        legacy_pickle = os.path.join(self.persist_dir, "index.pkl")
+        if os.path.exists(legacy_pickle):
+            os.remove(legacy_pickle)
+
+    def index_version(self):
+        manifest = self._load_manifest()
+        return manifest["version"] if manifest else None
 
     def build_and_save_vectorstore(self):
+        from langchain_community.vectorstores import FAISS
+
         try:
-            logger.info("Loading documents from CSV...")
-            loader = CSVLoader(file_path=self.csv_path, encoding="utf-8")
-            documents = loader.load()
+            with span("build.load_documents"):
+                rows = self._split_by_title(self._load_documents())
 
-            logger.info("Splitting documents...")
-            text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=0)
-            texts = text_splitter.split_documents(documents)
+            texts, ids = [], []
+            for _, chunks, chunk_ids in rows.values():
+                texts.extend(chunks)
+                ids.extend(chunk_ids)
 
             logger.info("Creating FAISS vector store...")
-            vectorstore = FAISS.from_documents(texts, self.embeddings)
+            with span("build.embed", chunks=len(texts)):
+                vectorstore = FAISS.from_documents(texts, self.embeddings, ids=ids)
 
             logger.info(f"Saving vector store to {self.persist_dir}")
-            vectorstore.save_local(self.persist_dir)
+            self._save(vectorstore)
+            self._save_manifest(rows)
 
             logger.info("Vector store created and saved successfully!")
             return vectorstore
@@ -42,12 +263,251 @@ class VectorStoreBuilder:
             logger.error(f"Error building vector store: {e}")
             raise
 
-    def load_vector_store(self):
+    def _finalize_vectors(self, raw_path, rows, dim):
+        # The row count is only known at the end, so vectors are streamed to a
+        # raw file first and copied block by block under a .npy header
+        with atomic_path(self.vectors_path) as tmp_path:
+            vectors = np.lib.format.open_memmap(
+                tmp_path, mode="w+", dtype=np.float32, shape=(rows, dim)
+            )
+            raw = np.memmap(raw_path, dtype=np.float32, mode="r", shape=(rows, dim))
+            for start in range(0, rows, ADD_BLOCK_ROWS):
+                vectors[start:start + ADD_BLOCK_ROWS] = raw[start:start + ADD_BLOCK_ROWS]
+            vectors.flush()
+            del vectors, raw
+        os.remove(raw_path)
+        return self.load_vectors()
+
+    def build_streaming(self, chunk_rows: int = STREAM_CHUNK_ROWS, queue_size: int = STREAM_QUEUE_SIZE):
+        """Full build from the processed CSV in bounded embedding batches.
+
+        A reader thread parses and splits ``chunk_rows`` rows at a time, an
+        encoder thread embeds each batch and the calling thread writes the
+        vectors, docstore rows and (for index types that need no training)
+        index entries, so all three overlap. At most ``queue_size`` batches
+        wait between stages, so source rows, chunk texts and embeddings are
+        held for about ``2 * queue_size + 3`` batches whatever the catalog
+        size; vectors go straight to disk.
+
+        That bounds the embedding stage, not the build. Still linear in the
+        catalog: the FAISS index (``4 * dim`` bytes per chunk for flat and
+        HNSW, plus the HNSW graph; IVF-PQ trains on a mapped sample), the
+        seen-MAL_ID set and manifest (one hash and chunk-id list per title)
+        and the docstore writer's fixed-width columns and offsets (a few
+        Python ints per chunk). Peak memory is roughly the index plus that
+        bookkeeping plus the batches in flight, against the whole catalog's
+        texts and embeddings for ``build_and_save_vectorstore``.
+        """
+        import faiss
+
+        stop = threading.Event()
+        split_queue = queue.Queue(maxsize=queue_size)
+        encoded_queue = queue.Queue(maxsize=queue_size)
+
+        def read():
+            seen = set()
+            for documents in self._iter_document_batches(chunk_rows):
+                with span("build.load_documents", documents=len(documents)):
+                    # A MAL_ID repeated in a later batch keeps its first row
+                    documents = [
+                        document for document in documents
+                        if str(document.metadata["MAL_ID"]) not in seen
+                    ]
+                    seen.update(str(document.metadata["MAL_ID"]) for document in documents)
+                    rows = self._split_by_title(documents)
+                if rows:
+                    yield rows
+
+        def encode():
+            for rows in _drain(split_queue, stop):
+                texts = [chunk.page_content for _, chunks, _ in rows.values() for chunk in chunks]
+                with span("build.embed", chunks=len(texts)):
+                    vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+                yield rows, vectors
+
+        raw_path = self.vectors_path + ".part"
+        threads = [
+            threading.Thread(target=_run_stage, args=(read(), split_queue, stop), daemon=True),
+            threading.Thread(target=_run_stage, args=(encode(), encoded_queue, stop), daemon=True),
+        ]
         try:
-            logger.info(f"Loading vector store from {self.persist_dir}")
-            return FAISS.load_local(
-                self.persist_dir, self.embeddings, allow_dangerous_deserialization=True
+            with getattr(self.embeddings, "worker_pool", nullcontext)():
+                for thread in threads:
+                    thread.start()
+
+                writer = ColumnarDocStoreWriter(self.persist_dir)
+                manifest_rows = {}
+                index = None
+                total = dim = 0
+                with open(raw_path, "wb") as raw_file:
+                    for rows, vectors in _drain(encoded_queue, stop):
+                        raw_file.write(vectors.tobytes())
+                        total, dim = total + len(vectors), vectors.shape[1]
+                        if not needs_training(self.index_config):
+                            if index is None:
+                                index = empty_index(dim, self.index_config)
+                            index.add(vectors)
+
+                        for mal_id, (row_hash, chunks, ids) in rows.items():
+                            for position, chunk in enumerate(chunks):
+                                writer.append(chunk, mal_id, position)
+                            manifest_rows[mal_id] = (row_hash, None, ids)
+                        logger.info(f"Streaming build: {total} chunks indexed")
+                writer.close()
+
+            if not total:
+                raise ValueError(f"No documents found in {self.csv_path}")
+
+            vectors = self._finalize_vectors(raw_path, total, dim)
+            if index is None:
+                # IVF-PQ has to see (a sample of) every vector before adding any
+                logger.info(f"Building {self.index_config['type']} index over {total} vectors...")
+                with span("build.index", index_type=self.index_config["type"], vectors=total):
+                    index = create_index(vectors, self.index_config)
+            with atomic_path(os.path.join(self.persist_dir, INDEX_FILE)) as index_path:
+                faiss.write_index(index, index_path)
+
+            legacy_pickle = os.path.join(self.persist_dir, "index.pkl")
+            if os.path.exists(legacy_pickle):
+                os.remove(legacy_pickle)
+            self._save_manifest(manifest_rows)
+
+            logger.info("Vector store streamed and saved successfully!")
+            return self.load_vector_store()
+
+        except Exception as e:
+            logger.error(f"Error building vector store: {e}")
+            raise
+
+        finally:
+            stop.set()
+            for thread in threads:
+                if thread.is_alive():
+                    thread.join()
+            if os.path.exists(raw_path):
+                os.remove(raw_path)
+
+    def update_vectorstore(self):
+        """Incrementally sync the persisted index with the processed CSV.
+
+        Only titles whose content hash is new or changed are embedded; titles
+        missing from the CSV are deleted and everything else is left untouched.
+        Falls back to a full build when no compatible manifest exists.
+        """
+        try:
+            manifest = self._load_manifest()
+            if (
+                manifest is None
+                or manifest_identity(manifest) != embedding_identity(self.embeddings)
+                or not os.path.exists(os.path.join(self.persist_dir, INDEX_FILE))
+                or not ColumnarDocStore.exists(self.persist_dir)
+                or not os.path.exists(self.vectors_path)
+            ):
+                logger.info("No compatible manifest found, running a full build...")
+                return self.build_and_save_vectorstore()
+
+            with span("build.load_documents"):
+                rows = self._split_by_title(self._load_documents())
+            previous = manifest["rows"]
+
+            removed = [mal_id for mal_id in previous if mal_id not in rows]
+            changed = [
+                mal_id
+                for mal_id, (row_hash, _, _) in rows.items()
+                if mal_id in previous and previous[mal_id]["hash"] != row_hash
+            ]
+            added = [mal_id for mal_id in rows if mal_id not in previous]
+
+            logger.info(
+                f"Incremental build: {len(added)} added, {len(changed)} changed, "
+                f"{len(removed)} removed, {len(rows) - len(added) - len(changed)} unchanged"
             )
+
+            if not (added or changed or removed):
+                if manifest.get("index") == self.index_config:
+                    logger.info("Vector store is up to date, nothing to rebuild")
+                    return self.load_vector_store()
+
+                # Same rows, different index type: re-index stored vectors, no re-embedding
+                logger.info("Index configuration changed, rebuilding the index from stored vectors")
+                vectorstore = self._load_mutable_vector_store()
+                self._save(vectorstore)
+                self._save_manifest(rows)
+                return vectorstore
+
+            vectorstore = self._load_mutable_vector_store()
+
+            stale_ids = [
+                chunk_id
+                for mal_id in removed + changed
+                for chunk_id in previous[mal_id]["ids"]
+            ]
+            if stale_ids:
+                vectorstore.delete(stale_ids)
+
+            texts, ids = [], []
+            for mal_id in changed + added:
+                _, chunks, chunk_ids = rows[mal_id]
+                texts.extend(chunks)
+                ids.extend(chunk_ids)
+            if texts:
+                with span("build.embed", chunks=len(texts)):
+                    vectorstore.add_documents(texts, ids=ids)
+
+            logger.info(f"Saving vector store to {self.persist_dir}")
+            self._save(vectorstore)
+            self._save_manifest(rows)
+
+            logger.info("Vector store updated and saved successfully!")
+            return vectorstore
+
+        except Exception as e:
+            logger.error(f"Error updating vector store: {e}")
+            raise
+
+    def _load_mutable_vector_store(self):
+        """Load the persisted store with an in-memory docstore that supports add/delete.
+
+        Mutations always happen on an exact flat index rebuilt from the stored
+        vectors, since HNSW cannot delete and PQ codes are lossy.
+        """
+        from langchain_community.docstore.in_memory import InMemoryDocstore
+        from langchain_community.vectorstores import FAISS
+
+        store = ColumnarDocStore(self.persist_dir)
+        return FAISS(
+            self.embeddings,
+            create_index(self.load_vectors(), {"type": "flat"}),
+            InMemoryDocstore(dict(store.iter_documents())),
+            {position: store.chunk_id(position) for position in range(len(store))},
+        )
+
+    def load_vector_store(self, mmap: bool = INDEX_MMAP):
+        """Load the persisted store for serving.
+
+        With ``mmap`` the index data is mapped read-only from ``index.faiss``
+        instead of copied to the heap, so every worker process on a host
+        shares one copy through the page cache (as the docstore and vectors
+        already are).
+        """
+        import faiss
+        from langchain_community.vectorstores import FAISS
+
+        try:
+            logger.info(f"Loading vector store from {self.persist_dir}")
+            if not ColumnarDocStore.exists(self.persist_dir):
+                raise FileNotFoundError(
+                    f"No columnar docstore in {self.persist_dir}; rebuild it with build_pipeline.py"
+                )
+
+            # IO_FLAG_MMAP_IFC maps flat, HNSW and IVF-PQ storage alike;
+            # plain IO_FLAG_MMAP only covers inverted lists
+            io_flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) if mmap else 0
+            # Query vectors from another model or backend would search garbage
+            check_embeddings(self._load_manifest(), self.embeddings)
+            index = faiss.read_index(os.path.join(self.persist_dir, INDEX_FILE), io_flags)
+            store = ColumnarDocStore(self.persist_dir)
+            return FAISS(self.embeddings, index, store, RowIdMapping(store))
         except Exception as e:
             logger.error(f"Error loading vector store: {e}")
             raise
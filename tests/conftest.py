@@ -0,0 +1,30 @@
+import os
+
+import pandas as pd
+import pytest
+
+SOURCE_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "anime_with_synopsis.csv")
+
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch):
+    """A small copy of the catalog in a scratch working directory, as build_pipeline expects."""
+    os.makedirs(tmp_path / "data")
+    pd.read_csv(SOURCE_CSV).head(40).to_csv(tmp_path / "data" / "anime_with_synopsis.csv", index=False)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path / "data" / "anime_with_synopsis.csv"
+
+
+@pytest.fixture
+def index_dir(catalog):
+    from benchmarks.stubs import HashingEmbeddings
+    from src.data_loader import AnimeDataLoader
+    from src.vector_store import VectorStoreBuilder
+
+    AnimeDataLoader(str(catalog), "data/processed_anime_data.csv").load_and_process()
+    VectorStoreBuilder(
+        csv_path="data/processed_anime_data.csv",
+        persist_directory="faiss_db",
+        embeddings=HashingEmbeddings(),
+    ).build_and_save_vectorstore()
+    return "faiss_db"
@@ -0,0 +1,68 @@
+import faiss
+import numpy as np
+import pytest
+
+from benchmarks.stubs import HashingEmbeddings
+from src.ann_index import create_index, index_config
+from src.vector_store import VectorStoreBuilder
+
+
+def _vectors(n=400, dim=16):
+    return np.random.default_rng(0).normal(size=(n, dim)).astype(np.float32)
+
+
+def test_config_fills_defaults_and_rejects_unknown_settings():
+    assert index_config("flat") == {"type": "flat"}
+    assert index_config("hnsw", M=8)["M"] == 8
+    assert set(index_config("ivfpq")) == {"type", "nlist", "m", "nbits", "nprobe"}
+    with pytest.raises(ValueError, match="Unknown index type"):
+        index_config("lsh")
+    with pytest.raises(ValueError, match="Unknown parameters"):
+        index_config("flat", M=8)
+
+
+@pytest.mark.parametrize(
+    "config, index_class",
+    [
+        (index_config("flat"), faiss.IndexFlatL2),
+        (index_config("hnsw", M=8, ef_construction=20, ef_search=16), faiss.IndexHNSWFlat),
+        (index_config("ivfpq", nlist=4, m=4, nbits=4, nprobe=2), faiss.IndexIVFPQ),
+    ],
+)
+def test_create_index_builds_the_configured_type(config, index_class):
+    vectors = _vectors()
+    index = create_index(vectors, config, block_rows=64)
+
+    assert isinstance(index, index_class)
+    assert index.ntotal == len(vectors)
+    if config["type"] == "hnsw":
+        assert index.hnsw.efSearch == 16
+    if config["type"] == "ivfpq":
+        assert (index.nlist, index.nprobe) == (4, 2)
+    # Every type finds a catalog vector as its own nearest neighbour
+    _, found = index.search(vectors[:5], 1)
+    assert found[:, 0].tolist() == [0, 1, 2, 3, 4]
+
+
+def test_ivfpq_settings_shrink_to_small_catalogs():
+    index = create_index(_vectors(n=100), index_config("ivfpq", nlist=64, m=4, nbits=8, nprobe=16))
+    # 100 vectors give two coarse centroids and 1-bit PQ codes
+    assert (index.nlist, index.pq.nbits, index.nprobe) == (2, 1, 2)
+
+    with pytest.raises(ValueError, match="must divide"):
+        create_index(_vectors(dim=15), index_config("ivfpq", m=4))
+
+
+def test_changing_the_index_type_reindexes_stored_vectors(index_dir):
+    embeddings = HashingEmbeddings()
+    builder = VectorStoreBuilder(
+        csv_path="data/processed_anime_data.csv",
+        persist_directory=index_dir,
+        embeddings=embeddings,
+        index_config=index_config("hnsw", M=8),
+    )
+    builder.update_vectorstore()
+
+    index = builder.load_vector_store().index
+    assert isinstance(index, faiss.IndexHNSWFlat)
+    assert index.ntotal == len(builder.load_vectors())
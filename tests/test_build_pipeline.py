@@ -0,0 +1,60 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from benchmarks.stubs import HashingEmbeddings, StubChatModel
+from configs.config import CURATED_QUERIES
+from pipeline.build_pipeline import main
+from pipeline.pipeline import AnimeRecommendationPipeline
+from src.curated_answers import CURATED_ANSWERS_FILE
+from src.index_versions import resolve_index_dir
+from src.response_cache import ResponseCache
+from src.vector_store import read_index_version
+
+
+class FailingChatModel(StubChatModel):
+    def _call(self, messages, stop=None, run_manager=None, **kwargs) -> str:
+        raise RuntimeError("LLM called")
+
+
+def _stored_answers():
+    index_dir = resolve_index_dir("faiss_db")
+    with open(os.path.join(index_dir, CURATED_ANSWERS_FILE), encoding="utf-8") as f:
+        return read_index_version(index_dir), json.load(f)
+
+
+def _serving_pipeline(embeddings):
+    return AnimeRecommendationPipeline(
+        persist_dir="faiss_db",
+        response_cache=ResponseCache(max_entries=0),
+        embeddings=embeddings,
+        llm=FailingChatModel(),
+    )
+
+
+def test_curated_answers_follow_the_index_version(catalog):
+    embeddings = HashingEmbeddings()
+    main(llm=StubChatModel(), embeddings=embeddings)
+
+    version, stored = _stored_answers()
+    assert stored["index_version"] == version
+    assert set(stored["answers"]) == set(CURATED_QUERIES)
+
+    # Served from the store: the failing LLM is never reached
+    query = CURATED_QUERIES[0]
+    assert _serving_pipeline(embeddings).recommend(f"  {query.upper()} ") == stored["answers"][query]
+
+    # A catalog change makes the stored answers stale; they must not be served
+    pd.read_csv(catalog).iloc[1:].to_csv(catalog, index=False)
+    main(incremental=True, curated=False, embeddings=embeddings)
+    assert read_index_version(resolve_index_dir("faiss_db")) != version
+    with pytest.raises(Exception):
+        _serving_pipeline(embeddings).recommend(query)
+
+    # The next build with curated answers regenerates them for the new version
+    main(incremental=True, llm=StubChatModel(), embeddings=embeddings)
+    new_version, regenerated = _stored_answers()
+    assert regenerated["index_version"] == new_version != version
+    assert _serving_pipeline(embeddings).recommend(query) == regenerated["answers"][query]
@@ -0,0 +1,61 @@
+from langchain_core.documents import Document
+
+from src.context_builder import ContextBuilder, count_tokens
+
+
+def _document(mal_id, name, overview, genres="Action"):
+    return Document(
+        page_content=f"Title: {name} Overview: {overview} Genres: {genres}",
+        metadata={"MAL_ID": mal_id, "Name": name, "Genres": genres},
+    )
+
+
+BEBOP = _document(
+    1,
+    "Cowboy Bebop",
+    "A crew travels the solar system. They cook noodles. Bounty hunters chase criminals in space. "
+    "The ship is old. (Source: ANN)",
+    "Action, Space",
+)
+BEBOP_PART_TWO = _document(1, "Cowboy Bebop", "Spike hunts a bounty on Mars.", "Action, Space")
+KIKI = _document(3, "Kiki's Delivery Service", "A young witch moves to a seaside town. She delivers bread.", "Fantasy")
+
+
+def test_chunks_of_a_title_are_merged_and_sentences_picked_by_query():
+    context, stats = ContextBuilder(token_budget=500, max_sentences=2).build(
+        "bounty hunters in space", [BEBOP, BEBOP_PART_TWO, KIKI]
+    )
+
+    blocks = context.split("\n\n")
+    assert len(blocks) == stats["titles_used"] == 2
+    # The best-matching sentences, in their original order, without the source note
+    assert blocks[0] == (
+        "Title: Cowboy Bebop Overview: Bounty hunters chase criminals in space. "
+        "Spike hunts a bounty on Mars. Genres: Action, Space"
+    )
+    assert stats["tokens_saved"] == stats["original_tokens"] - count_tokens(context) > 0
+
+
+def test_budget_shortens_then_drops_lower_ranked_titles():
+    first = ContextBuilder(token_budget=500, max_sentences=3).build("bounty", [BEBOP])[1]["context_tokens"]
+
+    short_kiki = "Title: Kiki's Delivery Service Overview: A young witch moves to a seaside town. Genres: Fantasy"
+    budget = first + count_tokens(short_kiki)
+    context, stats = ContextBuilder(token_budget=budget, max_sentences=3).build("bounty", [BEBOP, KIKI])
+    # Kiki is cut to one sentence to fit
+    assert context.endswith("\n\n" + short_kiki)
+    assert stats["context_tokens"] <= budget
+
+    context, stats = ContextBuilder(token_budget=first + 5, max_sentences=3).build("bounty", [BEBOP, KIKI])
+    assert "Kiki" not in context
+    assert stats["titles_used"] == 1
+
+
+def test_best_title_is_kept_over_budget_and_zero_budget_stuffs():
+    context, stats = ContextBuilder(token_budget=5, max_sentences=3).build("bounty", [BEBOP, KIKI])
+    assert context.startswith("Title: Cowboy Bebop Overview: Bounty hunters chase criminals in space.")
+    assert stats["titles_used"] == 1
+
+    context, stats = ContextBuilder(token_budget=0).build("bounty", [BEBOP, KIKI])
+    assert context == BEBOP.page_content + "\n\n" + KIKI.page_content
+    assert stats["tokens_saved"] == 0
@@ -0,0 +1,40 @@
+import math
+
+import pandas as pd
+import pytest
+
+from src.data_loader import AnimeDataLoader
+from src.vector_store import VectorStoreBuilder
+
+ROWS = [
+    {"MAL_ID": 1, "Name": "Cowboy Bebop", "Score": "8.78", "Genres": "Action, Space", "Synopsis": "Bounty hunters."},
+    {"MAL_ID": 2, "Name": "Unscored", "Score": "Unknown", "Genres": "Drama", "Synopsis": "Not rated yet."},
+    {"MAL_ID": 3, "Name": "Blank score", "Score": None, "Genres": "Comedy", "Synopsis": "Also not rated."},
+    {"MAL_ID": 4, "Name": "No synopsis", "Score": "7.1", "Genres": "Comedy", "Synopsis": None},
+]
+
+
+def _load(tmp_path, rows):
+    pd.DataFrame(rows).to_csv(tmp_path / "source.csv", index=False)
+    loader = AnimeDataLoader(str(tmp_path / "source.csv"), str(tmp_path / "processed.csv"))
+    loader.load_and_process()
+    return pd.read_csv(tmp_path / "processed.csv")
+
+
+def test_unscored_titles_are_kept_without_a_score(tmp_path):
+    processed = _load(tmp_path, ROWS)
+
+    # Only the title missing a required field is dropped
+    assert processed["MAL_ID"].tolist() == [1, 2, 3]
+    documents = VectorStoreBuilder._documents_from_frame(processed)
+    assert [document.metadata["Score"] for document in documents] == [8.78, None, None]
+
+
+def test_score_column_is_optional(tmp_path):
+    processed = _load(tmp_path, [{k: v for k, v in row.items() if k != "Score"} for row in ROWS[:1]])
+    assert math.isnan(processed["Score"][0])
+
+
+def test_missing_required_column_is_reported(tmp_path):
+    with pytest.raises(ValueError, match="Synopsis"):
+        _load(tmp_path, [{k: v for k, v in row.items() if k != "Synopsis"} for row in ROWS])
@@ -0,0 +1,50 @@
+import math
+
+from langchain_core.documents import Document
+
+from src.doc_store import ColumnarDocStore, ColumnarDocStoreWriter, RowIdMapping
+
+DOCUMENTS = [
+    (Document(page_content="Space bounty hunters.", metadata={"Name": "Cowboy Bebop", "Genres": "Action, Space", "Score": 8.78}), 1, 0),
+    (Document(page_content="More bounty hunting — ☆ unicode ☆", metadata={"Name": "Cowboy Bebop", "Genres": "Action, Space", "Score": 8.78}), 1, 1),
+    (Document(page_content="", metadata={"Name": "Trigun", "Genres": "", "Score": None}), 6, 0),
+    (Document(page_content="A witch delivers bread.", metadata={"Name": "Kiki", "Genres": "Fantasy", "Score": 8.2}), 3, 0),
+]
+
+
+def _store(tmp_path):
+    writer = ColumnarDocStoreWriter(str(tmp_path))
+    for document, mal_id, chunk in DOCUMENTS:
+        writer.append(document, mal_id, chunk)
+    writer.close()
+    return ColumnarDocStore(str(tmp_path))
+
+
+def test_round_trip(tmp_path):
+    store = _store(tmp_path)
+    assert ColumnarDocStore.exists(str(tmp_path))
+    assert len(store) == len(DOCUMENTS)
+
+    for row, (document, mal_id, chunk) in enumerate(DOCUMENTS):
+        restored = store.document(row)
+        assert restored.page_content == document.page_content
+        assert restored.metadata["MAL_ID"] == mal_id
+        assert restored.metadata["Name"] == document.metadata["Name"]
+        assert restored.metadata["Genres"] == document.metadata["Genres"]
+        assert restored.metadata["Score"] == document.metadata["Score"]
+        assert store.chunk_id(row) == f"{mal_id}:{chunk}"
+        assert store.search(f"{mal_id}:{chunk}").page_content == document.page_content
+
+    assert math.isnan(store.scores[2])
+    assert dict(RowIdMapping(store)) == {0: "1:0", 1: "1:1", 2: "6:0", 3: "3:0"}
+
+
+def test_lookups_by_id(tmp_path):
+    store = _store(tmp_path)
+    assert store.row_of("1:1") == 1
+    assert store.row_of("3:0") == 3
+    assert store.row_of("3:1") is None
+    assert store.row_of("not-an-id") is None
+    assert store.search("42:0") == "ID 42:0 not found."
+    assert store.title_rows([3, 1, 42, 6]).tolist() == [3, 0, -1, 2]
+    assert store.name(3) == "Kiki"
@@ -0,0 +1,61 @@
+import os
+import stat
+import threading
+import time
+
+import pytest
+
+from app.embedding_server import serve
+from benchmarks.stubs import HashingEmbeddings
+from src.embedding_client import RemoteEmbeddings
+
+AUTHKEY = "test-key"
+
+
+@pytest.fixture
+def address(tmp_path):
+    address = str(tmp_path / "sockets" / "embed.sock")
+    threading.Thread(
+        target=serve, args=(address, AUTHKEY, HashingEmbeddings()), daemon=True, name="test-embedding-server"
+    ).start()
+    deadline = time.monotonic() + 5
+    while not os.path.exists(address):
+        assert time.monotonic() < deadline, "embedding server did not start"
+        time.sleep(0.01)
+    return address
+
+
+def test_remote_embeddings_match_the_served_model(address):
+    remote = RemoteEmbeddings(address, authkey=AUTHKEY, connect_timeout=1)
+    local = HashingEmbeddings()
+
+    assert remote.embed_query("space bounty hunters") == local.embed_query("space bounty hunters")
+    assert remote.embed_documents(["a", "b"]) == local.embed_documents(["a", "b"])
+    assert remote.identity() == {"model": "HashingEmbeddings", "backend": "custom"}
+
+    # Only the owner can enter the directory or open the socket
+    assert stat.S_IMODE(os.stat(os.path.dirname(address)).st_mode) == 0o700
+    assert stat.S_IMODE(os.stat(address).st_mode) == 0o600
+
+
+def test_clients_without_the_key_are_rejected(address):
+    from multiprocessing import AuthenticationError
+
+    with pytest.raises(AuthenticationError):
+        RemoteEmbeddings(address, authkey="wrong-key", connect_timeout=1).embed_query("x")
+    # The server keeps serving after a failed handshake
+    assert RemoteEmbeddings(address, authkey=AUTHKEY, connect_timeout=1).embed_query("x")
+
+
+def test_a_key_and_a_private_directory_are_required(tmp_path, monkeypatch):
+    monkeypatch.delenv("EMBEDDING_SERVER_AUTHKEY", raising=False)
+    with pytest.raises(ValueError, match="EMBEDDING_SERVER_AUTHKEY"):
+        RemoteEmbeddings(str(tmp_path / "embed.sock"))
+    with pytest.raises(ValueError, match="EMBEDDING_SERVER_AUTHKEY"):
+        serve(str(tmp_path / "embed.sock"), embeddings=HashingEmbeddings())
+
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    shared.chmod(0o777)
+    with pytest.raises(PermissionError, match="private"):
+        serve(str(shared / "embed.sock"), AUTHKEY, embeddings=HashingEmbeddings())
@@ -0,0 +1,100 @@
+import pandas as pd
+import pytest
+
+from benchmarks.stubs import HashingEmbeddings
+from src.hybrid_retriever import HybridRetriever
+from src.lexical_index import BM25Index
+from src.vector_store import VectorStoreBuilder
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    queries = 0
+
+    def embed_query(self, text):
+        self.queries += 1
+        return super().embed_query(text)
+
+    def identity(self):
+        # Same vectors as the HashingEmbeddings the index was built with
+        return {"model": "HashingEmbeddings", "backend": "custom"}
+
+
+class FakeLexicalIndex:
+    def __init__(self, hits, title_id=None):
+        self.hits = hits
+        self.title_id = title_id
+
+    def search(self, query, k=10):
+        return self.hits[:k]
+
+    def match_title(self, query, min_tokens=2):
+        return self.title_id
+
+
+@pytest.fixture
+def store(index_dir):
+    embeddings = CountingEmbeddings()
+    builder = VectorStoreBuilder(
+        csv_path="data/processed_anime_data.csv", persist_directory=index_dir, embeddings=embeddings
+    )
+    return builder.load_vector_store(), builder.load_vectors(), embeddings
+
+
+def _ids(documents):
+    return [str(document.metadata["MAL_ID"]) for document in documents]
+
+
+def test_reciprocal_rank_fusion_order(store):
+    vector_store, vectors, embeddings = store
+    query = "space bounty hunters"
+    probe = HybridRetriever(vector_store=vector_store, vectors=vectors, fetch_k=10)
+    dense = [mal_id for mal_id, _ in probe._dense_search(embeddings.embed_query(query), 10)]
+
+    # Lexical ranking in reverse dense order, plus a title only BM25 found
+    all_ids = [str(mal_id) for mal_id in vector_store.docstore.mal_ids]
+    lexical_only = next(mal_id for mal_id in all_ids if mal_id not in dense)
+    lexical = [(lexical_only, 9.0)] + [(mal_id, 1.0) for mal_id in reversed(dense[5:])]
+    retriever = HybridRetriever(
+        vector_store=vector_store, lexical_index=FakeLexicalIndex(lexical), vectors=vectors, fetch_k=10, rrf_k=60
+    )
+
+    expected = {}
+    for rank, mal_id in enumerate(dense):
+        expected[mal_id] = 1.0 / (60 + rank + 1)
+    for rank, (mal_id, _) in enumerate(lexical):
+        expected[mal_id] = expected.get(mal_id, 0.0) + 1.0 / (60 + rank + 1)
+    ranked = sorted(expected, key=expected.get, reverse=True)
+
+    assert _ids(retriever.retrieve(query, k=10)) == ranked[:10]
+    # Found by both rankers, so it beats titles ranked higher by dense alone
+    assert ranked.index(dense[-1]) < ranked.index(dense[1])
+    # A lexical-only title is fetched from the docstore by MAL_ID
+    assert lexical_only in ranked[:10]
+
+
+def test_verbatim_title_skips_dense_search(store):
+    vector_store, vectors, embeddings = store
+    lexical = [("1", 12.0), ("5", 8.0), ("6", 1.0)]
+    retriever = HybridRetriever(
+        vector_store=vector_store, lexical_index=FakeLexicalIndex(lexical, title_id="1"), vectors=vectors
+    )
+
+    before = embeddings.queries
+    assert _ids(retriever.retrieve("Cowboy Bebop", k=2)) == ["1", "5"]
+    assert embeddings.queries == before
+
+    retriever.skip_dense_on_title_match = False
+    retriever.retrieve("Cowboy Bebop", k=2)
+    assert embeddings.queries == before + 1
+
+
+def test_bm25_title_match_on_the_catalog(store, catalog):
+    vector_store, vectors, embeddings = store
+    lexical_index = BM25Index.build(pd.read_csv(catalog))
+    retriever = HybridRetriever(vector_store=vector_store, lexical_index=lexical_index, vectors=vectors)
+
+    assert lexical_index.match_title("something like cowboy bebop please", min_tokens=2) == "1"
+    before = embeddings.queries
+    documents = retriever.retrieve("cowboy bebop", k=3)
+    assert documents[0].metadata["Name"] == "Cowboy Bebop"
+    assert embeddings.queries == before
@@ -0,0 +1,60 @@
+import os
+
+import pandas as pd
+
+from benchmarks.stubs import HashingEmbeddings, StubChatModel
+from pipeline.build_pipeline import main
+from pipeline.pipeline import AnimeRecommendationPipeline
+from src.index_versions import VERSIONS_DIR, current_version, resolve_index_dir
+from src.response_cache import ResponseCache
+
+ROOT = "index_root"
+
+
+def _build(embeddings, **kwargs):
+    main(curated=False, embeddings=embeddings, persist_dir=ROOT, **kwargs)
+    return current_version(ROOT)
+
+
+def _versions():
+    return sorted(os.listdir(os.path.join(ROOT, VERSIONS_DIR)))
+
+
+def test_no_op_build_publishes_nothing(catalog):
+    embeddings = HashingEmbeddings()
+    version = _build(embeddings)
+    assert _versions() == [version]
+
+    assert _build(embeddings, incremental=True) == version
+    assert _versions() == [version]
+
+    pd.read_csv(catalog).iloc[1:].to_csv(catalog, index=False)
+    changed = _build(embeddings, incremental=True)
+    assert changed != version
+    assert _versions() == [version, changed]
+
+
+def test_published_version_is_swapped_in_live(catalog):
+    embeddings = HashingEmbeddings()
+    first = _build(embeddings)
+    pipeline = AnimeRecommendationPipeline(
+        persist_dir=ROOT,
+        response_cache=ResponseCache(max_entries=8),
+        embeddings=embeddings,
+        llm=StubChatModel(),
+        curated_answers=False,
+    )
+    assert pipeline.retrieve("cowboy bebop", k=1)[0].metadata["Name"] == "Cowboy Bebop"
+    pipeline.recommend("cowboy bebop")
+    assert len(pipeline.response_cache) == 1
+
+    # Drop Cowboy Bebop from the catalog and publish a new version
+    pd.read_csv(catalog).iloc[1:].to_csv(catalog, index=False)
+    second = _build(embeddings, incremental=True)
+    assert pipeline.reload_index(timeout=30) == second != first
+
+    assert pipeline.vector_store.index.ntotal == len(pipeline.vector_build.load_vectors())
+    assert all(doc.metadata["Name"] != "Cowboy Bebop" for doc in pipeline.retrieve("cowboy bebop", k=5))
+    # Answers from the old index are not served from the new one
+    assert len(pipeline.response_cache) == 0
+    assert resolve_index_dir(ROOT).endswith(second)
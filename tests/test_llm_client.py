@@ -0,0 +1,92 @@
+import time
+
+import pytest
+
+from benchmarks.stub_llm_server import StubLLMServer
+from src.llm_client import CircuitBreaker, CircuitOpenError, LLMError, ResilientLLMClient
+
+MESSAGES = [{"role": "user", "content": "Title: Cowboy Bebop Overview: space bounty hunters"}]
+RESET_SECONDS = 0.05
+
+
+@pytest.fixture
+def make_client():
+    servers = []
+
+    def make(script):
+        server = StubLLMServer(script=script).start()
+        servers.append(server)
+        client = ResilientLLMClient(
+            api_key="stub",
+            model="stub",
+            base_url=server.base_url,
+            max_retries=0,
+            hedge=False,
+            breaker=CircuitBreaker(failure_threshold=2, reset_seconds=RESET_SECONDS),
+        )
+        return server, client
+
+    yield make
+    for server in servers:
+        server.stop()
+
+
+def _open_breaker(client):
+    for _ in range(2):
+        with pytest.raises(LLMError):
+            client.complete(MESSAGES)
+    with pytest.raises(CircuitOpenError):
+        client.complete(MESSAGES)
+    time.sleep(RESET_SECONDS * 2)
+    assert client.breaker.state == "half_open"
+
+
+def test_non_retryable_error_on_probe_closes_breaker(make_client):
+    server, client = make_client([503, 503, 400, 200])
+    _open_breaker(client)
+
+    with pytest.raises(LLMError) as error:
+        client.complete(MESSAGES)
+    assert error.value.status == 400
+    assert client.breaker.state == "closed"
+
+    assert client.complete(MESSAGES)["choices"]
+    assert server.requests == 4
+
+
+def test_non_retryable_error_on_streamed_probe_closes_breaker(make_client):
+    server, client = make_client([503, 503, 422, 200])
+    _open_breaker(client)
+
+    with pytest.raises(LLMError):
+        list(client.stream(MESSAGES))
+    assert client.breaker.state == "closed"
+
+    assert list(client.stream(MESSAGES))
+    assert server.requests == 4
+
+
+def test_probe_without_a_response_is_released(make_client):
+    server, client = make_client([503, 503, 200])
+    _open_breaker(client)
+
+    # The deadline runs out before the probe is sent: no verdict either way
+    with pytest.raises(LLMError):
+        client.complete(MESSAGES, timeout=1e-9)
+
+    def broken(deadline):
+        raise RuntimeError("unexpected")
+
+    with pytest.raises(RuntimeError):
+        client._call(broken)
+
+    assert client.breaker.state == "half_open"
+    assert client.complete(MESSAGES)["choices"]
+    assert client.breaker.state == "closed"
+    assert server.requests == 3
+
+
+@pytest.mark.parametrize("api_key", [None, ""])
+def test_missing_api_key_fails_at_construction(api_key):
+    with pytest.raises(ValueError, match="GROQ_API_KEY"):
+        ResilientLLMClient(api_key=api_key, model="stub")
@@ -0,0 +1,41 @@
+import os
+
+import app.server as server
+from utils.metrics import increment, render_prometheus
+
+
+def test_label_values_are_escaped():
+    increment("getanime_test_escaped_total", query='say "hi"\\bye\nnow')
+    line = next(line for line in render_prometheus().splitlines() if line.startswith("getanime_test_escaped_total"))
+    assert line == 'getanime_test_escaped_total{query="say \\"hi\\"\\\\bye\\nnow"} 1'
+
+
+def test_server_start_clears_a_configured_metrics_dir(tmp_path, monkeypatch):
+    stale = tmp_path / "metrics-123-1.json"
+    stale.write_text("{}")
+    other = tmp_path / "notes.txt"
+    other.write_text("kept")
+    monkeypatch.setattr(server, "METRICS_ENABLED", True)
+    monkeypatch.setattr(server, "METRICS_DIR", str(tmp_path))
+    monkeypatch.setattr(server, "API_WORKERS", 1)
+    monkeypatch.delenv("METRICS_DIR", raising=False)
+
+    # Cleared even for a single worker: it would otherwise merge the last run's totals
+    assert server._prepare_metrics_dir() == str(tmp_path)
+    assert not stale.exists()
+    assert other.exists()
+    assert os.environ["METRICS_DIR"] == str(tmp_path)
+
+
+def test_single_worker_without_metrics_dir_shares_nothing(monkeypatch):
+    monkeypatch.setattr(server, "METRICS_ENABLED", True)
+    monkeypatch.setattr(server, "METRICS_DIR", "")
+    monkeypatch.setattr(server, "API_WORKERS", 1)
+    assert server._prepare_metrics_dir() is None
+
+    monkeypatch.setattr(server, "API_WORKERS", 2)
+    monkeypatch.delenv("METRICS_DIR", raising=False)
+    directory = server._prepare_metrics_dir()
+    assert os.path.isdir(directory)
+    assert os.environ["METRICS_DIR"] == directory
+    os.rmdir(directory)
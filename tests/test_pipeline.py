@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+
+from benchmarks.stubs import HashingEmbeddings, StubChatModel
+from pipeline.pipeline import AnimeRecommendationPipeline
+from src.response_cache import ResponseCache, normalize_query
+
+QUERY = "Space bounty hunters"
+
+
+class SlowChatModel(StubChatModel):
+    """Stays in flight long enough for a second caller to join."""
+
+    calls: int = 0
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs) -> str:
+        self.calls += 1
+        time.sleep(0.3)
+        return super()._call(messages, stop, run_manager, **kwargs)
+
+
+def _pipeline(index_dir):
+    return AnimeRecommendationPipeline(
+        persist_dir=index_dir,
+        response_cache=ResponseCache(max_entries=0),
+        embeddings=HashingEmbeddings(),
+        llm=SlowChatModel(),
+        curated_answers=False,
+    )
+
+
+def _lead(pipeline, fn):
+    results = []
+    thread = threading.Thread(target=lambda: results.append(fn()))
+    thread.start()
+    key = normalize_query(QUERY)
+    while key not in pipeline.single_flight._flights:
+        time.sleep(0.001)
+    return thread, results
+
+
+def test_recommend_joins_streaming_flight(index_dir):
+    pipeline = _pipeline(index_dir)
+    thread, streamed = _lead(pipeline, lambda: "".join(pipeline.stream_recommend(QUERY)))
+
+    recommendation = pipeline.recommend(QUERY)
+    thread.join()
+
+    assert recommendation and recommendation == streamed[0]
+    assert pipeline.single_flight.saved == 1
+    assert pipeline.recommender.llm.calls == 1
+
+
+def test_stream_joins_recommend_flight(index_dir):
+    pipeline = _pipeline(index_dir)
+    thread, recommended = _lead(pipeline, lambda: pipeline.recommend(QUERY))
+
+    streamed = "".join(pipeline.stream_recommend(QUERY))
+    thread.join()
+
+    assert streamed and streamed == recommended[0]
+    assert pipeline.single_flight.saved == 1
+    assert pipeline.recommender.llm.calls == 1
+
+
+def test_concurrent_arecommend_calls_share_one_llm_call(index_dir):
+    pipeline = _pipeline(index_dir)
+
+    async def both():
+        return await asyncio.gather(pipeline.arecommend(QUERY), pipeline.arecommend(f"  {QUERY.upper()}?"))
+
+    first, second = asyncio.run(both())
+
+    assert first and first == second
+    assert pipeline.single_flight.saved == 1
+    assert pipeline.recommender.llm.calls == 1
+
+
+def test_arecommend_many_joins_a_live_recommend(index_dir):
+    pipeline = _pipeline(index_dir)
+    thread, recommended = _lead(pipeline, lambda: pipeline.recommend(QUERY))
+
+    results = pipeline.recommend_many([QUERY, QUERY.lower()])
+    thread.join()
+
+    assert [result.recommendation for result in results] == [recommended[0]] * 2
+    assert pipeline.recommender.llm.calls == 1
@@ -0,0 +1,49 @@
+import threading
+
+import pytest
+
+from benchmarks.stubs import HashingEmbeddings
+from src.query_encoder import BatchingQueryEncoder
+
+
+class FlakyEmbeddings(HashingEmbeddings):
+    """Fails (or returns a short result for) batches containing a trigger text."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self.release.set()
+
+    def embed_queries(self, texts):
+        self.release.wait()
+        if "boom" in texts:
+            raise RuntimeError("encoder failed")
+        vectors = self.embed_documents(texts)
+        return vectors[:-1] if "short" in texts else vectors
+
+
+def test_failed_batches_fail_their_callers_and_the_thread_survives():
+    encoder = BatchingQueryEncoder(FlakyEmbeddings(), window_ms=0)
+
+    with pytest.raises(RuntimeError, match="encoder failed"):
+        encoder.embed_query("boom")
+    # A malformed result from the model must not kill the thread either
+    with pytest.raises(KeyError):
+        encoder.embed_queries(["short", "other"])
+
+    assert encoder.embed_query("mecha") == HashingEmbeddings().embed_query("mecha")
+    assert encoder._thread.is_alive()
+
+
+def test_callers_time_out_on_a_stuck_encoder():
+    base = FlakyEmbeddings()
+    encoder = BatchingQueryEncoder(base, window_ms=0, timeout=0.05)
+    base.release.clear()
+
+    with pytest.raises(TimeoutError, match="0.05s"):
+        encoder.embed_query("stuck")
+    with pytest.raises(TimeoutError):
+        encoder.embed_query("queued behind it")
+
+    base.release.set()
+    assert encoder.embed_query("sports") == HashingEmbeddings().embed_query("sports")
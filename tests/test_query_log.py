@@ -0,0 +1,79 @@
+import asyncio
+import json
+import time
+
+import src.query_log as query_log
+from benchmarks.stubs import HashingEmbeddings, StubChatModel
+from pipeline.pipeline import AnimeRecommendationPipeline
+from src.query_log import QueryLogWriter, frequent_queries, read_query_log
+from src.response_cache import ResponseCache
+
+
+def _write(path, sample_rate, queries):
+    writer = QueryLogWriter(str(path), sample_rate=sample_rate)
+    for query in queries:
+        writer.record(query, 0.0123, "miss")
+    writer.close()
+    return list(read_query_log(str(path)))
+
+
+def test_records_are_normalized_and_sampled(tmp_path, monkeypatch):
+    records = _write(tmp_path / "all.jsonl", 1.0, ["Sad  Romance!"])
+    assert [(r["query"], r["latency_ms"], r["cache"], r["mode"]) for r in records] == [
+        ("sad romance", 12.3, "miss", "recommend")
+    ]
+
+    assert _write(tmp_path / "none.jsonl", 0.0, ["mecha"] * 20) == []
+
+    draws = iter([0.1, 0.6, 0.3, 0.9])
+    monkeypatch.setattr(query_log.random, "random", lambda: next(draws))
+    records = _write(tmp_path / "half.jsonl", 0.5, ["a", "b", "c", "d"])
+    assert [r["query"] for r in records] == ["a", "c"]
+
+
+def test_frequent_queries_ranks_recent_records(tmp_path):
+    path = tmp_path / "log.jsonl"
+    now = time.time()
+    lines = [{"ts": now, "query": q} for q in ["mecha", "horror", "mecha", "sports", "mecha", "horror"]]
+    lines += [{"ts": now - 3600, "query": "old"}] * 4
+    path.write_text("\n".join(json.dumps(line) for line in lines) + "\nnot json\n")
+
+    assert frequent_queries(str(path), limit=2) == ["old", "mecha"]
+    assert frequent_queries(str(path), limit=3, max_age_seconds=60) == ["mecha", "horror", "sports"]
+    assert frequent_queries(str(tmp_path / "missing.jsonl")) == []
+
+
+class RecordingLog:
+    def __init__(self):
+        self.records = []
+
+    def record(self, query, latency_s, cache, mode="recommend"):
+        self.records.append((query, cache, mode))
+
+
+def test_async_requests_are_logged_with_their_cache_outcome(index_dir):
+    log = RecordingLog()
+    pipeline = AnimeRecommendationPipeline(
+        persist_dir=index_dir,
+        response_cache=ResponseCache(max_entries=8),
+        embeddings=HashingEmbeddings(),
+        llm=StubChatModel(),
+        query_log=log,
+        curated_answers=False,
+    )
+
+    pipeline.recommend_many(["space bounty hunters", "Space bounty hunters!", "witches"])
+    # Groups finish in any order
+    assert sorted(log.records) == [
+        ("Space bounty hunters!", "coalesced", "arecommend_many"),
+        ("space bounty hunters", "miss", "arecommend_many"),
+        ("witches", "miss", "arecommend_many"),
+    ]
+
+    del log.records[:]
+    pipeline.recommend_many(["witches"])
+    asyncio.run(pipeline.arecommend("space bounty hunters"))
+    assert log.records == [
+        ("witches", "exact_hit", "arecommend_many"),
+        ("space bounty hunters", "exact_hit", "arecommend"),
+    ]
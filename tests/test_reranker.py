@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from src.reranker import Reranker
+
+QUERY = [1.0, 0.0, 0.0]
+# Two near-duplicates (a title and its sequel) close to the query, one distinct title a bit further off
+VECTORS = [
+    [0.95, 0.31, 0.0],
+    [0.94, 0.34, 0.0],
+    [0.80, 0.0, 0.60],
+]
+NAN = float("nan")
+
+
+def test_relevance_only_ranks_by_similarity():
+    reranker = Reranker(similarity_weight=1.0, score_weight=0.0, diversity=0.0)
+    assert reranker.rerank(QUERY, VECTORS, [NAN] * 3, k=3).tolist() == [0, 1, 2]
+
+
+def test_diversity_demotes_near_duplicates():
+    reranker = Reranker(similarity_weight=1.0, score_weight=0.0, diversity=0.5)
+    assert reranker.rerank(QUERY, VECTORS, [NAN] * 3, k=3).tolist() == [0, 2, 1]
+    # The pick order is the same however many are kept
+    assert reranker.rerank(QUERY, VECTORS, [NAN] * 3, k=2).tolist() == [0, 2]
+
+
+def test_score_prior_breaks_close_calls():
+    reranker = Reranker(similarity_weight=1.0, score_weight=0.2, diversity=0.0)
+    assert reranker.rerank(QUERY, VECTORS, [6.0, 9.0, 7.0], k=3).tolist() == [1, 0, 2]
+
+    # Unscored titles get the candidates' mean, neither rewarded nor punished
+    relevance = reranker.relevance(np.asarray(QUERY), np.asarray(VECTORS), [8.0, NAN, 6.0])
+    assert relevance[1] == pytest.approx(0.94 / np.linalg.norm(VECTORS[1]) + 0.2 * 0.7)
+
+
+def test_edge_cases():
+    reranker = Reranker(diversity=0.3)
+    assert sorted(reranker.rerank(QUERY, VECTORS, [NAN] * 3, k=10).tolist()) == [0, 1, 2]
+    assert reranker.rerank(QUERY, np.zeros((0, 3)), [], k=5).tolist() == []
+    with pytest.raises(ValueError, match="diversity"):
+        Reranker(diversity=1.5)
@@ -0,0 +1,80 @@
+import src.response_cache as response_cache
+from src.response_cache import ResponseCache, normalize_query
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(response_cache.time, "monotonic", clock)
+    return clock
+
+
+def test_exact_match_uses_normalized_query():
+    cache = ResponseCache(max_entries=4)
+    cache.put("Space  Cowboys!", "Cowboy Bebop")
+    assert normalize_query("space cowboys") == "space cowboys"
+    assert cache.get_exact("  SPACE cowboys?") == "Cowboy Bebop"
+    assert cache.get_exact("space pirates") is None
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = _clock(monkeypatch)
+    cache = ResponseCache(max_entries=4, ttl_seconds=60)
+    cache.put("mecha", "Gundam", embedding=[1.0, 0.0])
+
+    clock.now += 59
+    assert cache.get_exact("mecha") == "Gundam"
+    assert cache.get_similar([1.0, 0.0]) == "Gundam"
+
+    clock.now += 2
+    assert cache.get_exact("mecha") is None
+    assert cache.get_similar([1.0, 0.0]) is None
+    # Expired entries are dropped by the similarity scan
+    assert len(cache) == 0
+
+
+def test_similar_lookup_respects_threshold():
+    cache = ResponseCache(max_entries=4, similarity_threshold=0.9)
+    cache.put("sad romance", "Clannad", embedding=[1.0, 0.0])
+    cache.put("sports", "Haikyuu", embedding=[0.0, 1.0])
+
+    assert cache.get_similar([0.95, 0.1]) == "Clannad"
+    assert cache.get_similar([0.7, 0.7]) is None
+    assert cache.stats == {"exact_hits": 0, "semantic_hits": 1, "misses": 1}
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2, similarity_threshold=0.9)
+    cache.put("a", "A", embedding=[1.0, 0.0])
+    cache.put("b", "B", embedding=[0.0, 1.0])
+    # A similarity hit refreshes "a", so "b" is the one to go
+    assert cache.get_similar([1.0, 0.0]) == "A"
+    cache.put("c", "C")
+
+    assert len(cache) == 2
+    assert cache.get_exact("b") is None
+    assert cache.get_exact("a") == "A"
+    assert cache.get_similar([0.0, 1.0]) is None
+
+
+def test_index_change_drops_every_entry():
+    cache = ResponseCache(max_entries=4)
+    cache.bind_index("v1")
+    cache.put("horror", "Another")
+    cache.bind_index("v1")
+    assert cache.get_exact("horror") == "Another"
+    cache.bind_index("v2")
+    assert cache.get_exact("horror") is None
+
+
+def test_disabled_cache_stores_nothing():
+    cache = ResponseCache(max_entries=0)
+    cache.put("horror", "Another")
+    assert len(cache) == 0
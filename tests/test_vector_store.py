@@ -0,0 +1,42 @@
+import numpy as np
+
+from benchmarks.stubs import HashingEmbeddings
+from src.doc_store import ColumnarDocStore
+from src.vector_store import VectorStoreBuilder
+
+
+def _build(directory, streaming):
+    builder = VectorStoreBuilder(
+        csv_path="data/processed_anime_data.csv", persist_directory=directory, embeddings=HashingEmbeddings()
+    )
+    if streaming:
+        # Small batches so titles span several reader and encoder rounds
+        builder.build_streaming(chunk_rows=7, queue_size=1)
+    else:
+        builder.build_and_save_vectorstore()
+    return builder
+
+
+def test_streaming_build_matches_the_in_memory_build(index_dir):
+    in_memory = _build(index_dir, streaming=False)
+    streamed = _build("faiss_streamed", streaming=True)
+
+    expected, actual = ColumnarDocStore(index_dir), ColumnarDocStore("faiss_streamed")
+    assert len(actual) == len(expected) > 0
+    assert [actual.chunk_id(row) for row in range(len(actual))] == [
+        expected.chunk_id(row) for row in range(len(expected))
+    ]
+    assert [actual.document(row).page_content for row in range(len(actual))] == [
+        expected.document(row).page_content for row in range(len(expected))
+    ]
+    np.testing.assert_allclose(streamed.load_vectors(), in_memory.load_vectors(), rtol=1e-6)
+    # Same per-title hashes and chunk ids, so incremental builds pick up from either
+    manifests = [{**builder._load_manifest(), "version": None} for builder in (streamed, in_memory)]
+    assert manifests[0] == manifests[1]
+
+    # The index serves the same neighbours
+    query = np.asarray([HashingEmbeddings().embed_query("space bounty hunters")], dtype=np.float32)
+    assert (
+        streamed.load_vector_store().index.search(query, 5)[1].tolist()
+        == in_memory.load_vector_store().index.search(query, 5)[1].tolist()
+    )
@@ -0,0 +1,26 @@
+import os
+from contextlib import contextmanager
+
+import numpy as np
+
+
+@contextmanager
+def atomic_path(path: str):
+    """Yield a temporary path next to ``path``; move it over ``path`` on success.
+
+    Processes that memory-mapped the old file keep reading its (now unlinked)
+    inode, so a rebuild never truncates pages out from under a live reader.
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def save_array(path: str, array):
+    with atomic_path(path) as tmp_path:
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
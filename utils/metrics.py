@@ -0,0 +1,305 @@
+import atexit
+import bisect
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from configs.config import LOG_SPANS, METRICS_ENABLED, METRICS_FLUSH_SECONDS
+from utils.atomic_io import atomic_path
+from utils.logger import get_logger
+
+logger = get_logger()
+
+# Latency buckets in seconds, from sub-millisecond cache hits to slow LLM calls
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_help = {}
+# Set by ``share_metrics``: where this process publishes its snapshot
+_shared = {"directory": None, "path": None}
+
+STAGE_LATENCY = "getanime_stage_latency_seconds"
+_SPAN_LOG_LEVEL = logging.INFO if LOG_SPANS else logging.DEBUG
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        position = bisect.bisect_left(self.buckets, value)
+        if position < len(self.counts):
+            self.counts[position] += 1
+        self.sum += value
+        self.count += 1
+
+
+def describe(name: str, text: str):
+    _help[name] = text
+
+
+def observe(name: str, value: float, buckets=LATENCY_BUCKETS, **labels):
+    if not METRICS_ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = _Histogram(buckets)
+        histogram.observe(value)
+
+
+def increment(name: str, value: float = 1, **labels):
+    if not METRICS_ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+class _Span:
+    __slots__ = ("stage", "attributes", "start")
+
+    def __init__(self, stage, attributes):
+        self.stage = stage
+        self.attributes = attributes
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        observe(STAGE_LATENCY, duration, stage=self.stage)
+        # A closed stream (client went away) is not a stage failure
+        if exc_type is not None and exc_type is not GeneratorExit:
+            increment("getanime_stage_errors_total", stage=self.stage)
+        if logger.isEnabledFor(_SPAN_LOG_LEVEL):
+            logger.log(
+                _SPAN_LOG_LEVEL,
+                json.dumps(
+                    {
+                        "event": "span",
+                        "stage": self.stage,
+                        "duration_ms": round(duration * 1000, 3),
+                        "error": exc_type.__name__ if exc_type else None,
+                        **self.attributes,
+                    },
+                    default=str,
+                )
+            )
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def set(self, **attributes):
+        pass
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(stage: str, **attributes):
+    """Time a pipeline stage into ``getanime_stage_latency_seconds{stage=...}``.
+
+    Also logs a JSON span record (at INFO with ``LOG_SPANS``, else DEBUG).
+    With metrics disabled this returns a shared no-op context manager.
+    """
+    if not METRICS_ENABLED:
+        return _NOOP_SPAN
+    return _Span(stage, attributes)
+
+
+def _escape_label(value) -> str:
+    # Label values may only carry these three escapes in the text format
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in items) + "}"
+
+
+def _snapshot():
+    with _lock:
+        return {
+            "histograms": [
+                [name, labels, list(h.buckets), list(h.counts), h.sum, h.count]
+                for (name, labels), h in _histograms.items()
+            ],
+            "counters": [[name, labels, value] for (name, labels), value in _counters.items()],
+        }
+
+
+def _flush():
+    if _shared["path"] is None:
+        return
+    with atomic_path(_shared["path"]) as tmp_path:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(_snapshot(), f)
+
+
+def _flush_forever(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            _flush()
+        except OSError as e:
+            logger.warning(f"Could not publish metrics to {_shared['directory']}: {str(e)}")
+
+
+def share_metrics(directory: str, interval: float = METRICS_FLUSH_SECONDS):
+    """Publish this process's metrics under ``directory`` every ``interval`` seconds.
+
+    ``render_prometheus`` then sums the snapshots of every process sharing the
+    directory, so a scrape that lands on any uvicorn worker sees the whole
+    pod. Snapshots of exited workers are kept, so counters never go backwards;
+    clear the directory when the server (not a worker) starts.
+    """
+    if not METRICS_ENABLED or _shared["path"] is not None:
+        return
+    os.makedirs(directory, exist_ok=True)
+    # Unique per process start: a reused pid must not overwrite a dead worker's totals
+    _shared["directory"] = directory
+    _shared["path"] = os.path.join(directory, f"metrics-{os.getpid()}-{time.time_ns()}.json")
+    _flush()
+    atexit.register(_flush)
+    threading.Thread(target=_flush_forever, args=(interval,), daemon=True, name="metrics-flush").start()
+    logger.info(f"Publishing metrics to {directory}")
+
+
+def _merged():
+    """Sum of every shared snapshot (this process's live state included)."""
+    histograms, counters = {}, {}
+    paths = set(glob.glob(os.path.join(_shared["directory"], "metrics-*.json")))
+    paths.discard(_shared["path"])
+    snapshots = [_snapshot()]
+    for path in paths:
+        try:
+            with open(path, encoding="utf-8") as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+
+    for snapshot in snapshots:
+        for name, labels, buckets, counts, total, count in snapshot["histograms"]:
+            key = name, tuple(tuple(label) for label in labels)
+            histogram = histograms.get(key)
+            if histogram is None:
+                histogram = histograms[key] = _Histogram(tuple(buckets))
+            histogram.counts = [a + b for a, b in zip(histogram.counts, counts)]
+            histogram.sum += total
+            histogram.count += count
+        for name, labels, value in snapshot["counters"]:
+            key = name, tuple(tuple(label) for label in labels)
+            counters[key] = counters.get(key, 0) + value
+    return sorted(histograms.items()), sorted(counters.items())
+
+
+def _render(histograms, counters):
+    lines = []
+    seen = set()
+    for (name, labels), histogram in histograms:
+        if name not in seen:
+            seen.add(name)
+            if name in _help:
+                lines.append(f"# HELP {name} {_help[name]}")
+            lines.append(f"# TYPE {name} histogram")
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {histogram.count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+        lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+    for (name, labels), value in counters:
+        if name not in seen:
+            seen.add(name)
+            if name in _help:
+                lines.append(f"# HELP {name} {_help[name]}")
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+def render_prometheus() -> str:
+    """Render every metric in the Prometheus text exposition format."""
+    if _shared["directory"] is not None:
+        return _render(*_merged())
+    with _lock:
+        return _render(sorted(_histograms.items()), sorted(_counters.items()))
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0"):
+    """Serve ``/metrics`` from a daemon thread, for processes without an HTTP API."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics-server").start()
+    logger.info(f"Metrics endpoint listening on {host}:{port}/metrics")
+    return server
+
+
+describe(STAGE_LATENCY, "Latency of each recommendation and build stage")
+describe("getanime_stage_errors_total", "Stages that raised an exception")
+describe("getanime_cache_requests_total", "Cache lookups by cache and outcome")
+describe("getanime_context_tokens_saved_total", "Prompt context tokens removed by the context builder")
+describe("getanime_coalesced_requests_total", "Requests that joined an identical in-flight request")
+describe("getanime_llm_tokens_total", "LLM tokens by kind (prompt or completion)")
+describe("getanime_llm_requests_total", "LLM calls by outcome (ok, error, circuit_open)")
+describe("getanime_llm_retries_total", "LLM attempts retried after 429, 5xx or transport errors")
+describe("getanime_llm_hedged_total", "LLM attempts that got a hedged duplicate request")
+describe("getanime_index_reloads_total", "Published index versions loaded by a running pipeline, by outcome")